@@ -8,6 +8,8 @@ Author: Darnix (Original)
 import os
 import shutil
 import hashlib
+import struct
+import zlib
 import json
 import time
 import stat
@@ -15,14 +17,28 @@ import threading
 import logging
 import re
 import random
+import math
 import sys
 import fnmatch
+import io
+import queue
+import base64
+import functools
+import mmap
+import gzip
+import lzma
+import sqlite3
+import array
+import contextlib
 from pathlib import Path
 from datetime import datetime, timedelta
 import subprocess
 import mimetypes
 from typing import Dict, List, Tuple, Optional, Union, Any
 import concurrent.futures
+import collections
+import heapq
+import multiprocessing
 import socket  # Add if not already present
 import requests  # Add this import
 import ctypes
@@ -33,6 +49,10 @@ import winreg
 import psutil
 import platform
 from cryptography.fernet import Fernet
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from colorama import init, Fore, Back, Style
 from tqdm import tqdm
 import humanize
@@ -56,6 +76,16 @@ try:
     from PIL import Image, ImageDraw, ImageFont
 except ImportError:
     pass
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Entropy profiling falls back to bytes.count()
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None  # Compression before encryption falls back to zlib/lzma
 # ...existing code...
 
 init(autoreset=True)
@@ -64,6 +94,252 @@ init(autoreset=True)
 PROGRAM_NAME = "Multitool v4.1"
 CHUNK_SIZE = 64 * 1024  # 64KB chunks for file operations
 MAX_WORKERS = 4  # Maximum number of worker threads for parallel operations
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.multitool')  # Persistent caches and scan state
+SIGNATURE_SCAN_LIMIT = 16 * 1024 * 1024  # Only the first 16MB of each file are signature-scanned
+SCAN_RULES_VERSION = 2  # Bump when scan_directory rules change so incremental state is re-evaluated
+SCAN_SUMMARY_LIMIT = 50  # Findings listed per category in the on-screen summary (the report has all)
+MERKLE_LEAF_SIZE = 4 * 1024 * 1024  # Leaf size for Merkle hashing of huge files
+MERKLE_THRESHOLD = 256 * 1024 * 1024  # Files this large are hashed as Merkle trees in manifests
+MERKLE_SUFFIX = '.merkle.gz'  # Sidecar holding a file's stored Merkle tree
+SCRUB_PERIOD_DAYS = 30  # Days for the scrubber to verify all data once
+SCRUB_IO_LIMIT = 50 * 1024 * 1024  # Scrubber read budget in bytes per second
+SCRUB_ALERT_LOG = os.path.join(CACHE_DIR, 'scrub_alerts.log')
+ENCRYPTION_MAGIC = b'MTENC'  # Chunked encryption format (see new_encryption_header)
+ENCRYPTION_HEADER = struct.Struct('>5sBBBB16sI7s')  # magic, version, cipher, kdf, flags, salt, chunk size, nonce prefix
+ENCRYPTION_CHUNK_SIZE = 1024 * 1024  # Plaintext bytes per encrypted chunk
+ENCRYPTION_CIPHERS = {1: ('AES-256-GCM', AESGCM), 2: ('ChaCha20-Poly1305', ChaCha20Poly1305)}
+ENCRYPTION_DEFAULT_CIPHER = 'AES-256-GCM'
+ENCRYPTION_FLAG_COMPRESSED = 0x01  # Every chunk starts with a compression codec byte
+COMPRESSION_CODECS = {'zlib': 1, 'lzma': 2, 'zstd': 3}
+COMPRESSION_PROBE_SIZE = 4096  # Bytes per sample for the compressibility probe
+COMPRESSION_MIN_RATIO = 0.9  # Chunks that don't shrink below this ratio are stored raw
+ENCRYPTED_READER_CACHE = 8  # Decrypted chunks kept by EncryptedFileReader
+CATEGORY_CONFIG = os.path.join(CACHE_DIR, 'categories.json')  # User category overrides
+ORGANIZE_BATCH_SIZE = 1000  # Moves journaled and fsynced together by apply_moves
+MONITOR_QUEUE_SIZE = 65536  # Raw events buffered before the monitor starts dropping
+MONITOR_COALESCE_WINDOW = 0.5  # Seconds over which events for one path are merged
+MONITOR_STATE_SIZE = 100000  # Paths whose last reported size the monitor remembers
+MONITOR_POLL_INTERVAL = 10  # Seconds between ticks of the polling backend
+MONITOR_RESTAT_BUDGET = 20000  # Files in unchanged directories re-stat'ed per polling tick
+EVENT_SINK_QUEUE_SIZE = 65536  # Events buffered per sink before the writer starts dropping
+EVENT_SINK_BATCH_SIZE = 1000  # Events written per batch by a sink's writer thread
+EVENT_SINK_SYNC_INTERVAL = 5  # Seconds between fsyncs of event logs
+EVENT_LOG_MAX_BYTES = 64 * 1024 * 1024  # NDJSON event logs rotate at this size...
+EVENT_LOG_MAX_AGE = 24 * 3600  # ...or after this many seconds
+LIVE_REFRESH_INTERVAL = 2  # Seconds between redraws of the live disk usage view
+LIVE_SNAPSHOT_INTERVAL = 60  # Seconds between snapshots of live usage aggregates to disk
+MONITOR_RULES_CONFIG = os.path.join(CACHE_DIR, 'rules.json')  # Actions run on monitor events
+RULE_SETTLE_TIME = 2  # Seconds a file's size must stay unchanged before a rule acts on it
+RULE_SETTLE_INTERVAL = 0.5  # Seconds between checks of files waiting to settle
+RULE_RETRIES = 3  # Attempts after the first failure, with exponential backoff
+FILE_HASH_CACHE = 'file_hashes'  # Digests recorded by the 'hash' monitor rule
+CACHE_PROTECTED_EXTENSIONS = {'.dll', '.pyd', '.exe', '.so', '.dylib'}  # Never deleted by clean_cache
+CACHE_PROTECTED_DIRS = ['_MEI', 'pywin32_system32', 'chrome-remote-desktop']  # Skipped with their contents
+CACHE_SUMMARIES = 'cache_summaries'  # Per-directory size/atime summaries used by evict_cache
+CACHE_SUMMARY_TTL = 3600  # Seconds before an unchanged directory's summary is recomputed
+CACHE_EVICT_BATCH = 256  # Files unlinked in parallel per eviction batch
+CACHE_EVICT_LOCK_TIMEOUT = 6 * 3600  # Seconds before an evict_cache lock file is considered left by a crash
+MEDIA_DATE_CACHE = 'media_dates'  # Per-file date-taken cache used by organize_by_date
+EXIF_IFD_POINTER = 0x8769  # EXIF sub-IFD holding DateTimeOriginal
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+EXIF_EXTENSIONS = {'.jpg', '.jpeg', '.jpe', '.tif', '.tiff', '.png', '.webp', '.heic', '.heif', '.avif',
+                   '.dng', '.cr2', '.cr3', '.nef', '.nrw', '.arw', '.srw', '.orf', '.rw2', '.pef', '.raf'}  # Formats that carry EXIF
+QUICKTIME_EPOCH = datetime(1904, 1, 1)  # mvhd times count seconds from here
+VAULT_MAGIC = b'MTVLT\x01'  # Vault file: magic, members, encrypted index, footer
+VAULT_FOOTER = struct.Struct('>5sBQQ')  # magic, version, index offset, index length
+VAULT_FOOTER_MAGIC = b'MTVIX'
+VAULT_SMALL_FILE = 4 * 1024 * 1024  # Files up to this size are encrypted in memory by the worker pool
+ENTROPY_BLOCK_SIZE = 64 * 1024  # Block size for per-block Shannon entropy
+ENTROPY_SAMPLE_BLOCKS = 32  # Files larger than this many blocks are sampled instead of read fully
+ENTROPY_THRESHOLD = 7.5  # Bits per byte above which a block counts as packed/encrypted
+ENTROPY_EXEMPT_EXTENSIONS = {  # Formats that are compressed by design
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.zst', '.jar', '.apk',
+    '.docx', '.xlsx', '.pptx', '.odt', '.jpg', '.jpeg', '.png', '.gif', '.webp',
+    '.mp3', '.m4a', '.aac', '.ogg', '.flac', '.mp4', '.mkv', '.mov', '.avi', '.webm', '.pdf'
+}
+
+FILE_CATEGORIES = {  # Built-in categories; extended by CATEGORY_CONFIG (see get_category_registry)
+    'Images': {
+        'extensions': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'],
+        'description': 'Picture files and graphics'
+    },
+    'Documents': {
+        'extensions': ['.pdf', '.doc', '.docx', '.txt', '.xlsx', '.csv', '.rtf', '.odt'],
+        'description': 'Text and document files'
+    },
+    'Audio': {
+        'extensions': ['.mp3', '.wav', '.flac', '.m4a', '.ogg', '.aac'],
+        'description': 'Music and sound files'
+    },
+    'Video': {
+        'extensions': ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'],
+        'description': 'Movie and video files'
+    },
+    'Archives': {
+        'extensions': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.tar.gz', '.tar.bz2', '.tar.xz'],
+        'description': 'Compressed files and archives'
+    },
+    'Code': {
+        'extensions': ['.py', '.java', '.cpp', '.html', '.css', '.js', '.php'],
+        'description': 'Programming and script files'
+    }
+}
+
+# Byte signatures for the content scan. 'pattern' is hex where '??' matches any byte
+# and '[n]' / '[n-m]' skip a fixed or bounded number of bytes (YARA-style jumps).
+# 'text' is a literal ASCII string, optionally case-insensitive with 'nocase'.
+CONTENT_SIGNATURES = [
+    {'name': 'EICAR-Test-File', 'text': r'X5O!P%@AP[4\PZX54(P^)7CC)7}$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!',
+     'severity': 'high', 'description': 'EICAR anti-virus test file'},
+    {'name': 'UPX-Packed', 'pattern': '55 50 58 30 00 00 00 00 [32] 55 50 58 31',
+     'severity': 'medium', 'description': 'Executable packed with UPX'},
+    {'name': 'Metasploit-Shellcode', 'pattern': 'FC E8 ?? 00 00 00 60 89 E5 31 ?? 64 8B ?? 30',
+     'severity': 'high', 'description': 'Metasploit x86 shellcode prologue'},
+    {'name': 'Mimikatz', 'text': 'sekurlsa::logonpasswords', 'nocase': True,
+     'severity': 'high', 'description': 'Mimikatz credential dumping command'},
+    {'name': 'Meterpreter', 'text': 'metsrv.dll', 'nocase': True,
+     'severity': 'high', 'description': 'Meterpreter payload component'},
+    {'name': 'PowerShell-Encoded', 'text': '-EncodedCommand', 'nocase': True,
+     'severity': 'medium', 'description': 'PowerShell encoded command line'},
+    {'name': 'PowerShell-Download', 'text': '.DownloadString(', 'nocase': True,
+     'severity': 'medium', 'description': 'PowerShell download cradle'},
+    {'name': 'Reverse-Shell', 'text': '>& /dev/tcp/',
+     'severity': 'high', 'description': 'Bash reverse shell'},
+    {'name': 'Ransom-Note', 'text': 'your files have been encrypted', 'nocase': True,
+     'severity': 'high', 'description': 'Ransomware note text'},
+]
+
+# Content-type database for sniff_file_type. 'magic' lists (offset, bytes) parts that
+# must all match; the most specific (longest) match wins. An empty 'extensions' list
+# marks textual formats whose extension is not checked against the content.
+SNIFF_HEADER_SIZE = 512  # Bytes read from the start of a file for content sniffing
+ZIP_CONTAINER_EXTENSIONS = ['.zip', '.docx', '.xlsx', '.pptx', '.docm', '.xlsm', '.pptm', '.dotx', '.xltx',
+                            '.potx', '.odt', '.ods', '.odp', '.epub', '.jar', '.war', '.apk', '.aab', '.xpi',
+                            '.whl', '.nupkg', '.vsix', '.appx', '.msix', '.ipa', '.kmz', '.cbz', '.3mf']
+OOXML_EXTENSIONS = ['.docx', '.xlsx', '.pptx', '.docm', '.xlsm', '.pptm', '.dotx', '.xltx', '.potx',
+                    '.nupkg', '.vsix', '.appx', '.msix', '.3mf', '.zip']
+MP4_EXTENSIONS = ['.mp4', '.m4v', '.m4a', '.m4b', '.mov', '.3gp', '.3g2', '.heic', '.heif', '.avif', '.cr3']
+MAGIC_DATABASE = [
+    # Images
+    {'name': 'JPEG image', 'mime': 'image/jpeg', 'extensions': ['.jpg', '.jpeg', '.jpe', '.jfif'], 'magic': [(0, b'\xFF\xD8\xFF')]},
+    {'name': 'PNG image', 'mime': 'image/png', 'extensions': ['.png'], 'magic': [(0, b'\x89PNG\r\n\x1A\n')]},
+    {'name': 'GIF image', 'mime': 'image/gif', 'extensions': ['.gif'], 'magic': [(0, b'GIF87a')]},
+    {'name': 'GIF image', 'mime': 'image/gif', 'extensions': ['.gif'], 'magic': [(0, b'GIF89a')]},
+    {'name': 'BMP image', 'mime': 'image/bmp', 'extensions': ['.bmp', '.dib'], 'magic': [(0, b'BM'), (6, b'\x00\x00\x00\x00')]},
+    {'name': 'WebP image', 'mime': 'image/webp', 'extensions': ['.webp'], 'magic': [(0, b'RIFF'), (8, b'WEBP')]},
+    {'name': 'TIFF image', 'mime': 'image/tiff', 'extensions': ['.tif', '.tiff', '.dng', '.nef', '.cr2', '.arw'], 'magic': [(0, b'II*\x00')]},
+    {'name': 'TIFF image', 'mime': 'image/tiff', 'extensions': ['.tif', '.tiff', '.dng', '.nef', '.cr2', '.arw'], 'magic': [(0, b'MM\x00*')]},
+    {'name': 'BigTIFF image', 'mime': 'image/tiff', 'extensions': ['.tif', '.tiff', '.btf', '.tf8'], 'magic': [(0, b'II+\x00')]},
+    {'name': 'BigTIFF image', 'mime': 'image/tiff', 'extensions': ['.tif', '.tiff', '.btf', '.tf8'], 'magic': [(0, b'MM\x00+')]},
+    {'name': 'Windows icon', 'mime': 'image/vnd.microsoft.icon', 'extensions': ['.ico', '.cur'], 'magic': [(0, b'\x00\x00\x01\x00')]},
+    {'name': 'Windows cursor', 'mime': 'image/vnd.microsoft.icon', 'extensions': ['.cur', '.ico'], 'magic': [(0, b'\x00\x00\x02\x00')]},
+    {'name': 'Photoshop image', 'mime': 'image/vnd.adobe.photoshop', 'extensions': ['.psd', '.psb'], 'magic': [(0, b'8BPS')]},
+    {'name': 'HEIF image', 'mime': 'image/heif', 'extensions': ['.heic', '.heif'], 'magic': [(4, b'ftypheic')]},
+    {'name': 'HEIF image', 'mime': 'image/heif', 'extensions': ['.heic', '.heif'], 'magic': [(4, b'ftypmif1')]},
+    {'name': 'AVIF image', 'mime': 'image/avif', 'extensions': ['.avif'], 'magic': [(4, b'ftypavif')]},
+    # Documents
+    {'name': 'PDF document', 'mime': 'application/pdf', 'extensions': ['.pdf', '.ai'], 'magic': [(0, b'%PDF-')]},
+    {'name': 'RTF document', 'mime': 'application/rtf', 'extensions': ['.rtf', '.doc'], 'magic': [(0, b'{\\rtf')]},
+    {'name': 'OLE2 compound document', 'mime': 'application/x-ole-storage',
+     'extensions': ['.doc', '.xls', '.ppt', '.msi', '.msg', '.dot', '.xlt', '.pps', '.vsd', '.pub', '.db'],
+     'magic': [(0, b'\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1')]},
+    {'name': 'Office Open XML document', 'mime': 'application/vnd.openxmlformats-officedocument',
+     'extensions': OOXML_EXTENSIONS, 'magic': [(0, b'PK\x03\x04'), (30, b'[Content_Types].xml')]},
+    {'name': 'EPUB e-book', 'mime': 'application/epub+zip', 'extensions': ['.epub'],
+     'magic': [(0, b'PK\x03\x04'), (30, b'mimetypeapplication/epub+zip')]},
+    {'name': 'OpenDocument text', 'mime': 'application/vnd.oasis.opendocument.text', 'extensions': ['.odt', '.ott'],
+     'magic': [(0, b'PK\x03\x04'), (30, b'mimetypeapplication/vnd.oasis.opendocument.text')]},
+    {'name': 'OpenDocument spreadsheet', 'mime': 'application/vnd.oasis.opendocument.spreadsheet', 'extensions': ['.ods', '.ots'],
+     'magic': [(0, b'PK\x03\x04'), (30, b'mimetypeapplication/vnd.oasis.opendocument.spreadsheet')]},
+    {'name': 'OpenDocument presentation', 'mime': 'application/vnd.oasis.opendocument.presentation', 'extensions': ['.odp', '.otp'],
+     'magic': [(0, b'PK\x03\x04'), (30, b'mimetypeapplication/vnd.oasis.opendocument.presentation')]},
+    {'name': 'Java archive', 'mime': 'application/java-archive', 'extensions': ['.jar', '.ear'] + ZIP_CONTAINER_EXTENSIONS,
+     'magic': [(0, b'PK\x03\x04'), (30, b'META-INF/')]},
+    # Archives
+    {'name': 'ZIP archive', 'mime': 'application/zip', 'extensions': ZIP_CONTAINER_EXTENSIONS, 'magic': [(0, b'PK\x03\x04')]},
+    {'name': 'ZIP archive', 'mime': 'application/zip', 'extensions': ZIP_CONTAINER_EXTENSIONS, 'magic': [(0, b'PK\x05\x06')]},
+    {'name': 'RAR archive', 'mime': 'application/vnd.rar', 'extensions': ['.rar'], 'magic': [(0, b'Rar!\x1A\x07')]},
+    {'name': '7-Zip archive', 'mime': 'application/x-7z-compressed', 'extensions': ['.7z'], 'magic': [(0, b'7z\xBC\xAF\x27\x1C')]},
+    {'name': 'gzip data', 'mime': 'application/gzip', 'extensions': ['.gz', '.tgz', '.svgz'], 'magic': [(0, b'\x1F\x8B\x08')]},
+    {'name': 'bzip2 data', 'mime': 'application/x-bzip2', 'extensions': ['.bz2', '.tbz2', '.tbz'], 'magic': [(0, b'BZh')]},
+    {'name': 'xz data', 'mime': 'application/x-xz', 'extensions': ['.xz', '.txz'], 'magic': [(0, b'\xFD7zXZ\x00')]},
+    {'name': 'Zstandard data', 'mime': 'application/zstd', 'extensions': ['.zst', '.tzst'], 'magic': [(0, b'\x28\xB5\x2F\xFD')]},
+    {'name': 'LZ4 data', 'mime': 'application/x-lz4', 'extensions': ['.lz4'], 'magic': [(0, b'\x04\x22\x4D\x18')]},
+    {'name': 'tar archive', 'mime': 'application/x-tar', 'extensions': ['.tar'], 'magic': [(257, b'ustar')]},
+    {'name': 'Cabinet archive', 'mime': 'application/vnd.ms-cab-compressed', 'extensions': ['.cab'], 'magic': [(0, b'MSCF\x00\x00\x00\x00')]},
+    # Audio
+    {'name': 'MP3 audio', 'mime': 'audio/mpeg', 'extensions': ['.mp3'], 'magic': [(0, b'ID3')]},
+    # MPEG audio frame sync: MPEG-1, MPEG-2 and MPEG-2.5, with and without CRC
+    *({'name': 'MP3 audio', 'mime': 'audio/mpeg', 'extensions': ['.mp3'], 'magic': [(0, bytes([0xFF, sync]))]}
+      for sync in (0xFB, 0xFA, 0xF3, 0xF2, 0xE3, 0xE2)),
+    *({'name': 'MPEG audio layer II', 'mime': 'audio/mpeg', 'extensions': ['.mp2', '.mpa', '.mp3'], 'magic': [(0, bytes([0xFF, sync]))]}
+      for sync in (0xFD, 0xFC, 0xF5, 0xF4, 0xE5, 0xE4)),
+    *({'name': 'AAC audio', 'mime': 'audio/aac', 'extensions': ['.aac'], 'magic': [(0, bytes([0xFF, sync]))]}
+      for sync in (0xF1, 0xF0, 0xF9, 0xF8)),  # ADTS, MPEG-4 and MPEG-2
+    {'name': 'AAC audio', 'mime': 'audio/aac', 'extensions': ['.aac'], 'magic': [(0, b'ADIF')]},
+    {'name': 'FLAC audio', 'mime': 'audio/flac', 'extensions': ['.flac'], 'magic': [(0, b'fLaC')]},
+    {'name': 'Ogg media', 'mime': 'audio/ogg', 'extensions': ['.ogg', '.oga', '.ogv', '.opus', '.spx'], 'magic': [(0, b'OggS')]},
+    {'name': 'WAV audio', 'mime': 'audio/wav', 'extensions': ['.wav'], 'magic': [(0, b'RIFF'), (8, b'WAVE')]},
+    {'name': 'AIFF audio', 'mime': 'audio/aiff', 'extensions': ['.aif', '.aiff'], 'magic': [(0, b'FORM'), (8, b'AIFF')]},
+    {'name': 'MIDI audio', 'mime': 'audio/midi', 'extensions': ['.mid', '.midi'], 'magic': [(0, b'MThd')]},
+    {'name': 'MPEG-4 audio', 'mime': 'audio/mp4', 'extensions': ['.m4a', '.m4b', '.mp4'], 'magic': [(4, b'ftypM4A')]},
+    # Video
+    {'name': 'MPEG-4 video', 'mime': 'video/mp4', 'extensions': MP4_EXTENSIONS, 'magic': [(4, b'ftyp')]},
+    {'name': 'MPEG-4 video', 'mime': 'video/mp4', 'extensions': ['.mp4', '.m4v', '.m4a', '.mov'], 'magic': [(4, b'ftypisom')]},
+    {'name': 'MPEG-4 video', 'mime': 'video/mp4', 'extensions': ['.mp4', '.m4v', '.m4a', '.mov'], 'magic': [(4, b'ftypmp42')]},
+    {'name': 'QuickTime video', 'mime': 'video/quicktime', 'extensions': ['.mov', '.qt', '.mp4'], 'magic': [(4, b'ftypqt  ')]},
+    # QuickTime files without an ftyp atom start with any top-level atom
+    *({'name': 'QuickTime video', 'mime': 'video/quicktime', 'extensions': ['.mov', '.qt', '.mp4', '.m4v', '.m4a'],
+       'magic': [(4, atom)]} for atom in (b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot')),
+    {'name': '3GPP video', 'mime': 'video/3gpp', 'extensions': ['.3gp', '.3g2', '.mp4'], 'magic': [(4, b'ftyp3g')]},
+    {'name': 'AVI video', 'mime': 'video/x-msvideo', 'extensions': ['.avi'], 'magic': [(0, b'RIFF'), (8, b'AVI ')]},
+    {'name': 'Matroska media', 'mime': 'video/x-matroska', 'extensions': ['.mkv', '.mka', '.mks', '.webm'], 'magic': [(0, b'\x1A\x45\xDF\xA3')]},
+    {'name': 'Flash video', 'mime': 'video/x-flv', 'extensions': ['.flv'], 'magic': [(0, b'FLV\x01')]},
+    {'name': 'ASF media', 'mime': 'video/x-ms-asf', 'extensions': ['.wmv', '.wma', '.asf'], 'magic': [(0, b'\x30\x26\xB2\x75\x8E\x66\xCF\x11')]},
+    {'name': 'MPEG video', 'mime': 'video/mpeg', 'extensions': ['.mpg', '.mpeg', '.vob'], 'magic': [(0, b'\x00\x00\x01\xBA')]},
+    {'name': 'MPEG video', 'mime': 'video/mpeg', 'extensions': ['.mpg', '.mpeg', '.m1v', '.m2v'], 'magic': [(0, b'\x00\x00\x01\xB3')]},
+    # Executables and binaries
+    {'name': 'Windows executable', 'mime': 'application/vnd.microsoft.portable-executable',
+     'extensions': ['.exe', '.dll', '.sys', '.scr', '.com', '.ocx', '.cpl', '.drv', '.efi', '.mui', '.ax', '.pyd', '.node'],
+     'magic': [(0, b'MZ')]},
+    {'name': 'ELF executable', 'mime': 'application/x-elf', 'extensions': ['.so', '.o', '.elf', '.axf', '.ko', '.node'],
+     'magic': [(0, b'\x7FELF')]},
+    {'name': 'Mach-O executable', 'mime': 'application/x-mach-binary', 'extensions': ['.dylib', '.bundle', '.o'], 'magic': [(0, b'\xCF\xFA\xED\xFE')]},
+    {'name': 'Mach-O executable', 'mime': 'application/x-mach-binary', 'extensions': ['.dylib', '.bundle', '.o'], 'magic': [(0, b'\xCE\xFA\xED\xFE')]},
+    {'name': 'Java class / Mach-O universal binary', 'mime': 'application/java-vm', 'extensions': ['.class', '.dylib'], 'magic': [(0, b'\xCA\xFE\xBA\xBE')]},
+    {'name': 'WebAssembly module', 'mime': 'application/wasm', 'extensions': ['.wasm'], 'magic': [(0, b'\x00asm')]},
+    {'name': 'Windows shortcut', 'mime': 'application/x-ms-shortcut', 'extensions': ['.lnk'], 'magic': [(0, b'\x4C\x00\x00\x00\x01\x14\x02\x00')]},
+    {'name': 'SQLite database', 'mime': 'application/vnd.sqlite3', 'extensions': ['.db', '.sqlite', '.sqlite3', '.db3'],
+     'magic': [(0, b'SQLite format 3\x00')]},
+    {'name': 'Windows registry hive', 'mime': 'application/x-ms-registry', 'extensions': ['.dat', '.hiv', '.hve'], 'magic': [(0, b'regf')]},
+    # Fonts
+    {'name': 'WOFF font', 'mime': 'font/woff', 'extensions': ['.woff'], 'magic': [(0, b'wOFF')]},
+    {'name': 'WOFF2 font', 'mime': 'font/woff2', 'extensions': ['.woff2'], 'magic': [(0, b'wOF2')]},
+    {'name': 'OpenType font', 'mime': 'font/otf', 'extensions': ['.otf'], 'magic': [(0, b'OTTO')]},
+    {'name': 'TrueType font', 'mime': 'font/ttf', 'extensions': ['.ttf', '.ttc'], 'magic': [(0, b'\x00\x01\x00\x00\x00')]},
+    {'name': 'TrueType font', 'mime': 'font/ttf', 'extensions': ['.ttf'], 'magic': [(0, b'true')]},
+    {'name': 'TrueType collection', 'mime': 'font/collection', 'extensions': ['.ttc'], 'magic': [(0, b'ttcf')]},
+    # Textual formats (extension not checked)
+    {'name': 'XML document', 'mime': 'text/xml', 'extensions': [], 'magic': [(0, b'<?xml')]},
+    {'name': 'XML document', 'mime': 'text/xml', 'extensions': [], 'magic': [(0, b'\xEF\xBB\xBF<?xml')]},
+    {'name': 'HTML document', 'mime': 'text/html', 'extensions': [], 'magic': [(0, b'<!DOCTYPE html')]},
+    {'name': 'HTML document', 'mime': 'text/html', 'extensions': [], 'magic': [(0, b'<!doctype html')]},
+    {'name': 'Script', 'mime': 'text/x-script', 'extensions': [], 'magic': [(0, b'#!')]},
+    {'name': 'PEM data', 'mime': 'application/x-pem-file', 'extensions': [], 'magic': [(0, b'-----BEGIN ')]},
+]
+# Extensions that say nothing about the content, so they never count as a mismatch
+SNIFF_GENERIC_EXTENSIONS = {'', '.bin', '.dat', '.tmp', '.temp', '.bak', '.old', '.orig', '.part',
+                            '.crdownload', '.download', '.cache', '.partial', '.enc', '.quarantine'}
+# Extensions shared by unrelated formats (e.g. .db for SQLite and Thumbs.db, .com for DOS programs)
+SNIFF_AMBIGUOUS_EXTENSIONS = {'.dat', '.db', '.com', '.o', '.ai'}
+# Raw streams that may start with padding or mid-frame, so no signature list is exhaustive
+SNIFF_STREAM_EXTENSIONS = {'.mp3', '.mp2', '.mpa', '.aac', '.mpg', '.mpeg', '.m1v', '.m2v', '.vob'}
+# Extensions with a known content signature (checked by verify_file_integrity)
+KNOWN_CONTENT_EXTENSIONS = ({ext for entry in MAGIC_DATABASE for ext in entry['extensions']}
+                            - SNIFF_GENERIC_EXTENSIONS - SNIFF_AMBIGUOUS_EXTENSIONS - SNIFF_STREAM_EXTENSIONS)
+# Signatures shorter than this occur by chance in text files and need a structural check
+SNIFF_MIN_MAGIC_LENGTH = 4
 
 # Third-party imports
 import psutil
@@ -107,26 +383,42 @@ def display_menu_section(title, options, start_num):
         remaining_space = width - 3 - len(str(i)) - len(option_text) - 1
         print(f"{Fore.CYAN}║{Fore.YELLOW} {i}{Fore.WHITE} {option_text}{' ' * remaining_space}{Fore.CYAN}║")
 
-def preview_file(filepath):
+def preview_file(filepath, key=None):
     """
     Display a preview of a file including metadata and content for text files
     
+    Encrypted files are previewed in place when a key is given: only the
+    first chunk is decrypted, nothing is written to disk.
+    
     Args:
         filepath (str): Path to the file to preview
+        key (bytes, optional): Key for files written by encrypt_file
     """
     try:
-        mime_type, _ = mimetypes.guess_type(filepath)
         size = os.path.getsize(filepath)
         modified = os.path.getmtime(filepath)
+        if key and is_encrypted_file(filepath):
+            with EncryptedFileReader(filepath, key) as reader:
+                kind = sniff_bytes(reader.read(SNIFF_HEADER_SIZE))
+                plain_size = reader.size
+            name = filepath[:-len('.encrypted')] if filepath.endswith('.encrypted') else filepath
+            mime_type = kind['mime'] if kind else mimetypes.guess_type(name)[0]
+            opener = lambda: open_encrypted(filepath, key, 'r')
+        else:
+            kind = sniff_file_type(filepath)
+            mime_type = kind['mime'] if kind else mimetypes.guess_type(filepath)[0]
+            plain_size = None
+            opener = lambda: open(filepath, 'r', encoding='utf-8', errors='ignore')
         
         print(f"\n{Fore.CYAN}File Preview: {Fore.WHITE}{filepath}")
-        print(f"{Fore.YELLOW}Type: {Fore.WHITE}{mime_type}")
-        print(f"{Fore.YELLOW}Size: {Fore.WHITE}{humanize.naturalsize(size)}")
+        print(f"{Fore.YELLOW}Type: {Fore.WHITE}{mime_type}" + (f" ({kind['name']})" if kind else ""))
+        print(f"{Fore.YELLOW}Size: {Fore.WHITE}{humanize.naturalsize(size)}"
+              + (f" (decrypted: {humanize.naturalsize(plain_size)})" if plain_size is not None else ""))
         print(f"{Fore.YELLOW}Modified: {Fore.WHITE}{datetime.fromtimestamp(modified)}")
         
         if mime_type and mime_type.startswith('text'):
             print(f"\n{Fore.CYAN}Content Preview:{Fore.WHITE}")
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            with opener() as f:
                 print(f.read(500) + "...")
     except Exception as e:
         print(f"{Fore.RED}Preview error: {e}")
@@ -200,7 +492,7 @@ def get_file_hash(filepath: str, algorithm: str = 'md5') -> Optional[str]:
     
     Args:
         filepath (str): Path to the file
-        algorithm (str): Hash algorithm to use ('md5', 'sha1', 'sha256')
+        algorithm (str): Hash algorithm to use ('md5', 'sha1', 'sha256', 'blake2b')
         
     Returns:
         Optional[str]: Hexadecimal hash of the file or None if error
@@ -211,6 +503,8 @@ def get_file_hash(filepath: str, algorithm: str = 'md5') -> Optional[str]:
         hasher = hashlib.sha1()
     elif algorithm == 'sha256':
         hasher = hashlib.sha256()
+    elif algorithm == 'blake2b':
+        hasher = hashlib.blake2b()
     else:
         print(f"{Fore.RED}Unsupported hash algorithm: {algorithm}")
         return None
@@ -226,6 +520,153 @@ def get_file_hash(filepath: str, algorithm: str = 'md5') -> Optional[str]:
         print(f"{Fore.RED}Error hashing file {filepath}: {str(e)}")
         return None
 
+def load_json_cache(name: str) -> Dict[str, Any]:
+    """
+    Load a gzip-compressed JSON cache from the Multitool cache directory.
+
+    Args:
+        name (str): Cache name (without extension)
+
+    Returns:
+        Dict[str, Any]: Cached data, or an empty dict if missing or unreadable
+    """
+    cache_path = os.path.join(CACHE_DIR, f"{name}.json.gz")
+    try:
+        with gzip.open(cache_path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save_json_cache(name: str, data: Dict[str, Any]) -> None:
+    """
+    Atomically write a gzip-compressed JSON cache to the Multitool cache directory.
+
+    Args:
+        name (str): Cache name (without extension)
+        data (Dict[str, Any]): JSON-serializable data to store
+    """
+    cache_path = os.path.join(CACHE_DIR, f"{name}.json.gz")
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = cache_path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=1) as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"{Fore.RED}Could not save cache {name}: {str(e)}")
+
+def bounded_map(executor, fn, iterable, max_pending: int = MAX_WORKERS * 64):
+    """
+    Like executor.map, but with at most max_pending tasks in flight.
+
+    Results are yielded in input order, so arbitrarily long iterables can be
+    processed without materializing every future up front.
+
+    Args:
+        executor (Executor): Thread or process pool to submit to
+        fn (callable): Function applied to each item
+        iterable (iterable): Items to process
+        max_pending (int): Maximum number of submitted but unconsumed tasks
+    """
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def _run_worker_batch(worker, batch: List[Tuple[str, Optional[int], Optional[int]]]) -> List[Tuple]:
+    """Apply a content worker to the uncached entries of a batch (runs in a worker process)"""
+    return [(path, size, mtime_ns, worker(path) if size is not None else None) for path, size, mtime_ns in batch]
+
+def cached_content_scan(paths, worker, cache_name: str, version: str, workers: Optional[int] = None):
+    """
+    Run a content worker over files in a process pool, reusing cached results.
+
+    Results are cached by content digest, and each path remembers the digest it had
+    for its (size, mtime) so unchanged files are never read again. Paths are
+    consumed lazily and results are yielded in input order as batches complete.
+    Entries for files that no longer exist are dropped when the cache is saved.
+
+    Args:
+        paths (iterable): Files to scan
+        worker (callable): Picklable function taking a path and returning (digest, result)
+        cache_name (str): Name of the cache in the Multitool cache directory
+        version (str): Rule-set version; a change invalidates the whole cache
+        workers (int, optional): Number of worker processes (defaults to CPU count)
+
+    Yields:
+        Tuple[str, Any]: Path and worker result for every readable file
+    """
+    cache = load_json_cache(cache_name)
+    if cache.get('version') != version:
+        cache = {'version': version, 'files': {}, 'results': {}}
+    workers = workers or os.cpu_count()
+    counts = {'read': 0, 'cached': 0}
+    seen = set()
+
+    def batches():
+        batch = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            seen.add(path)
+            entry = cache['files'].get(path)
+            if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns and entry[2] in cache['results']:
+                batch.append((path, None, None))
+            else:
+                batch.append((path, st.st_size, st.st_mtime_ns))
+            if len(batch) >= 64:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def consume(batch_results):
+        for path, size, mtime_ns, output in batch_results:
+            if output is None:
+                counts['cached'] += 1
+                yield path, cache['results'][cache['files'][path][2]]
+                continue
+            digest, result = output
+            if digest is None:
+                continue
+            counts['read'] += 1
+            cache['files'][path] = [size, mtime_ns, digest]
+            cache['results'][digest] = result
+            yield path, result
+
+    pending = collections.deque()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            for batch in batches():
+                if any(size is not None for _, size, _ in batch):
+                    pending.append(executor.submit(_run_worker_batch, worker, batch))
+                else:
+                    # Fully cached batch: no need to round-trip through a worker process
+                    done = concurrent.futures.Future()
+                    done.set_result([(path, None, None, None) for path, _, _ in batch])
+                    pending.append(done)
+                while len(pending) > workers * 2 or (pending and pending[0].done()):
+                    yield from consume(pending.popleft().result())
+            while pending:
+                yield from consume(pending.popleft().result())
+        finally:
+            for future in pending:
+                future.cancel()
+            print(f"{Fore.CYAN}Content scan ({cache_name}): {counts['read']} files read, {counts['cached']} from cache")
+            # Drop deleted or moved files (other scans share the cache, so unseen paths are only
+            # dropped once they are gone), then results no longer referenced by any file
+            cache['files'] = {path: entry for path, entry in cache['files'].items()
+                              if path in seen or os.path.lexists(path)}
+            live = {entry[2] for entry in cache['files'].values()}
+            cache['results'] = {digest: result for digest, result in cache['results'].items() if digest in live}
+            save_json_cache(cache_name, cache)
+
 def search_files(directory, pattern, use_regex=False):
     """
     Search for files in a directory that match a pattern.
@@ -345,15 +786,87 @@ def find_duplicates(directory: str) -> Dict[str, List[str]]:
         print(f"{Fore.RED}Error finding duplicates: {str(e)}")
         return {}
 
-def analyze_disk_space(directory):
+_category_registry = None
+
+def get_category_registry() -> Dict[str, Any]:
+    """
+    Load (once per process) the file category registry.
+
+    FILE_CATEGORIES is merged with the user's CATEGORY_CONFIG file, a JSON object
+    of {"Category": {"extensions": [...], "description": "..."}}. User categories
+    replace built-in ones of the same name, and an extension listed by the user
+    is taken away from any built-in category.
+
+    Returns:
+        Dict[str, Any]: 'categories' (merged table), 'extensions' (extension -> category
+        map, including multi-part extensions like '.tar.gz') and 'max_parts'
+    """
+    global _category_registry
+    if _category_registry is None:
+        categories = {name: {'extensions': list(info['extensions']), 'description': info['description']}
+                      for name, info in FILE_CATEGORIES.items()}
+        try:
+            with open(CATEGORY_CONFIG, 'r', encoding='utf-8') as f:
+                user = json.load(f)
+            claimed = {ext.lower() for info in user.values() for ext in info.get('extensions', [])}
+            for info in categories.values():
+                info['extensions'] = [ext for ext in info['extensions'] if ext not in claimed]
+            for name, info in user.items():
+                categories[name] = {'extensions': [ext.lower() for ext in info.get('extensions', [])],
+                                    'description': info.get('description', '')}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"{Fore.RED}Ignoring invalid category config {CATEGORY_CONFIG}: {str(e)}")
+        extensions = {ext: name for name, info in categories.items() for ext in info['extensions']}
+        _category_registry = {
+            'categories': categories,
+            'extensions': extensions,
+            'max_parts': max((ext.count('.') for ext in extensions), default=1)
+        }
+    return _category_registry
+
+def reload_categories() -> None:
+    """Forget the loaded registry so the next lookup re-reads CATEGORY_CONFIG"""
+    global _category_registry
+    _category_registry = None
+
+def categorize(filename: str, filepath: Optional[str] = None) -> Optional[str]:
+    """
+    Return the category of a file from its extension, longest multi-part extension first.
+
+    Args:
+        filename (str): File name (only the name is looked at)
+        filepath (str, optional): Full path; if given, files with unknown or missing
+            extensions are classified by content sniffing
+
+    Returns:
+        Optional[str]: Category name, or None if uncategorized
+    """
+    registry = get_category_registry()
+    extensions = registry['extensions']
+    parts = filename.lower().split('.')
+    for count in range(min(registry['max_parts'], len(parts) - 1), 0, -1):
+        category = extensions.get('.' + '.'.join(parts[-count:]))
+        if category:
+            return category
+    if filepath:
+        kind = sniff_file_type(filepath)
+        if kind and kind['extensions']:
+            return extensions.get(kind['extensions'][0])
+    return None
+
+def analyze_disk_space(directory, by_category=False):
     """
-    Analyze disk space usage by file extension in a directory
+    Analyze disk space usage by file extension (or category) in a directory
     
     Args:
         directory (str): Directory to analyze
+        by_category (bool): Group by file category instead of extension
         
     Returns:
-        dict: Dictionary mapping file extensions to total size in bytes
+        dict: Dictionary mapping file extensions (or categories, 'Other' for
+        uncategorized files) to total size in bytes
     """
     size_dict = {}
     for root, _, files in os.walk(directory):
@@ -361,7 +874,10 @@ def analyze_disk_space(directory):
             filepath = os.path.join(root, file)
             try:
                 size = os.path.getsize(filepath)
-                ext = os.path.splitext(file)[1].lower()
+                if by_category:
+                    ext = categorize(file) or 'Other'
+                else:
+                    ext = os.path.splitext(file)[1].lower()
                 size_dict[ext] = size_dict.get(ext, 0) + size
             except OSError:
                 continue
@@ -383,61 +899,660 @@ def create_folder(directory, folder_name):
         os.makedirs(folder_path)
     return folder_path
 
+def unique_name(name: str, taken: set) -> str:
+    """
+    Return name, or 'stem (n).ext' if it is already in taken (compared case-insensitively on Windows).
+
+    The chosen name is added to taken.
+    """
+    candidate = name
+    stem, ext = os.path.splitext(name)
+    counter = 1
+    while os.path.normcase(candidate) in taken:
+        candidate = f"{stem} ({counter}){ext}"
+        counter += 1
+    taken.add(os.path.normcase(candidate))
+    return candidate
+
+def journal_path(kind: str, directory: str) -> str:
+    """Path of the undo journal for an operation kind ('organize', 'rename', ...) on a directory"""
+    digest = hashlib.sha1(os.path.abspath(directory).encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{kind}_journal_{digest}.ndjson")
+
+def read_journal(path: str) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Read an operation journal, ignoring a torn last line from a crash.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], bool]: Records and whether the operation completed
+    """
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return records, any(record.get('op') == 'complete' for record in records)
+
+def plan_organize(directory: str) -> List[Tuple[str, str]]:
+    """
+    Plan moving the files of a directory into category folders.
+
+    A single scandir pass with one registry lookup per file (see categorize);
+    files with unknown or missing extensions fall back to content sniffing,
+    and destination names that already exist (or are planned twice) get a
+    ' (n)' suffix.
+
+    Args:
+        directory (str): Directory to organize
+
+    Returns:
+        List[Tuple[str, str]]: (source, destination) paths
+    """
+    taken = {}  # category -> normcased names already in (or planned for) its folder
+    moves = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            category = categorize(entry.name, entry.path)
+            if category is None:
+                continue
+            if category not in taken:
+                folder = os.path.join(directory, category)
+                taken[category] = ({os.path.normcase(name) for name in os.listdir(folder)}
+                                   if os.path.isdir(folder) else set())
+            name = unique_name(entry.name, taken[category])
+            moves.append((entry.path, os.path.join(directory, category, name)))
+    return moves
+
+def apply_moves(moves: List[Tuple[str, str]], journal: str, workers: int = MAX_WORKERS) -> Dict[str, Any]:
+    """
+    Execute planned moves in journaled batches.
+
+    Each batch of ORGANIZE_BATCH_SIZE moves is written to the journal (and
+    fsynced) before it runs. Moves within one filesystem are plain os.rename
+    calls; moves to another device are copied and unlinked in parallel. The
+    journal is what rollback_moves replays to undo the operation, including
+    after a crash.
+
+    Args:
+        moves (List[Tuple[str, str]]): (source, destination) paths from a planner
+        journal (str): Journal file to write
+        workers (int): Threads for cross-device copies
+
+    Returns:
+        Dict[str, Any]: 'moved', 'copied' (cross-device), 'errors' and 'seconds'
+    """
+    result = {'moved': 0, 'copied': 0, 'errors': []}
+    start = time.time()
+    os.makedirs(os.path.dirname(journal), exist_ok=True)
+    devices = {}
+
+    def device(path):
+        if path not in devices:
+            devices[path] = os.stat(path).st_dev
+        return devices[path]
+
+    def cross_device_move(move):
+        try:
+            shutil.move(*move)
+            return None
+        except OSError as e:
+            return f"{move[0]}: {e}"
+
+    with open(journal, 'w', encoding='utf-8') as log, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        def record(entry):
+            log.write(json.dumps(entry) + '\n')
+
+        record({'op': 'begin', 'time': time.time()})
+        for folder in sorted({os.path.dirname(dst) for _, dst in moves}):
+            missing = []
+            while folder and not os.path.isdir(folder):
+                missing.append(folder)
+                folder = os.path.dirname(folder)
+            for folder in reversed(missing):
+                os.mkdir(folder)
+                record({'op': 'mkdir', 'path': folder})
+        for i in range(0, len(moves), ORGANIZE_BATCH_SIZE):
+            batch = moves[i:i + ORGANIZE_BATCH_SIZE]
+            for src, dst in batch:
+                record({'op': 'move', 'src': src, 'dst': dst})
+            log.flush()
+            os.fsync(log.fileno())
+            remote = []
+            for src, dst in batch:
+                if device(os.path.dirname(src)) != device(os.path.dirname(dst)):
+                    remote.append((src, dst))
+                    continue
+                try:
+                    os.rename(src, dst)
+                    result['moved'] += 1
+                except OSError as e:
+                    result['errors'].append(f"{src}: {e}")
+            for error in executor.map(cross_device_move, remote):
+                if error:
+                    result['errors'].append(error)
+                else:
+                    result['copied'] += 1
+        record({'op': 'complete', 'moved': result['moved'] + result['copied']})
+    result['seconds'] = time.time() - start
+    return result
+
+def _move_happened(entry: Dict[str, Any]) -> bool:
+    """Whether a journaled move is visible on disk (case-only renames are checked by listing the folder)"""
+    if os.path.normcase(entry['src']) == os.path.normcase(entry['dst']):
+        try:
+            return os.path.basename(entry['dst']) in os.listdir(os.path.dirname(entry['dst']))
+        except OSError:
+            return False
+    return os.path.lexists(entry['dst']) and not os.path.lexists(entry['src'])
+
+def rollback_moves(journal: str) -> int:
+    """
+    Undo the moves recorded in a journal (complete or interrupted) and remove it.
+
+    Every move whose destination exists and whose source is free is reversed,
+    newest first, and folders created by the operation are removed if empty,
+    so replaying a journal after a crash is safe.
+
+    Journals whose begin record sets 'done_records' (renames, which may swap
+    names) also log a 'done' record after each move, and steps run strictly
+    in order. Only the completed prefix is reversed: the logged steps plus any
+    following ones that are visible on disk (a crash may have lost their
+    record). A step that never ran is never "undone" into someone else's name.
+
+    Returns:
+        int: Number of files moved back
+    """
+    records, _ = read_journal(journal)
+    if any(entry.get('op') == 'begin' and entry.get('done_records') for entry in records):
+        moves = [entry for entry in records if entry.get('op') == 'move']
+        completed = sum(1 for entry in records if entry.get('op') == 'done')
+        while completed < len(moves) and _move_happened(moves[completed]):
+            completed += 1
+        records = moves[:completed]
+    restored = 0
+    for entry in reversed(records):
+        if entry.get('op') == 'move' and os.path.lexists(entry['dst']) and \
+                (not os.path.lexists(entry['src']) or os.path.normcase(entry['src']) == os.path.normcase(entry['dst'])):
+            try:
+                shutil.move(entry['dst'], entry['src'])
+                restored += 1
+            except OSError as e:
+                print(f"{Fore.RED}Could not restore {entry['src']}: {e}")
+        elif entry.get('op') == 'mkdir':
+            try:
+                os.rmdir(entry['path'])
+            except OSError:
+                pass
+    os.remove(journal)
+    return restored
+
 def organize_files(directory):
     """
     Organize files in a directory into category folders based on file extensions
     
+    Planning and applying are separate phases (see plan_organize and
+    apply_moves), and every run is journaled so it can be undone with
+    undo_organize. An interrupted run is detected on the next call and must
+    be rolled back before the directory is organized again, since a new run
+    would overwrite its journal.
+    
     Args:
         directory (str): Directory to organize
     """
-    CATEGORIES = {
-        'Images': {
-            'extensions': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'],
-            'description': 'Picture files and graphics'
-        },
-        'Documents': {
-            'extensions': ['.pdf', '.doc', '.docx', '.txt', '.xlsx', '.csv', '.rtf', '.odt'],
-            'description': 'Text and document files'
-        },
-        'Audio': {
-            'extensions': ['.mp3', '.wav', '.flac', '.m4a', '.ogg', '.aac'],
-            'description': 'Music and sound files'
-        },
-        'Video': {
-            'extensions': ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'],
-            'description': 'Movie and video files'
-        },
-        'Archives': {
-            'extensions': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2'],
-            'description': 'Compressed files and archives'
-        },
-        'Code': {
-            'extensions': ['.py', '.java', '.cpp', '.html', '.css', '.js', '.php'],
-            'description': 'Programming and script files'
-        }
-    }
+    try:
+        journal = journal_path('organize', directory)
+        if os.path.exists(journal) and not read_journal(journal)[1]:
+            print(f"{Fore.YELLOW}A previous organize run in this directory was interrupted.")
+            if input(f"{Fore.YELLOW}Roll it back before continuing? (y/n): {Fore.WHITE}").lower() != 'y':
+                print(f"{Fore.YELLOW}Nothing was changed; the interrupted run must be rolled back first.")
+                return
+            print(f"{Fore.GREEN}Restored {rollback_moves(journal)} files.")
+        
+        moves = plan_organize(directory)
+        if not moves:
+            print("\nOrganization complete! Moved 0 files.")
+            return
+        counts = collections.Counter(os.path.basename(os.path.dirname(dst)) for _, dst in moves)
+        for category, count in counts.most_common():
+            print(f"{category}: {count} files ({get_category_registry()['categories'][category]['description']})")
+        
+        result = apply_moves(moves, journal)
+        for error in result['errors'][:10]:
+            print(f"{Fore.RED}• {error}")
+        print(f"\nOrganization complete! Moved {result['moved'] + result['copied']} files "
+              f"in {result['seconds']:.1f}s (undo is available from the organize menu).")
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+
+def _exif_date(filepath: str) -> Optional[datetime]:
+    """Read EXIF DateTimeOriginal (or DateTime) from an image without decoding its pixels"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(filepath) as img:
+            exif = img.getexif()
+            value = exif.get_ifd(EXIF_IFD_POINTER).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+        if isinstance(value, bytes):
+            value = value.decode('ascii', 'ignore')
+        return datetime.strptime(value.strip('\x00 ')[:19], '%Y:%m:%d %H:%M:%S') if value else None
+    except Exception:
+        return None
+
+def _quicktime_date(filepath: str) -> Optional[datetime]:
+    """Read the creation time from the mvhd atom of an MP4/MOV file by walking atom headers"""
+    try:
+        with open(filepath, 'rb') as f:
+            end = os.fstat(f.fileno()).st_size
+            pos = 0
+            while pos + 8 <= end:
+                f.seek(pos)
+                size, kind = struct.unpack('>I4s', f.read(8))
+                header = 8
+                if size == 1:
+                    size = struct.unpack('>Q', f.read(8))[0]
+                    header = 16
+                elif size == 0:
+                    size = end - pos
+                if size < header:
+                    return None
+                if kind == b'moov':
+                    # Descend: the next atom header is inside moov
+                    end = pos + size
+                    pos += header
+                    continue
+                if kind == b'mvhd':
+                    version = f.read(4)[0]
+                    created = struct.unpack('>Q' if version == 1 else '>I', f.read(8 if version == 1 else 4))[0]
+                    # Many encoders write 0 (or a Unix timestamp) when the time is unknown
+                    if created < 2082844800:
+                        return None
+                    return QUICKTIME_EPOCH + timedelta(seconds=created)
+                pos += size
+    except (OSError, struct.error, IndexError, ValueError, OverflowError):
+        pass
+    return None
+
+def media_date(filepath: str) -> Tuple[str, str]:
+    """
+    Determine when a photo or video was taken.
+
+    Uses EXIF DateTimeOriginal for images, the container creation time for
+    MP4/MOV-family files, and the modification time otherwise. Only headers
+    are read.
+
+    Args:
+        filepath (str): Media file
+
+    Returns:
+        Tuple[str, str]: ISO date (YYYY-MM-DD) and its source ('exif', 'container' or 'mtime')
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    taken = None
+    source = 'exif'
+    if ext in MP4_EXTENSIONS:
+        taken = _quicktime_date(filepath)
+        source = 'container'
+    if taken is None and ext in EXIF_EXTENSIONS:
+        taken = _exif_date(filepath)
+        source = 'exif'
+    if taken is None:
+        taken = datetime.fromtimestamp(os.path.getmtime(filepath))
+        source = 'mtime'
+    return taken.strftime('%Y-%m-%d'), source
+
+def plan_date_organize(directory: str, workers: int = MAX_WORKERS) -> Tuple[List[Tuple[str, str]], Dict[str, int]]:
+    """
+    Plan moving every photo and video below a directory into YYYY/MM folders.
+
+    Candidates are picked by extension (MP4_EXTENSIONS and EXIF_EXTENSIONS), so
+    HEIC and camera RAW files are included. Dates come from media_date,
+    extracted on a thread pool; results are cached per file by (size, mtime),
+    and organize_by_date moves the cache entries along with the files, so
+    re-runs over a large import only read new files.
+
+    Args:
+        directory (str): Directory to organize (searched recursively)
+        workers (int): Extraction threads
+
+    Returns:
+        Tuple[List[Tuple[str, str]], Dict[str, int]]: (source, destination) moves and
+        counts per date source (plus 'cached')
+    """
+    cache = load_json_cache(MEDIA_DATE_CACHE)
+    counts = collections.Counter()
+    media = []
+    for filepath in iter_files(directory):
+        ext = os.path.splitext(filepath)[1].lower()
+        if ext not in MP4_EXTENSIONS and ext not in EXIF_EXTENSIONS:
+            continue
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            continue
+        media.append((os.path.abspath(filepath), st.st_size, st.st_mtime_ns))
+
+    def extract(item):
+        path, size, mtime_ns = item
+        entry = cache.get(path)
+        if entry and entry[0] == size and entry[1] == mtime_ns:
+            return path, entry, True
+        try:
+            return path, [size, mtime_ns, *media_date(path)], False
+        except OSError:
+            return path, None, False
+
+    taken = {}  # folder -> normcased names already in (or planned for) it
+    moves = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for path, entry, cached in bounded_map(executor, extract, media):
+            if entry is None:
+                continue
+            cache[path] = entry
+            counts['cached' if cached else entry[3]] += 1
+            date = entry[2]
+            folder = os.path.join(os.path.abspath(directory), date[:4], date[5:7])
+            if os.path.dirname(path) == folder:
+                continue
+            if folder not in taken:
+                taken[folder] = ({os.path.normcase(name) for name in os.listdir(folder)}
+                                 if os.path.isdir(folder) else set())
+            moves.append((path, os.path.join(folder, unique_name(os.path.basename(path), taken[folder]))))
+    save_json_cache(MEDIA_DATE_CACHE, cache)
+    return moves, dict(counts)
+
+def organize_by_date(directory):
+    """
+    Organize photos and videos below a directory into YYYY/MM folders by date taken
     
+    Runs are journaled like organize_files and can be undone from the organize
+    menu; an interrupted run must be rolled back before a new one starts.
+    
+    Args:
+        directory (str): Directory to organize
+    """
     try:
-        moved_files = 0
-        for filename in os.listdir(directory):
-            filepath = os.path.join(directory, filename)
-            if os.path.isfile(filepath):
-                file_ext = os.path.splitext(filename)[1].lower()
-                for category, info in CATEGORIES.items():
-                    if file_ext in info['extensions']:
-                        category_path = create_folder(directory, category)
-                        shutil.move(filepath, os.path.join(category_path, filename))
-                        moved_files += 1
-                        print(f"Moved {filename} to {category} ({info['description']})")
-                        break
-        print(f"\nOrganization complete! Moved {moved_files} files.")
+        journal = journal_path('date_organize', directory)
+        if os.path.exists(journal) and not read_journal(journal)[1]:
+            print(f"{Fore.YELLOW}A previous date organize run in this directory was interrupted.")
+            if input(f"{Fore.YELLOW}Roll it back before continuing? (y/n): {Fore.WHITE}").lower() != 'y':
+                print(f"{Fore.YELLOW}Nothing was changed; the interrupted run must be rolled back first.")
+                return
+            print(f"{Fore.GREEN}Restored {rollback_moves(journal)} files.")
+        
+        print(f"{Fore.CYAN}Reading media dates...")
+        start = time.time()
+        moves, counts = plan_date_organize(directory)
+        print(f"Dates from EXIF: {counts.get('exif', 0)}, container: {counts.get('container', 0)}, "
+              f"modification time: {counts.get('mtime', 0)}, cached: {counts.get('cached', 0)} "
+              f"({time.time() - start:.1f}s)")
+        if not moves:
+            print("\nOrganization complete! Moved 0 files.")
+            return
+        months = collections.Counter(os.path.relpath(os.path.dirname(dst), directory) for _, dst in moves)
+        for month, count in sorted(months.items()):
+            print(f"{month}: {count} files")
+        
+        result = apply_moves(moves, journal)
+        # Date cache entries follow the files to their new paths; entries of vanished files are dropped
+        cache = load_json_cache(MEDIA_DATE_CACHE)
+        for src, dst in moves:
+            if src in cache and os.path.lexists(dst) and not os.path.lexists(src):
+                cache[dst] = cache.pop(src)
+        save_json_cache(MEDIA_DATE_CACHE, {path: entry for path, entry in cache.items() if os.path.lexists(path)})
+        for error in result['errors'][:10]:
+            print(f"{Fore.RED}• {error}")
+        print(f"\nOrganization complete! Moved {result['moved'] + result['copied']} files "
+              f"in {result['seconds']:.1f}s (undo is available from the organize menu).")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
 
+def undo_organize(directory, kind: str = 'organize') -> int:
+    """
+    Undo the last organize run in a directory.
+
+    Args:
+        directory (str): Directory that was organized
+        kind (str): 'organize' (by category) or 'date_organize'
+
+    Returns:
+        int: Number of files moved back (0 if there is nothing to undo)
+    """
+    journal = journal_path(kind, directory)
+    if not os.path.exists(journal):
+        return 0
+    return rollback_moves(journal)
+
+def plan_renames(directory: str, mapping: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Turn a {old_name: new_name} mapping for one directory into a safe rename order.
+
+    Collisions are found in O(n) with normcased name sets: two files mapped to
+    the same name, a target that already exists and is not itself being
+    renamed away, or a target freed only by a rename that was itself skipped.
+    Chains (a -> b while b -> c) are ordered so every target is free when its
+    rename runs, and cycles (a -> b, b -> a) are broken with a temporary name.
+
+    Args:
+        directory (str): Directory holding the files
+        mapping (Dict[str, str]): Old file name -> new file name
+
+    Returns:
+        Dict[str, Any]: 'steps' ((src, dst) names in execution order), 'renames'
+        (number of files renamed), 'skipped' ((old, new, reason) tuples) and 'cycles'
+    """
+    names = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            names[os.path.normcase(entry.name)] = entry.name
+
+    skipped = {}
+    claimants = collections.defaultdict(list)
+    for old, new in mapping.items():
+        if new == old:
+            continue
+        if os.path.normcase(old) not in names:
+            skipped[old] = 'source not found'
+        elif not new or new in ('.', '..') or os.sep in new or (os.altsep and os.altsep in new):
+            skipped[old] = 'invalid name'
+        else:
+            claimants[os.path.normcase(new)].append(old)
+    for olds in claimants.values():
+        if len(olds) > 1:
+            for old in olds:
+                skipped[old] = 'several files map to this name'
+
+    moving = {os.path.normcase(old): old for old, new in mapping.items() if new != old and old not in skipped}
+    target_of = {os.path.normcase(mapping[old]): old for old in moving.values()}
+    # A rename is blocked by a name that stays put; skipping a rename keeps its
+    # name occupied, which can block whoever wanted that name in turn
+    blocked = [old for old in moving.values()
+               if os.path.normcase(mapping[old]) in names
+               and os.path.normcase(mapping[old]) not in moving]
+    while blocked:
+        old = blocked.pop()
+        if old in skipped:
+            continue
+        skipped[old] = 'target already exists'
+        del moving[os.path.normcase(old)]
+        waiter = target_of.get(os.path.normcase(old))
+        if waiter and waiter not in skipped and waiter != old:
+            blocked.append(waiter)
+
+    renames = [(old, mapping[old]) for old in moving.values()]
+    waiting = {}  # normcased name -> rename waiting for that name to be vacated
+    ready = []
+    for old, new in renames:
+        occupant = moving.get(os.path.normcase(new))
+        if occupant is not None and occupant != old:
+            waiting[os.path.normcase(new)] = (old, new)
+        else:
+            ready.append((old, new))
+
+    steps = []
+    pending = {old for old, _ in renames}
+    temps = {}
+
+    def drain(item):
+        while item:
+            old, new = item
+            steps.append((temps.pop(old, old), new))
+            pending.discard(old)
+            item = waiting.pop(os.path.normcase(old), None)
+
+    for item in ready:
+        drain(item)
+    cycles = 0
+    for old, new in renames:
+        if old not in pending:
+            continue
+        # Everything left waits on something else in a closed loop: park one file
+        cycles += 1
+        temp = old
+        while os.path.normcase(temp) in names:
+            temp = f".{old}.{os.urandom(4).hex()}.renaming"
+        names[os.path.normcase(temp)] = temp
+        temps[old] = temp
+        steps.append((old, temp))
+        drain(waiting.pop(os.path.normcase(old)))
+
+    return {
+        'steps': steps,
+        'renames': len(renames),
+        'skipped': [(old, mapping[old], reason) for old, reason in skipped.items()],
+        'cycles': cycles
+    }
+
+def apply_renames(directory: str, steps: List[Tuple[str, str]], journal: str) -> Dict[str, Any]:
+    """
+    Run a rename plan as one transaction.
+
+    Steps are journaled in fsynced batches before they run (in the format
+    rollback_moves replays), and each one is followed by a 'done' record once
+    it has succeeded, so a rollback reverses exactly the steps that ran.
+    Renames are made relative to a single directory descriptor where the
+    platform supports it. If any rename fails, the ones already done are
+    rolled back and the journal is removed.
+
+    Args:
+        directory (str): Directory holding the files
+        steps (List[Tuple[str, str]]): (src, dst) names from plan_renames
+        journal (str): Journal file to write
+
+    Returns:
+        Dict[str, Any]: 'renamed', 'errors', 'rolled_back' and 'seconds'
+    """
+    result = {'renamed': 0, 'errors': [], 'rolled_back': 0}
+    start = time.time()
+    os.makedirs(os.path.dirname(journal), exist_ok=True)
+    dir_fd = os.open(directory, os.O_RDONLY) if os.rename in os.supports_dir_fd else None
+    try:
+        with open(journal, 'w', encoding='utf-8') as log:
+            log.write(json.dumps({'op': 'begin', 'time': time.time(), 'directory': directory,
+                                  'done_records': True}) + '\n')
+            for i in range(0, len(steps), ORGANIZE_BATCH_SIZE):
+                batch = steps[i:i + ORGANIZE_BATCH_SIZE]
+                for src, dst in batch:
+                    log.write(json.dumps({'op': 'move', 'src': os.path.join(directory, src),
+                                          'dst': os.path.join(directory, dst)}) + '\n')
+                log.flush()
+                os.fsync(log.fileno())
+                for src, dst in batch:
+                    try:
+                        if dir_fd is not None:
+                            os.rename(src, dst, src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+                        else:
+                            os.rename(os.path.join(directory, src), os.path.join(directory, dst))
+                        result['renamed'] += 1
+                        log.write('{"op": "done"}\n')
+                        log.flush()  # Survives a crash of this process; fsynced with the next batch
+                    except OSError as e:
+                        result['errors'].append(f"{src} → {dst}: {e}")
+                        break
+                if result['errors']:
+                    break
+            if not result['errors']:
+                log.write(json.dumps({'op': 'complete', 'renamed': result['renamed']}) + '\n')
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+    if result['errors']:
+        result['rolled_back'] = rollback_moves(journal)
+        result['renamed'] = 0
+    result['seconds'] = time.time() - start
+    return result
+
+def bulk_rename(directory: str, mapping: Dict[str, str], confirm: bool = True) -> int:
+    """
+    Plan, preview and apply a set of renames in one directory.
+
+    Args:
+        directory (str): Directory holding the files
+        mapping (Dict[str, str]): Old file name -> new file name
+        confirm (bool): Show a dry-run preview and ask before renaming
+
+    Returns:
+        int: Number of files renamed
+    """
+    journal = journal_path('rename', directory)
+    if os.path.exists(journal) and not read_journal(journal)[1]:
+        # A new run would overwrite its journal, so it has to be rolled back first (never silently)
+        print(f"{Fore.YELLOW}A previous rename run in this directory was interrupted.")
+        if not confirm or input(f"{Fore.YELLOW}Roll it back before continuing? (y/n): {Fore.WHITE}").lower() != 'y':
+            print(f"{Fore.YELLOW}Nothing was renamed; roll back the interrupted run first "
+                  f"(Undo last rename in the auto rename menu).")
+            return 0
+        print(f"{Fore.GREEN}Restored {rollback_moves(journal)} files.")
+
+    plan = plan_renames(directory, mapping)
+    if confirm:
+        skipped = {old for old, _, _ in plan['skipped']}
+        shown = [(old, new) for old, new in mapping.items() if new != old and old not in skipped][:20]
+        print(f"\n{Fore.CYAN}Rename preview ({plan['renames']} files):")
+        for old, new in shown:
+            print(f"{Fore.WHITE}{old} → {new}")
+        if plan['renames'] > len(shown):
+            print(f"{Fore.WHITE}... and {plan['renames'] - len(shown)} more")
+        if plan['cycles']:
+            print(f"{Fore.YELLOW}{plan['cycles']} rename cycles will go through temporary names.")
+        if plan['skipped']:
+            print(f"{Fore.RED}Skipping {len(plan['skipped'])} files:")
+            for old, new, reason in plan['skipped'][:10]:
+                print(f"{Fore.RED}• {old} → {new}: {reason}")
+        if not plan['renames'] or input(f"\n{Fore.YELLOW}Apply these renames? (y/n): {Fore.WHITE}").lower() != 'y':
+            return 0
+
+    result = apply_renames(directory, plan['steps'], journal)
+    for error in result['errors']:
+        print(f"{Fore.RED}Rename failed, {result['rolled_back']} changes rolled back: {error}")
+        return 0
+    return plan['renames']
+
+def undo_rename(directory) -> int:
+    """
+    Undo the last bulk rename in a directory.
+
+    Returns:
+        int: Number of rename steps reversed (0 if there is nothing to undo)
+    """
+    journal = journal_path('rename', directory)
+    if not os.path.exists(journal):
+        return 0
+    return rollback_moves(journal)
+
 def rename_files(directory, pattern, replacement):
     """
     Rename files in a directory by replacing a pattern in filenames
     
+    Collisions are skipped and swaps are handled (see plan_renames); the run
+    is journaled and can be undone with undo_rename.
+    
     Args:
         directory (str): Directory containing files to rename
         pattern (str): Pattern to search for in filenames
@@ -446,20 +1561,17 @@ def rename_files(directory, pattern, replacement):
     Returns:
         int: Number of files renamed
     """
-    renamed = 0
-    for filename in os.listdir(directory):
-        if pattern in filename:
-            new_name = filename.replace(pattern, replacement)
-            old_path = os.path.join(directory, filename)
-            new_path = os.path.join(directory, new_name)
-            os.rename(old_path, new_path)
-            renamed += 1
-    return renamed
+    mapping = {filename: filename.replace(pattern, replacement)
+               for filename in os.listdir(directory) if pattern in filename}
+    return bulk_rename(directory, mapping, confirm=False)
 
 def auto_rename():
     """
     Bulk rename files with various options
     
+    All renames are planned up front, previewed, and applied as one
+    journaled transaction (see bulk_rename).
+    
     Returns:
         int: Number of files renamed
     """
@@ -474,22 +1586,21 @@ def auto_rename():
     print(f"{Fore.WHITE}5. Convert to lowercase/uppercase")
     print(f"{Fore.WHITE}6. Remove spaces")
     print(f"{Fore.WHITE}7. Cancel")
+    print(f"{Fore.WHITE}8. Undo last rename")
     
-    choice = input(f"\n{Fore.GREEN}Choose option (1-7): {Fore.WHITE}")
+    choice = input(f"\n{Fore.GREEN}Choose option (1-8): {Fore.WHITE}")
     
     if choice == "7":
         return 0
+    if choice == "8":
+        return undo_rename(os.getcwd())
         
     # Get files to rename
     file_filter = input(f"{Fore.YELLOW}Enter file filter (e.g., *.jpg) or leave empty for all files: {Fore.WHITE}")
     
-    files = []
-    if file_filter:
-        for file in os.listdir():
-            if os.path.isfile(file) and fnmatch.fnmatch(file, file_filter):
-                files.append(file)
-    else:
-        files = [f for f in os.listdir() if os.path.isfile(f)]
+    with os.scandir() as entries:
+        files = [entry.name for entry in entries
+                 if entry.is_file() and (not file_filter or fnmatch.fnmatch(entry.name, file_filter))]
     
     if not files:
         print(f"{Fore.RED}No matching files found!")
@@ -497,45 +1608,21 @@ def auto_rename():
     
     print(f"\n{Fore.CYAN}Found {len(files)} files to rename.")
     
-    renamed = 0
+    mapping = {}
     if choice == "1":
         pattern = input(f"{Fore.YELLOW}Enter text to replace: {Fore.WHITE}")
         replacement = input(f"{Fore.YELLOW}Enter replacement text: {Fore.WHITE}")
-        
-        for file in files:
-            if pattern in file:
-                new_name = file.replace(pattern, replacement)
-                try:
-                    os.rename(file, new_name)
-                    print(f"{Fore.GREEN}Renamed: {file} → {new_name}")
-                    renamed += 1
-                except Exception as e:
-                    print(f"{Fore.RED}Error renaming {file}: {e}")
+        mapping = {file: file.replace(pattern, replacement) for file in files if pattern in file}
     
     elif choice == "2":
         prefix = input(f"{Fore.YELLOW}Enter prefix to add: {Fore.WHITE}")
-        
-        for file in files:
-            new_name = prefix + file
-            try:
-                os.rename(file, new_name)
-                print(f"{Fore.GREEN}Renamed: {file} → {new_name}")
-                renamed += 1
-            except Exception as e:
-                print(f"{Fore.RED}Error renaming {file}: {e}")
+        mapping = {file: prefix + file for file in files}
     
     elif choice == "3":
         suffix = input(f"{Fore.YELLOW}Enter suffix to add: {Fore.WHITE}")
-        
         for file in files:
             name, ext = os.path.splitext(file)
-            new_name = name + suffix + ext
-            try:
-                os.rename(file, new_name)
-                print(f"{Fore.GREEN}Renamed: {file} → {new_name}")
-                renamed += 1
-            except Exception as e:
-                print(f"{Fore.RED}Error renaming {file}: {e}")
+            mapping[file] = name + suffix + ext
     
     elif choice == "4":
         start_num = int(input(f"{Fore.YELLOW}Enter starting number: {Fore.WHITE}"))
@@ -545,50 +1632,25 @@ def auto_rename():
         for i, file in enumerate(sorted(files), start_num):
             name, ext = os.path.splitext(file)
             if keep_name:
-                new_name = f"{i:0{padding}d}_{name}{ext}"
+                mapping[file] = f"{i:0{padding}d}_{name}{ext}"
             else:
-                new_name = f"{i:0{padding}d}{ext}"
-            try:
-                os.rename(file, new_name)
-                print(f"{Fore.GREEN}Renamed: {file} → {new_name}")
-                renamed += 1
-            except Exception as e:
-                print(f"{Fore.RED}Error renaming {file}: {e}")
+                mapping[file] = f"{i:0{padding}d}{ext}"
     
     elif choice == "5":
         case_choice = input(f"{Fore.YELLOW}Convert to (l)owercase or (u)ppercase? (l/u): {Fore.WHITE}").lower()
-        
-        for file in files:
-            if case_choice == 'l':
-                new_name = file.lower()
-            elif case_choice == 'u':
-                new_name = file.upper()
-            else:
-                print(f"{Fore.RED}Invalid choice!")
-                return 0
-                
-            if new_name != file:
-                try:
-                    os.rename(file, new_name)
-                    print(f"{Fore.GREEN}Renamed: {file} → {new_name}")
-                    renamed += 1
-                except Exception as e:
-                    print(f"{Fore.RED}Error renaming {file}: {e}")
+        if case_choice == 'l':
+            mapping = {file: file.lower() for file in files}
+        elif case_choice == 'u':
+            mapping = {file: file.upper() for file in files}
+        else:
+            print(f"{Fore.RED}Invalid choice!")
+            return 0
     
     elif choice == "6":
         replace_with = input(f"{Fore.YELLOW}Replace spaces with (leave empty to remove): {Fore.WHITE}")
-        
-        for file in files:
-            if ' ' in file:
-                new_name = file.replace(' ', replace_with)
-                try:
-                    os.rename(file, new_name)
-                    print(f"{Fore.GREEN}Renamed: {file} → {new_name}")
-                    renamed += 1
-                except Exception as e:
-                    print(f"{Fore.RED}Error renaming {file}: {e}")
+        mapping = {file: file.replace(' ', replace_with) for file in files if ' ' in file}
     
-    return renamed
+    return bulk_rename(os.getcwd(), mapping)
 
 def get_drives():
     """
@@ -699,51 +1761,702 @@ def clear_screen():
 
 def show_categories():
     """Display file categories and their associated extensions"""
-    CATEGORIES = {
-        'Images': {
-            'extensions': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'],
-            'description': 'Picture files and graphics'
-        },
-        'Documents': {
-            'extensions': ['.pdf', '.doc', '.docx', '.txt', '.xlsx', '.csv', '.rtf', '.odt'],
-            'description': 'Text and document files'
-        },
-        'Audio': {
-            'extensions': ['.mp3', '.wav', '.flac', '.m4a', '.ogg', '.aac'],
-            'description': 'Music and sound files'
-        },
-        'Video': {
-            'extensions': ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'],
-            'description': 'Movie and video files'
-        },
-        'Archives': {
-            'extensions': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2'],
-            'description': 'Compressed files and archives'
-        },
-        'Code': {
-            'extensions': ['.py', '.java', '.cpp', '.html', '.css', '.js', '.php'],
-            'description': 'Programming and script files'
-        }
-    }
-    
     try:
         print("\nFile Categories and Extensions:")
-        for category, info in CATEGORIES.items():
+        for category, info in get_category_registry()['categories'].items():
             print(f"\n{category}:")
             print(f"Description: {info['description']}")
             print(f"Extensions: {', '.join(info['extensions'])}")
+        print(f"\nFiles with unknown or missing extensions are classified by content "
+              f"({len(MAGIC_DATABASE)} known signatures)")
+        print(f"Add or override categories in {CATEGORY_CONFIG}")
         input("\nPress Enter to continue...")
     except Exception as e:
         print(f"Error displaying categories: {str(e)}")
 
-def encrypt_file(filepath: str, key: Optional[bytes] = None, key_path: Optional[str] = None) -> Optional[bytes]:
+def _encryption_aead(key: bytes, header: Dict[str, Any]):
+    """Derive the per-file AEAD cipher from a Fernet-format key and the header's salt"""
+    master = base64.urlsafe_b64decode(key.strip())
+    if len(master) != 32:
+        raise ValueError("Key must be 32 url-safe base64-encoded bytes")
+    file_key = HKDF(algorithm=hashes.SHA256(), length=32, salt=header['salt'],
+                    info=b'multitool-chunked-encryption').derive(master)
+    return ENCRYPTION_CIPHERS[header['cipher']][1](file_key)
+
+def new_encryption_header(cipher: str = ENCRYPTION_DEFAULT_CIPHER, chunk_size: int = ENCRYPTION_CHUNK_SIZE,
+                          flags: int = 0) -> Dict[str, Any]:
+    """
+    Create the header of a chunked encryption stream with a fresh salt and nonce prefix.
+
+    Args:
+        cipher (str): Cipher name from ENCRYPTION_CIPHERS
+        chunk_size (int): Plaintext bytes per chunk
+        flags (int): Format flags
+
+    Returns:
+        Dict[str, Any]: Header fields plus 'raw', the encoded header bytes
+    """
+    cipher_id = next(cid for cid, (name, _) in ENCRYPTION_CIPHERS.items() if name == cipher)
+    header = {'version': 1, 'cipher': cipher_id, 'kdf': 1, 'flags': flags, 'salt': os.urandom(16),
+              'chunk_size': chunk_size, 'nonce_prefix': os.urandom(7)}
+    header['raw'] = ENCRYPTION_HEADER.pack(ENCRYPTION_MAGIC, header['version'], header['cipher'], header['kdf'],
+                                           header['flags'], header['salt'], header['chunk_size'], header['nonce_prefix'])
+    return header
+
+def parse_encryption_header(data: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Decode the header of a chunked encryption stream.
+
+    Args:
+        data (bytes): At least ENCRYPTION_HEADER.size bytes from the start of the file
+
+    Returns:
+        Optional[Dict[str, Any]]: Header fields, or None if the data is not in this format
+    """
+    if len(data) < ENCRYPTION_HEADER.size or not data.startswith(ENCRYPTION_MAGIC):
+        return None
+    magic, version, cipher, kdf, flags, salt, chunk_size, nonce_prefix = ENCRYPTION_HEADER.unpack_from(data)
+    if version != 1 or kdf != 1 or cipher not in ENCRYPTION_CIPHERS:
+        raise ValueError(f"Unsupported encrypted file (version {version}, cipher {cipher}, kdf {kdf})")
+    return {'version': version, 'cipher': cipher, 'kdf': kdf, 'flags': flags, 'salt': salt,
+            'chunk_size': chunk_size, 'nonce_prefix': nonce_prefix, 'raw': data[:ENCRYPTION_HEADER.size]}
+
+def compress_chunk(data: bytes, codec: str) -> bytes:
+    """
+    Compress one chunk, prefixed with a codec byte (0 = stored raw).
+
+    A quick zlib probe on two small samples skips data that is already
+    compressed (media, archives, encrypted files); chunks that do not shrink
+    are stored raw as well.
+
+    Args:
+        data (bytes): Plaintext chunk
+        codec (str): 'zlib', 'lzma' or 'zstd' (see COMPRESSION_CODECS)
+
+    Returns:
+        bytes: Codec byte followed by the (possibly compressed) data
+    """
+    middle = len(data) // 2
+    sample = data[:COMPRESSION_PROBE_SIZE] + data[middle:middle + COMPRESSION_PROBE_SIZE]
+    if len(zlib.compress(sample, 1)) > len(sample) * COMPRESSION_MIN_RATIO:
+        return b'\x00' + data
+    if codec == 'lzma':
+        packed = lzma.compress(data, preset=1)
+    elif codec == 'zstd':
+        packed = zstd.ZstdCompressor(level=3).compress(data)
+    else:
+        packed = zlib.compress(data, 6)
+    if len(packed) >= len(data) * COMPRESSION_MIN_RATIO:
+        return b'\x00' + data
+    return bytes([COMPRESSION_CODECS[codec]]) + packed
+
+def decompress_chunk(payload: bytes) -> bytes:
+    """Reverse compress_chunk"""
+    codec, data = payload[0], payload[1:]
+    if codec == 0:
+        return data
+    if codec == COMPRESSION_CODECS['zlib']:
+        return zlib.decompress(data)
+    if codec == COMPRESSION_CODECS['lzma']:
+        return lzma.decompress(data)
+    if codec == COMPRESSION_CODECS['zstd']:
+        if zstd is None:
+            raise ValueError("File was compressed with zstd; install the zstandard package to read it")
+        return zstd.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown compression codec {codec}")
+
+def encrypt_chunk(aead, header: Dict[str, Any], index: int, data: bytes, final: bool = False) -> bytes:
+    """
+    Seal one chunk as a length-prefixed record.
+
+    The nonce is the header's random prefix, the chunk counter and a final
+    flag, and the header is authenticated with every chunk, so chunks cannot
+    be reordered, moved between files or dropped from the end undetected.
+    """
+    nonce = header['nonce_prefix'] + struct.pack('>IB', index, 1 if final else 0)
+    sealed = aead.encrypt(nonce, data, header['raw'])
+    return struct.pack('>I', len(sealed)) + sealed
+
+def decrypt_chunk(aead, header: Dict[str, Any], index: int, sealed: bytes, final: bool = False) -> bytes:
+    """Open a record payload sealed by encrypt_chunk (raises InvalidTag if it was tampered with)"""
+    nonce = header['nonce_prefix'] + struct.pack('>IB', index, 1 if final else 0)
+    return aead.decrypt(nonce, sealed, header['raw'])
+
+def encryption_trailer(aead, header: Dict[str, Any], chunks: int, total: int) -> bytes:
+    """Seal the final record holding the chunk count and plaintext length"""
+    return encrypt_chunk(aead, header, chunks, struct.pack('>QQ', total, chunks), final=True)
+
+def read_encrypted_records(infile, end: Optional[int] = None):
+    """Yield the sealed payloads of the length-prefixed records that follow the header (up to offset end)"""
+    position = infile.tell() if end is not None else None
+    while end is None or position < end:
+        prefix = infile.read(4)
+        if not prefix:
+            return
+        if len(prefix) < 4:
+            raise ValueError("Truncated record length")
+        length = struct.unpack('>I', prefix)[0]
+        sealed = infile.read(length)
+        if len(sealed) < length:
+            raise ValueError("Truncated record")
+        if position is not None:
+            position += 4 + length
+        yield sealed
+
+def run_chunk_pipeline(chunks, transform, write, workers: Optional[int] = None, depth: Optional[int] = None) -> None:
+    """
+    Run a reader thread -> worker pool -> ordered writer pipeline.
+
+    A reader thread pulls items from the chunks iterable into a bounded queue,
+    a thread pool applies transform to each item (the cryptography and zlib
+    primitives release the GIL, so this scales across cores), and write is
+    called in the caller's thread with the results in input order. At most
+    about 2 * depth items are buffered at any time.
+
+    Args:
+        chunks: Iterable of work items (read in the reader thread)
+        transform (callable): Applied to each item in the worker pool
+        write (callable): Called with each result, in order
+        workers (int, optional): Worker threads (defaults to CPU count)
+        depth (int, optional): Queue and in-flight limit (defaults to 4 per worker)
+    """
+    workers = workers or os.cpu_count() or 1
+    depth = depth or workers * 4
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    end = object()
+    errors = []
+
+    def put(item):
+        # Give up if the consumer has stopped, so the reader never blocks forever
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def reader():
+        try:
+            for item in chunks:
+                if not put(item):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        put(end)
+
+    def read_items():
+        while True:
+            item = items.get()
+            if item is end:
+                if errors:
+                    raise errors[0]
+                return
+            yield item
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            for result in bounded_map(executor, transform, read_items(), max_pending=depth):
+                write(result)
+    finally:
+        stop.set()
+        thread.join()
+
+def _read_chunks(infile, chunk_size: int):
+    """Yield (index, data) for consecutive chunk_size blocks of a file"""
+    index = 0
+    while True:
+        data = infile.read(chunk_size)
+        if not data:
+            return
+        yield index, data
+        index += 1
+
+def encrypt_stream(infile, outfile, key: bytes, cipher: str = ENCRYPTION_DEFAULT_CIPHER,
+                   chunk_size: int = ENCRYPTION_CHUNK_SIZE, workers: Optional[int] = None, progress=None,
+                   compression: Optional[str] = None) -> int:
+    """
+    Encrypt infile into outfile in the chunked format, sealing chunks in parallel.
+    
+    With compression set, each chunk is compressed (or stored raw if the
+    probe says it won't shrink) by the same worker that encrypts it.
+
+    Args:
+        infile: Readable binary file object
+        outfile: Writable binary file object
+        key (bytes): Fernet-format key
+        cipher (str): Cipher name from ENCRYPTION_CIPHERS
+        chunk_size (int): Plaintext bytes per chunk
+        workers (int, optional): Encryption threads (defaults to CPU count)
+        progress (tqdm, optional): Progress bar updated with plaintext bytes
+        compression (str, optional): 'zlib', 'lzma' or 'zstd' to compress before encrypting
+
+    Returns:
+        int: Number of plaintext bytes encrypted
+    """
+    if compression and compression not in COMPRESSION_CODECS:
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression == 'zstd' and zstd is None:
+        raise ValueError("zstd compression needs the zstandard package")
+    header = new_encryption_header(cipher, chunk_size, ENCRYPTION_FLAG_COMPRESSED if compression else 0)
+    aead = _encryption_aead(key, header)
+    outfile.write(header['raw'])
+    counts = [0, 0]  # chunks, plaintext bytes
+
+    def seal(item):
+        index, data = item
+        payload = compress_chunk(data, compression) if compression else data
+        return encrypt_chunk(aead, header, index, payload), len(data)
+
+    def write(result):
+        record, length = result
+        outfile.write(record)
+        counts[0] += 1
+        counts[1] += length
+        if progress:
+            progress.update(length)
+
+    run_chunk_pipeline(_read_chunks(infile, chunk_size), seal, write, workers)
+    outfile.write(encryption_trailer(aead, header, counts[0], counts[1]))
+    return counts[1]
+
+def decrypt_stream(infile, outfile, key: bytes, header: Dict[str, Any], progress=None,
+                   workers: Optional[int] = None, end: Optional[int] = None) -> int:
+    """
+    Decrypt the records of a chunked stream (positioned after the header) into outfile.
+
+    Records are opened (and decompressed) in parallel by run_chunk_pipeline.
+    The last record must be a valid trailer whose chunk count and length match
+    what was decrypted, otherwise the file was truncated or tampered with.
+    end limits reading to a stream embedded in a larger file (e.g. a vault member).
+
+    Returns:
+        int: Number of plaintext bytes written
+    """
+    aead = _encryption_aead(key, header)
+    held = []  # The reader holds one record back: the last one is the trailer
+    counts = [0, 0]  # chunks, plaintext bytes
+
+    def records():
+        for index, sealed in enumerate(read_encrypted_records(infile, end)):
+            if held:
+                yield index - 1, held.pop()
+            held.append(sealed)
+
+    def open_record(item):
+        index, sealed = item
+        try:
+            data = decrypt_chunk(aead, header, index, sealed)
+            return decompress_chunk(data) if header['flags'] & ENCRYPTION_FLAG_COMPRESSED else data
+        except InvalidTag:
+            raise ValueError(f"Chunk {index} failed authentication (wrong key or modified file)")
+
+    def write(data):
+        outfile.write(data)
+        counts[0] += 1
+        counts[1] += len(data)
+        if progress:
+            progress.update(len(data))
+
+    run_chunk_pipeline(records(), open_record, write, workers)
+    if not held:
+        raise ValueError("Missing trailer (file is truncated)")
+    try:
+        trailer = decrypt_chunk(aead, header, counts[0], held[0], final=True)
+    except InvalidTag:
+        raise ValueError("Missing or invalid trailer (file is truncated or was modified)")
+    if struct.unpack('>QQ', trailer) != (counts[1], counts[0]):
+        raise ValueError("Trailer does not match the decrypted data")
+    return counts[1]
+
+def benchmark_encryption(size_mb: int = 256, max_workers: Optional[int] = None,
+                         cipher: str = ENCRYPTION_DEFAULT_CIPHER) -> List[Tuple[int, float, float]]:
+    """
+    Measure chunked encryption and decryption throughput for 1..max_workers threads.
+
+    Works on an in-memory buffer so the numbers show the CPU side of the
+    pipeline independent of disk speed.
+
+    Args:
+        size_mb (int): Size of the test buffer in MB
+        max_workers (int, optional): Highest worker count to test (defaults to CPU count)
+        cipher (str): Cipher name from ENCRYPTION_CIPHERS
+
+    Returns:
+        List[Tuple[int, float, float]]: (workers, encrypt GB/s, decrypt GB/s) per worker count
+    """
+    data = os.urandom(size_mb * 1024 * 1024)
+    key = Fernet.generate_key()
+    results = []
+    with open(os.devnull, 'wb') as null:
+        for workers in range(1, (max_workers or os.cpu_count() or 1) + 1):
+            encrypted = io.BytesIO()
+            start = time.perf_counter()
+            encrypt_stream(io.BytesIO(data), encrypted, key, cipher, workers=workers)
+            encrypt_rate = len(data) / (time.perf_counter() - start) / 1024 ** 3
+            encrypted.seek(0)
+            header = parse_encryption_header(encrypted.read(ENCRYPTION_HEADER.size))
+            start = time.perf_counter()
+            decrypt_stream(encrypted, null, key, header, workers=workers)
+            decrypt_rate = len(data) / (time.perf_counter() - start) / 1024 ** 3
+            results.append((workers, encrypt_rate, decrypt_rate))
+            print(f"{Fore.WHITE}{workers:>3} workers: encrypt {encrypt_rate:.2f} GB/s, decrypt {decrypt_rate:.2f} GB/s")
+    return results
+
+def _vault_sources(paths: List[str], vault_path: Optional[str] = None):
+    """
+    Expand files and directories into (member name, path) pairs; directories keep their own name as a prefix.
+    The vault itself is skipped, so packing the directory that contains it does not read it into itself.
+    """
+    vault_path = os.path.normcase(os.path.abspath(vault_path)) if vault_path else None
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            base = os.path.dirname(path)
+            for filepath in sorted(iter_files(path)):
+                if os.path.normcase(filepath) != vault_path:
+                    yield os.path.relpath(filepath, base).replace(os.sep, '/'), filepath
+        elif os.path.isfile(path) and os.path.normcase(path) != vault_path:
+            yield os.path.basename(path), path
+
+def _safe_member_path(output_dir: str, name: str) -> str:
+    """Resolve a member name below output_dir, rejecting absolute paths and '..' components"""
+    parts = [part for part in name.split('/') if part not in ('', '.')]
+    if not parts or '..' in parts or os.path.isabs(name) or ':' in parts[0]:
+        raise ValueError(f"Unsafe member name: {name}")
+    return os.path.join(output_dir, *parts)
+
+def read_vault_index(vault_path: str, key: bytes) -> List[Dict[str, Any]]:
+    """
+    Decrypt and return the member index of a vault.
+
+    Args:
+        vault_path (str): Vault file
+        key (bytes): Fernet-format key
+
+    Returns:
+        List[Dict[str, Any]]: Members with 'name', 'offset', 'length', 'size' and 'mtime'
+    """
+    with open(vault_path, 'rb') as f:
+        if f.read(len(VAULT_MAGIC)) != VAULT_MAGIC:
+            raise ValueError("Not a Multitool vault")
+        f.seek(-VAULT_FOOTER.size, os.SEEK_END)
+        magic, version, index_offset, index_length = VAULT_FOOTER.unpack(f.read(VAULT_FOOTER.size))
+        if magic != VAULT_FOOTER_MAGIC or version != 1:
+            raise ValueError("Vault footer is missing or damaged (interrupted write?)")
+        f.seek(index_offset)
+        header = parse_encryption_header(f.read(ENCRYPTION_HEADER.size))
+        index = io.BytesIO()
+        decrypt_stream(f, index, key, header, workers=1, end=index_offset + index_length)
+    return json.loads(index.getvalue().decode('utf-8'))
+
+def add_to_vault(vault_path: str, paths: List[str], key: bytes, workers: Optional[int] = None,
+                 compression: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Stream files and directories into an encrypted vault, creating it if needed.
+
+    Every member is an independent chunked AEAD stream (see encrypt_file), followed
+    by an encrypted JSON index and a small footer pointing at it. Appending writes
+    the new members, a new index and a new footer after the existing data, so the
+    archive is never rewritten; the superseded index is left as dead space, and an
+    interrupted append is rolled back by truncating to the previous size (a vault
+    created by the failed call is removed instead). Small
+    files are read and encrypted in parallel through run_chunk_pipeline, large
+    files are streamed with their chunks encrypted in parallel.
+
+    Args:
+        vault_path (str): Vault file
+        paths (List[str]): Files and directories to add (members with an existing name replace it)
+        key (bytes): Fernet-format key
+        workers (int, optional): Encryption threads (defaults to CPU count)
+        compression (str, optional): 'zlib', 'lzma' or 'zstd' to compress members before encrypting
+
+    Returns:
+        Dict[str, Any]: 'added', 'bytes', 'members', 'seconds' and 'mb_per_s'
+    """
+    members = {}
+    created = not os.path.exists(vault_path)
+    if created:
+        with open(vault_path, 'wb') as f:
+            f.write(VAULT_MAGIC)
+    else:
+        members = {member['name']: member for member in read_vault_index(vault_path, key)}
+    original_size = os.path.getsize(vault_path)
+    summary = {'added': 0, 'bytes': 0}
+    start = time.time()
+
+    def seal_member(source):
+        name, path = source
+        st = os.stat(path)
+        if st.st_size > VAULT_SMALL_FILE:
+            return name, path, st, None  # streamed by the writer
+        with open(path, 'rb') as infile:
+            sealed = io.BytesIO()
+            encrypt_stream(infile, sealed, key, workers=1, compression=compression)
+        return name, path, st, sealed.getvalue()
+
+    try:
+        with open(vault_path, 'r+b') as f, tqdm(desc="Packing", unit="file") as progress:
+            f.seek(0, os.SEEK_END)
+
+            def write_member(result):
+                name, path, st, sealed = result
+                offset = f.tell()
+                if sealed is None:
+                    with open(path, 'rb') as infile:
+                        encrypt_stream(infile, f, key, workers=workers, compression=compression)
+                else:
+                    f.write(sealed)
+                members[name] = {'name': name, 'offset': offset, 'length': f.tell() - offset,
+                                 'size': st.st_size, 'mtime': st.st_mtime}
+                summary['added'] += 1
+                summary['bytes'] += st.st_size
+                progress.update(1)
+
+            run_chunk_pipeline(_vault_sources(paths, vault_path), seal_member, write_member, workers)
+
+            index_offset = f.tell()
+            encrypt_stream(io.BytesIO(json.dumps(list(members.values())).encode('utf-8')), f, key, workers=1)
+            f.write(VAULT_FOOTER.pack(VAULT_FOOTER_MAGIC, 1, index_offset, f.tell() - index_offset))
+    except BaseException:
+        # Roll back to the previous index and footer; a stub without a footer could never be opened again
+        if created:
+            os.remove(vault_path)
+        else:
+            with open(vault_path, 'r+b') as f:
+                f.truncate(original_size)
+        raise
+
+    summary['members'] = len(members)
+    summary['seconds'] = time.time() - start
+    summary['mb_per_s'] = summary['bytes'] / (1024 * 1024) / max(summary['seconds'], 1e-6)
+    return summary
+
+def extract_from_vault(vault_path: str, key: bytes, output_dir: str, names: Optional[List[str]] = None,
+                       workers: Optional[int] = None) -> int:
+    """
+    Extract members of a vault, decrypting only the requested ones.
+
+    Args:
+        vault_path (str): Vault file
+        key (bytes): Fernet-format key
+        output_dir (str): Directory to extract into
+        names (List[str], optional): Member names or glob patterns (all members if None)
+        workers (int, optional): Decryption threads per member
+
+    Returns:
+        int: Number of members extracted
+    """
+    members = read_vault_index(vault_path, key)
+    if names:
+        members = [m for m in members if any(fnmatch.fnmatch(m['name'], pattern) for pattern in names)]
+    extracted = 0
+    with open(vault_path, 'rb') as f:
+        for member in tqdm(members, desc="Extracting", unit="file"):
+            output_path = _safe_member_path(output_dir, member['name'])
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            f.seek(member['offset'])
+            header = parse_encryption_header(f.read(ENCRYPTION_HEADER.size))
+            with open(output_path, 'wb') as outfile:
+                decrypt_stream(f, outfile, key, header, workers=workers, end=member['offset'] + member['length'])
+            os.utime(output_path, (member['mtime'], member['mtime']))
+            extracted += 1
+    return extracted
+
+class EncryptedFileReader(io.RawIOBase):
+    """
+    Seekable, read-only file object over a file written by encrypt_file.
+
+    Only the chunks covering the requested byte range are decrypted; the most
+    recently used ones are kept in a small LRU cache. Record offsets come from
+    the fixed record size of uncompressed files, or from hopping over the
+    length prefixes of compressed ones, so opening never decrypts the data.
+    The trailer is authenticated on open, so truncated files are rejected.
+    Wrap it in io.BufferedReader / io.TextIOWrapper for line-oriented reading.
+    """
+
+    def __init__(self, filepath: str, key: bytes, cache_chunks: int = ENCRYPTED_READER_CACHE):
+        super().__init__()
+        self._file = open(filepath, 'rb')
+        try:
+            self._header = parse_encryption_header(self._file.read(ENCRYPTION_HEADER.size))
+            if not self._header:
+                raise ValueError("Not a chunked encrypted file (files from older versions must be decrypted first)")
+            self._aead = _encryption_aead(key, self._header)
+            self._records = self._record_table(os.fstat(self._file.fileno()).st_size)
+            trailer_offset, trailer_length = self._records.pop()
+            self._file.seek(trailer_offset + 4)
+            try:
+                trailer = decrypt_chunk(self._aead, self._header, len(self._records),
+                                        self._file.read(trailer_length), final=True)
+            except InvalidTag:
+                raise ValueError("Missing or invalid trailer (wrong key, or the file is truncated or was modified)")
+            self._size, chunks = struct.unpack('>QQ', trailer)
+            if chunks != len(self._records):
+                raise ValueError("Trailer does not match the file layout")
+        except BaseException:
+            self._file.close()
+            raise
+        self._cache = collections.OrderedDict()
+        self._cache_chunks = cache_chunks
+        self._position = 0
+
+    def _record_table(self, file_size: int) -> List[Tuple[int, int]]:
+        """Return (offset, length) of every record, trailer last"""
+        start = ENCRYPTION_HEADER.size
+        if not self._header['flags'] & ENCRYPTION_FLAG_COMPRESSED:
+            # Every record except the last data chunk and the trailer has the same size
+            full = 4 + self._header['chunk_size'] + 16
+            trailer = 4 + 16 + 16
+            body = file_size - start - trailer
+            count, remainder = divmod(body, full)
+            records = [(start + i * full, full - 4) for i in range(count)]
+            if remainder:
+                records.append((start + count * full, remainder - 4))
+            records.append((file_size - trailer, trailer - 4))
+            return records
+        records = []
+        position = start
+        while position < file_size:
+            self._file.seek(position)
+            prefix = self._file.read(4)
+            if len(prefix) < 4:
+                raise ValueError("Truncated record length")
+            length = struct.unpack('>I', prefix)[0]
+            records.append((position, length))
+            position += 4 + length
+        if position != file_size or not records:
+            raise ValueError("Truncated record")
+        return records
+
+    def _chunk(self, index: int) -> bytes:
+        """Decrypt (or fetch from the LRU cache) one plaintext chunk"""
+        data = self._cache.get(index)
+        if data is not None:
+            self._cache.move_to_end(index)
+            return data
+        offset, length = self._records[index]
+        self._file.seek(offset + 4)
+        try:
+            data = decrypt_chunk(self._aead, self._header, index, self._file.read(length))
+        except InvalidTag:
+            raise ValueError(f"Chunk {index} failed authentication (wrong key or modified file)")
+        if self._header['flags'] & ENCRYPTION_FLAG_COMPRESSED:
+            data = decompress_chunk(data)
+        self._cache[index] = data
+        if len(self._cache) > self._cache_chunks:
+            self._cache.popitem(last=False)
+        return data
+
+    @property
+    def size(self) -> int:
+        """Plaintext size in bytes"""
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError("Negative seek position")
+        self._position = offset
+        return offset
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast('B')
+        wanted = min(len(view), max(0, self._size - self._position))
+        done = 0
+        chunk_size = self._header['chunk_size']
+        while done < wanted:
+            index, start = divmod(self._position, chunk_size)
+            data = self._chunk(index)
+            count = min(wanted - done, len(data) - start)
+            view[done:done + count] = data[start:start + count]
+            done += count
+            self._position += count
+        return done
+
+    def close(self) -> None:
+        if not self.closed:
+            self._file.close()
+            self._cache.clear()
+        super().close()
+
+def is_encrypted_file(filepath: str) -> bool:
+    """Check whether a file starts with the chunked encryption header"""
+    try:
+        with open(filepath, 'rb') as f:
+            return f.read(len(ENCRYPTION_MAGIC)) == ENCRYPTION_MAGIC
+    except OSError:
+        return False
+
+def open_encrypted(filepath: str, key: bytes, mode: str = 'rb', encoding: str = 'utf-8'):
+    """
+    Open an encrypted file for reading without decrypting it to disk.
+
+    Args:
+        filepath (str): File written by encrypt_file
+        key (bytes): Fernet-format key
+        mode (str): 'rb' for a buffered binary reader, 'r' for text
+        encoding (str): Text encoding for mode 'r' (undecodable bytes are ignored)
+
+    Returns:
+        io.BufferedReader or io.TextIOWrapper over an EncryptedFileReader
+    """
+    reader = io.BufferedReader(EncryptedFileReader(filepath, key))
+    if 'b' in mode:
+        return reader
+    return io.TextIOWrapper(reader, encoding=encoding, errors='ignore')
+
+def _legacy_token_length(plain_length: int) -> int:
+    """Length of a Fernet token for a plaintext of plain_length bytes"""
+    raw = 1 + 8 + 16 + (plain_length // 16 + 1) * 16 + 32  # version, timestamp, IV, padded AES-CBC, HMAC
+    return 4 * ((raw + 2) // 3)
+
+def _decrypt_legacy_stream(infile, outfile, key: bytes) -> int:
+    """Decrypt the old format: concatenated Fernet tokens, one per CHUNK_SIZE bytes of plaintext"""
+    f = Fernet(key)
+    token_length = _legacy_token_length(CHUNK_SIZE)
+    total = 0
+    while True:
+        token = infile.read(token_length)
+        if not token:
+            return total
+        data = f.decrypt(token)
+        outfile.write(data)
+        total += len(data)
+
+def encrypt_file(filepath: str, key: Optional[bytes] = None, key_path: Optional[str] = None,
+                 cipher: str = ENCRYPTION_DEFAULT_CIPHER, workers: Optional[int] = None,
+                 compression: Optional[str] = None) -> Optional[bytes]:
     """
-    Encrypt a file using Fernet symmetric encryption with progress reporting.
+    Encrypt a file into the chunked AEAD format with progress reporting.
+    
+    The output is a header (cipher, HKDF salt, chunk size, nonce prefix), then
+    one length-prefixed AES-GCM or ChaCha20-Poly1305 record per chunk, then an
+    authenticated trailer with the chunk count and plaintext length. The
+    overhead is 20 bytes per 1MB chunk, and chunks can be decrypted on their own.
     
     Args:
         filepath (str): Path to the file to encrypt
         key (bytes, optional): Encryption key to use. If None, a new key is generated.
         key_path (str, optional): Path to save the encryption key. If None, saves to current directory.
+        cipher (str): 'AES-256-GCM' or 'ChaCha20-Poly1305'
+        workers (int, optional): Encryption threads (defaults to CPU count)
+        compression (str, optional): 'zlib', 'lzma' or 'zstd' to compress chunks before encrypting
         
     Returns:
         Optional[bytes]: The encryption key used or None if error
@@ -778,30 +2491,17 @@ def encrypt_file(filepath: str, key: Optional[bytes] = None, key_path: Optional[
                 print(f"{Fore.RED}Warning: Could not save key file: {str(e)}")
                 print(f"{Fore.YELLOW}Key: {key.decode()}")
         
-        # Create Fernet cipher
-        f = Fernet(key)
-        
         # Get file size for progress reporting
         file_size = os.path.getsize(filepath)
         output_file = filepath + '.encrypted'
         
-        # Read file in chunks to handle large files
-        with open(filepath, 'rb') as infile, open(output_file, 'wb') as outfile:
-            processed = 0
-            
-            while True:
-                chunk = infile.read(CHUNK_SIZE)
-                if not chunk:
-                    break
-                    
-                encrypted_chunk = f.encrypt(chunk)
-                outfile.write(encrypted_chunk)
-                
-                processed += len(chunk)
-                progress = (processed / file_size) * 100
-                print(f"Encrypting: {progress:.1f}% complete\r", end="")
+        # Keys stay in Fernet format; each file gets its own key derived from a random salt.
+        # Chunks are read, sealed on all cores and written in order by the pipeline.
+        with open(filepath, 'rb') as infile, open(output_file, 'wb') as outfile, \
+                tqdm(total=file_size, desc="Encrypting", unit="B", unit_scale=True) as progress:
+            encrypt_stream(infile, outfile, key, cipher, workers=workers, progress=progress, compression=compression)
                 
-        print(f"\n{Fore.GREEN}File encrypted successfully: {output_file}")
+        print(f"{Fore.GREEN}File encrypted successfully: {output_file}")
         
         # Ask if user wants to delete the original file
         if input(f"{Fore.YELLOW}Delete original file? (y/n): {Fore.WHITE}").lower() == 'y':
@@ -817,14 +2517,19 @@ def encrypt_file(filepath: str, key: Optional[bytes] = None, key_path: Optional[
         print(f"{Fore.RED}Error encrypting file: {str(e)}")
         return None
 
-def decrypt_file(filepath, key, output_path=None):
+def decrypt_file(filepath, key, output_path=None, workers=None):
     """
-    Decrypt a file that was encrypted with Fernet.
+    Decrypt a file encrypted by encrypt_file.
+    
+    Both the chunked AEAD format and the older format of concatenated Fernet
+    tokens are accepted. Any authentication failure, truncation or trailer
+    mismatch removes the partial output.
     
     Args:
         filepath (str): Path to the encrypted file
         key (bytes): Decryption key
         output_path (str, optional): Custom output path for decrypted file
+        workers (int, optional): Decryption threads (defaults to CPU count)
         
     Returns:
         bool: True if decryption was successful, False otherwise
@@ -834,9 +2539,6 @@ def decrypt_file(filepath, key, output_path=None):
             print(f"{Fore.RED}File not found: {filepath}")
             return False
             
-        # Create Fernet cipher
-        f = Fernet(key)
-        
         # Determine output filename
         if output_path:
             output_file = output_path
@@ -845,18 +2547,19 @@ def decrypt_file(filepath, key, output_path=None):
         
         # Read and decrypt in chunks
         with open(filepath, 'rb') as infile, open(output_file, 'wb') as outfile:
-            chunk_size = 64 * 1024  # 64KB chunks
-            while True:
-                chunk = infile.read(chunk_size)
-                if not chunk:
-                    break
-                try:
-                    decrypted_chunk = f.decrypt(chunk)
-                    outfile.write(decrypted_chunk)
-                except Exception as e:
-                    print(f"{Fore.RED}Decryption failed: {str(e)}")
-                    os.remove(output_file)  # Clean up partial file
-                    return False
+            try:
+                header = parse_encryption_header(infile.read(ENCRYPTION_HEADER.size))
+                if header:
+                    with tqdm(total=os.path.getsize(filepath), desc="Decrypting", unit="B", unit_scale=True) as progress:
+                        decrypt_stream(infile, outfile, key, header, progress, workers)
+                else:
+                    infile.seek(0)
+                    _decrypt_legacy_stream(infile, outfile, key)
+            except Exception as e:
+                outfile.close()
+                print(f"{Fore.RED}Decryption failed: {str(e) or type(e).__name__}")
+                os.remove(output_file)  # Clean up partial file
+                return False
                     
         print(f"{Fore.GREEN}File decrypted successfully: {output_file}")
         return True
@@ -865,99 +2568,482 @@ def decrypt_file(filepath, key, output_path=None):
         print(f"{Fore.RED}Error decrypting file: {str(e)}")
         return False
 
-def verify_file_integrity(filepath: str) -> Tuple[bool, str]:
+def validate_png(filepath: str) -> Tuple[bool, str]:
     """
-    Verify the integrity of a file by checking its structure and content.
-    Enhanced with more file formats and detailed checks.
-    
+    Stream-validate a PNG file: signature, chunk layout and every chunk CRC.
+
     Args:
-        filepath (str): Path to the file to verify
-        
+        filepath (str): Path to the PNG file
+
+    Returns:
+        Tuple[bool, str]: Success status and message
+    """
+    with open(filepath, 'rb') as f:
+        if f.read(8) != b'\x89PNG\r\n\x1a\n':
+            return False, "Invalid PNG signature"
+        chunks = 0
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return False, "PNG truncated before IEND chunk"
+            length, chunk_type = struct.unpack('>I4s', header)
+            if chunks == 0 and chunk_type != b'IHDR':
+                return False, "PNG does not start with an IHDR chunk"
+            crc = zlib.crc32(chunk_type)
+            remaining = length
+            while remaining:
+                data = f.read(min(remaining, CHUNK_SIZE))
+                if not data:
+                    return False, f"PNG truncated inside {chunk_type.decode('latin-1')} chunk"
+                crc = zlib.crc32(data, crc)
+                remaining -= len(data)
+            stored = f.read(4)
+            if len(stored) < 4 or struct.unpack('>I', stored)[0] != crc:
+                return False, f"CRC mismatch in PNG chunk {chunks} ({chunk_type.decode('latin-1')})"
+            chunks += 1
+            if chunk_type == b'IEND':
+                return True, f"PNG structure valid ({chunks} chunks, all CRCs match)"
+
+def validate_zip(filepath: str, workers: int = MAX_WORKERS) -> Tuple[bool, str]:
+    """
+    Validate every ZIP member's CRC by streaming decompression across threads.
+
+    Each thread opens its own handle on the archive; zlib releases the GIL while
+    inflating, so members are checked in parallel in bounded memory.
+
+    Args:
+        filepath (str): Path to the ZIP archive
+        workers (int): Number of validation threads
+
     Returns:
         Tuple[bool, str]: Success status and message
     """
+    import zipfile
     try:
-        # Extended magic numbers dictionary with more file formats
-        MAGIC_NUMBERS = {
-            # Images
-            '.jpg': (b'\xFF\xD8\xFF', 3),
-            '.jpeg': (b'\xFF\xD8\xFF', 3),
-            '.png': (b'\x89PNG\r\n\x1A\n', 8),
-            '.gif': (b'GIF8', 4),
-            '.bmp': (b'BM', 2),
-            '.webp': (b'RIFF', 4),
-            '.tiff': (b'\x49\x49\x2A\x00', 4),
-            
-            # Documents
-            '.pdf': (b'%PDF', 4),
-            '.docx': (b'PK\x03\x04', 4),
-            '.xlsx': (b'PK\x03\x04', 4),
-            '.pptx': (b'PK\x03\x04', 4),
-            
-            # Archives
-            '.zip': (b'PK\x03\x04', 4),
-            '.rar': (b'Rar!\x1A\x07', 6),
-            '.7z': (b'7z\xBC\xAF\x27\x1C', 6),
-            '.gz': (b'\x1F\x8B\x08', 3),
-            '.tar': (b'ustar', 5),
-            
-            # Audio/Video
-            '.mp3': (b'ID3', 3),
-            '.mp4': (b'ftyp', 4),
-            '.avi': (b'RIFF', 4),
-            '.wav': (b'RIFF', 4),
-            '.flac': (b'fLaC', 4),
-            
-            # Executables
-            '.exe': (b'MZ', 2),
-            '.dll': (b'MZ', 2),
-            
-            # Other
-            '.xml': (b'<?xml', 5),
-            '.html': (b'<!DOC', 5),
-            '.json': (b'{', 1)
-        }
-        
-        # Check if file exists
-        if not os.path.exists(filepath):
-            return False, "File does not exist"
-            
-        # Get file size
-        file_size = os.path.getsize(filepath)
-            
-        # Check if file is empty
-        if file_size == 0:
-            return False, "File is empty"
-            
-        # Check file permissions
-        if not os.access(filepath, os.R_OK):
-            return False, "File is not readable (permission denied)"
-            
-        # Check file header (magic numbers)
-        ext = os.path.splitext(filepath)[1].lower()
-        if ext in MAGIC_NUMBERS:
-            magic, length = MAGIC_NUMBERS[ext]
-            with open(filepath, 'rb') as f:
-                file_start = f.read(length)
-                if not file_start.startswith(magic):
-                    return False, f"Invalid file header for {ext} format"
-        
-        # Calculate file hash for integrity check
-        file_hash = get_file_hash(filepath, 'sha256')
-        if not file_hash:
-            return False, "Could not calculate file hash"
-            
-        # Try to read the entire file to check for read errors
-        try:
-            with open(filepath, 'rb') as f:
-                # Read in chunks to handle large files
-                processed = 0
-                while True:
-                    chunk = f.read(CHUNK_SIZE)
-                    if not chunk:
-                        break
-                    processed += len(chunk)
-                    
+        with zipfile.ZipFile(filepath) as zf:
+            members = [info for info in zf.infolist() if not info.is_dir()]
+    except zipfile.BadZipFile as e:
+        return False, f"Not a valid ZIP archive: {str(e)}"
+
+    encrypted = [info for info in members if info.flag_bits & 0x1]
+    members = [info for info in members if not info.flag_bits & 0x1]
+
+    def check_members(batch):
+        with zipfile.ZipFile(filepath) as zf:
+            for info in batch:
+                try:
+                    with zf.open(info) as member:
+                        while member.read(CHUNK_SIZE):
+                            pass
+                except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError) as e:
+                    return f"ZIP member {info.filename} is corrupted: {str(e)}"
+        return None
+
+    # Interleave members so large and small ones are spread across threads
+    batches = [members[i::workers] for i in range(workers) if members[i::workers]]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for error in executor.map(check_members, batches):
+            if error:
+                return False, error
+    note = f", {len(encrypted)} encrypted members skipped" if encrypted else ""
+    return True, f"ZIP structure valid ({len(members)} members, all CRCs match{note})"
+
+def validate_gzip(filepath: str) -> Tuple[bool, str]:
+    """
+    Stream-validate every member of a gzip file against its CRC32 and ISIZE trailer.
+
+    Args:
+        filepath (str): Path to the gzip file
+
+    Returns:
+        Tuple[bool, str]: Success status and message
+    """
+    with open(filepath, 'rb') as f:
+        buf = b''
+        members = 0
+
+        def fill(n):
+            nonlocal buf
+            while len(buf) < n:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    return False
+                buf += data
+            return True
+
+        while fill(1):
+            if not fill(10) or buf[:3] != b'\x1f\x8b\x08':
+                # Zero padding after the last member is allowed, anything else is not
+                if members and not buf.strip(b'\x00'):
+                    data = f.read(CHUNK_SIZE)
+                    while data and not data.strip(b'\x00'):
+                        data = f.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                return False, f"Invalid gzip header for member {members + 1}"
+            flags = buf[3]
+            pos = 10
+            if flags & 0x04:  # FEXTRA
+                if not fill(pos + 2):
+                    return False, "gzip header truncated"
+                pos += 2 + struct.unpack('<H', buf[pos:pos + 2])[0]
+            for flag in (0x08, 0x10):  # FNAME, FCOMMENT (zero-terminated)
+                if flags & flag:
+                    while buf.find(b'\x00', pos) == -1:
+                        if not fill(len(buf) + 1):
+                            return False, "gzip header truncated"
+                    pos = buf.index(b'\x00', pos) + 1
+            if flags & 0x02:  # FHCRC
+                pos += 2
+            if not fill(pos):
+                return False, "gzip header truncated"
+
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            data, buf = buf[pos:], b''
+            crc = size = 0
+            try:
+                while True:
+                    out = decompressor.decompress(data, CHUNK_SIZE * 4)
+                    while out:
+                        crc = zlib.crc32(out, crc)
+                        size += len(out)
+                        if decompressor.eof:
+                            break
+                        out = decompressor.decompress(decompressor.unconsumed_tail, CHUNK_SIZE * 4)
+                    if decompressor.eof:
+                        buf = decompressor.unused_data
+                        break
+                    data = f.read(CHUNK_SIZE)
+                    if not data:
+                        return False, f"gzip member {members + 1} is truncated"
+            except zlib.error as e:
+                return False, f"gzip member {members + 1} is corrupted: {str(e)}"
+
+            if not fill(8):
+                return False, f"gzip member {members + 1} is missing its trailer"
+            stored_crc, stored_size = struct.unpack('<II', buf[:8])
+            buf = buf[8:]
+            if stored_crc != crc:
+                return False, f"CRC32 mismatch in gzip member {members + 1}"
+            if stored_size != size & 0xFFFFFFFF:
+                return False, f"ISIZE mismatch in gzip member {members + 1}"
+            members += 1
+
+    if not members:
+        return False, "gzip file contains no members"
+    return True, f"gzip structure valid ({members} members, CRC32 and ISIZE match)"
+
+def validate_jpeg(filepath: str) -> Tuple[bool, str]:
+    """
+    Stream-validate the JPEG marker sequence from SOI to EOI without decoding pixels.
+
+    Args:
+        filepath (str): Path to the JPEG file
+
+    Returns:
+        Tuple[bool, str]: Success status and message
+    """
+    def skip_scan_data(f):
+        # Find the first real marker after entropy-coded data (ignoring FF00 stuffing and RSTn)
+        pending_ff = False
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return None
+            idx = -1 if pending_ff else chunk.find(b'\xff')
+            while pending_ff or idx != -1:
+                if pending_ff:
+                    pending_ff = False
+                    pos = 0
+                elif idx + 1 < len(chunk):
+                    pos = idx + 1
+                else:
+                    pending_ff = True
+                    break
+                marker = chunk[pos]
+                if marker == 0x00 or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+                    idx = chunk.find(b'\xff', pos if marker == 0xFF else pos + 1)
+                    continue
+                f.seek(pos + 1 - len(chunk), 1)
+                return marker
+
+    with open(filepath, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return False, "Missing JPEG SOI marker"
+        segments = 0
+        seen_frame = False
+        marker = None
+        while True:
+            if marker is None:
+                byte = f.read(1)
+                if byte != b'\xff':
+                    return False, f"Expected JPEG marker after segment {segments}"
+                while byte == b'\xff':  # Fill bytes
+                    byte = f.read(1)
+                if not byte:
+                    return False, "JPEG truncated before EOI marker"
+                marker = byte[0]
+
+            if marker == 0xD9:
+                break
+            if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+                marker = None
+                continue
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                return False, "JPEG truncated inside segment header"
+            length = struct.unpack('>H', length_bytes)[0]
+            if length < 2:
+                return False, f"Invalid JPEG segment length {length}"
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                seen_frame = True
+            f.seek(length - 2, 1)
+            segments += 1
+            if marker == 0xDA:
+                if not seen_frame:
+                    return False, "JPEG scan starts before any frame header"
+                marker = skip_scan_data(f)
+                if marker is None:
+                    return False, "JPEG truncated inside scan data (no EOI marker)"
+            else:
+                marker = None
+
+    if not seen_frame:
+        return False, "JPEG has no frame header"
+    return True, f"JPEG marker sequence valid ({segments} segments)"
+
+def validate_pdf(filepath: str) -> Tuple[bool, str]:
+    """
+    Validate a PDF's header, trailer and that startxref points at a cross-reference table.
+
+    Args:
+        filepath (str): Path to the PDF file
+
+    Returns:
+        Tuple[bool, str]: Success status and message
+    """
+    size = os.path.getsize(filepath)
+    with open(filepath, 'rb') as f:
+        if b'%PDF-' not in f.read(1024):
+            return False, "Missing %PDF header"
+        f.seek(max(0, size - 2048))
+        tail = f.read()
+        if b'%%EOF' not in tail:
+            return False, "PDF truncated (no %%EOF marker)"
+        matches = re.findall(rb'startxref\s+(\d+)', tail)
+        if not matches:
+            return False, "PDF trailer has no startxref"
+        offset = int(matches[-1])
+        if offset >= size:
+            return False, f"startxref offset {offset} is beyond end of file"
+        f.seek(offset)
+        head = f.read(64).lstrip()
+        if head.startswith(b'xref') or re.match(rb'\d+\s+\d+\s+obj', head):
+            return True, "PDF structure valid (cross-reference table found)"
+    return False, f"No cross-reference table at startxref offset {offset}"
+
+# Deep structural validators by extension (used by verify_file_integrity)
+FORMAT_VALIDATORS = {
+    '.png': validate_png,
+    '.zip': validate_zip, '.docx': validate_zip, '.xlsx': validate_zip, '.pptx': validate_zip,
+    '.jar': validate_zip, '.odt': validate_zip,
+    '.gz': validate_gzip, '.tgz': validate_gzip,
+    '.jpg': validate_jpeg, '.jpeg': validate_jpeg,
+    '.pdf': validate_pdf,
+}
+
+_magic_trie = None
+
+def _get_magic_trie():
+    """Build (once per process) a prefix trie over MAGIC_DATABASE for every signature offset"""
+    global _magic_trie
+    if _magic_trie is None:
+        tries = {}
+        for entry in MAGIC_DATABASE:
+            offset, first = entry['magic'][0]
+            node = tries.setdefault(offset, {})
+            for byte in first:
+                node = node.setdefault(byte, {})
+            node.setdefault(None, []).append(entry)
+        _magic_trie = sorted(tries.items())
+    return _magic_trie
+
+def sniff_bytes(header: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Identify a file format from the first bytes of its content.
+
+    The header is walked through one prefix trie per signature offset, so the
+    cost depends on the length of the matching signatures rather than on the
+    size of MAGIC_DATABASE. The most specific (longest) match wins.
+
+    Args:
+        header (bytes): Start of the file (SNIFF_HEADER_SIZE bytes are enough)
+
+    Returns:
+        Optional[Dict[str, Any]]: Matching MAGIC_DATABASE entry, or None if unknown
+    """
+    best, best_length = None, 0
+    for offset, node in _get_magic_trie():
+        for byte in header[offset:]:
+            node = node.get(byte)
+            if node is None:
+                break
+            for entry in node.get(None, ()):
+                length = sum(len(magic) for _, magic in entry['magic'])
+                if length > best_length and all(header[o:o + len(magic)] == magic for o, magic in entry['magic'][1:]):
+                    best, best_length = entry, length
+    return best
+
+@functools.lru_cache(maxsize=4096)
+def _sniff_cached(path: str, size: int, mtime_ns: int) -> Optional[Dict[str, Any]]:
+    """Sniff a file's header; cached on (path, size, mtime) so a changed file is re-read"""
+    with open(path, 'rb') as f:
+        return sniff_bytes(f.read(SNIFF_HEADER_SIZE))
+
+def sniff_file_type(filepath: str) -> Optional[Dict[str, Any]]:
+    """
+    Identify a file by its content with one small header read.
+
+    Results are cached per (path, size, mtime), so the integrity, organize,
+    preview and scan tools share a single read of each header.
+
+    Args:
+        filepath (str): File to identify
+
+    Returns:
+        Optional[Dict[str, Any]]: MAGIC_DATABASE entry with 'name', 'mime' and
+        'extensions', or None if the content is unknown or unreadable
+    """
+    try:
+        st = os.stat(filepath)
+        return _sniff_cached(os.path.abspath(filepath), st.st_size, st.st_mtime_ns)
+    except OSError:
+        return None
+
+def _check_pe_header(f, header: bytes) -> bool:
+    """Check that an MZ stub points (via e_lfanew) at a PE signature"""
+    if len(header) < 0x40:
+        return False
+    f.seek(struct.unpack_from('<I', header, 0x3C)[0])
+    return f.read(4) == b'PE\0\0'
+
+def _check_atom_size(f, header: bytes) -> bool:
+    """Check that a leading QuickTime atom's size fits the file (text starting '....free' does not)"""
+    size = struct.unpack_from('>I', header)[0]
+    return size in (0, 1) or 8 <= size <= os.fstat(f.fileno()).st_size
+
+# Structural checks for short or commonplace signatures, keyed by magic; each gets (file, header)
+WEAK_MAGIC_CHECKS = {
+    **{atom: _check_atom_size for atom in (b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot')},
+    b'MZ': _check_pe_header,
+    b'BZh': lambda f, header: header[3:4] in b'123456789' and header[4:10] in (b'1AY&SY', b'\x17rE8P\x90'),
+    b'ID3': lambda f, header: header[3:4] in (b'\x02', b'\x03', b'\x04') and all(b < 0x80 for b in header[6:10]),
+    b'\x1f\x8b\x08': lambda f, header: len(header) >= 10 and not header[3] & 0xE0,
+    b'\xff\xd8\xff': lambda f, header: header[3:4] >= b'\xc0',
+}
+
+def _confirm_weak_magic(filepath: str, kind: Dict[str, Any]) -> bool:
+    """
+    Decide whether a sniffed type can be trusted despite a short signature.
+
+    Signatures with a WEAK_MAGIC_CHECKS entry count only when it confirms the
+    structure behind them; other signatures of SNIFF_MIN_MAGIC_LENGTH bytes or
+    more are trusted as they are, and shorter ones (a text file may well start
+    with "MZ") are not.
+    """
+    check = WEAK_MAGIC_CHECKS.get(kind['magic'][0][1])
+    if check is None:
+        return sum(len(magic) for _, magic in kind['magic']) >= SNIFF_MIN_MAGIC_LENGTH
+    try:
+        with open(filepath, 'rb') as f:
+            return bool(check(f, f.read(SNIFF_HEADER_SIZE)))
+    except (OSError, struct.error):
+        return False
+
+def extension_mismatch(filepath: str) -> Optional[Dict[str, Any]]:
+    """
+    Check whether a file's content contradicts its extension.
+
+    Returns:
+        Optional[Dict[str, Any]]: The sniffed type if it does not list the file's
+        extension, else None (also for generic extensions, unknown content and
+        short signatures that fail their structural check)
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext in SNIFF_GENERIC_EXTENSIONS or ext[1:].isdigit():  # e.g. libfoo.so.1
+        return None
+    kind = sniff_file_type(filepath)
+    if kind and kind['extensions'] and ext not in kind['extensions'] and _confirm_weak_magic(filepath, kind):
+        return kind
+    return None
+
+
+def verify_file_integrity(filepath: str) -> Tuple[bool, str]:
+    """
+    Verify the integrity of a file by checking its structure and content.
+    Enhanced with more file formats and detailed checks.
+    
+    Args:
+        filepath (str): Path to the file to verify
+        
+    Returns:
+        Tuple[bool, str]: Success status and message
+    """
+    try:
+        # Check if file exists
+        if not os.path.exists(filepath):
+            return False, "File does not exist"
+            
+        # Get file size
+        file_size = os.path.getsize(filepath)
+            
+        # Check if file is empty
+        if file_size == 0:
+            return False, "File is empty"
+            
+        # Check file permissions
+        if not os.access(filepath, os.R_OK):
+            return False, "File is not readable (permission denied)"
+            
+        # Check file header (magic numbers)
+        ext = os.path.splitext(filepath)[1].lower()
+        
+        # Files with a stored Merkle tree are verified leaf by leaf in parallel
+        tree = load_merkle_tree(filepath + MERKLE_SUFFIX)
+        if tree:
+            result = verify_merkle_tree(filepath, tree)
+            if result['size_changed']:
+                return False, f"File size changed: expected {tree['size']}, found {file_size} bytes"
+            if not result['ok']:
+                return False, f"Corrupted byte ranges: {format_byte_ranges(result['corrupted'])}"
+            if ext in FORMAT_VALIDATORS:
+                is_valid, message = FORMAT_VALIDATORS[ext](filepath)
+                if not is_valid:
+                    return False, message
+            return True, (f"Merkle tree verified ({result['checked_leaves']} leaves, "
+                          f"{result['mb_per_s']:.1f} MB/s, root: {tree['root']})")
+        if ext in KNOWN_CONTENT_EXTENSIONS:
+            kind = sniff_file_type(filepath)
+            if not kind or ext not in kind['extensions']:
+                detected = f" (content looks like {kind['name']})" if kind else ""
+                return False, f"Invalid file header for {ext} format{detected}"
+        
+        # Calculate file hash for integrity check
+        file_hash = get_file_hash(filepath, 'sha256')
+        if not file_hash:
+            return False, "Could not calculate file hash"
+            
+        # Try to read the entire file to check for read errors
+        try:
+            with open(filepath, 'rb') as f:
+                # Read in chunks to handle large files
+                processed = 0
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    processed += len(chunk)
+                    
                     # Update progress for large files
                     if file_size > 10 * 1024 * 1024:  # 10MB
                         progress = (processed / file_size) * 100
@@ -969,19 +3055,13 @@ def verify_file_integrity(filepath: str) -> Tuple[bool, str]:
         except Exception as e:
             return False, f"Read error: {str(e)}"
             
-        # Additional checks for specific file types
-        if ext == '.zip':
-            try:
-                import zipfile
-                if not zipfile.is_zipfile(filepath):
-                    return False, "Not a valid ZIP archive"
-                with zipfile.ZipFile(filepath) as zf:
-                    if zf.testzip() is not None:
-                        return False, "ZIP file is corrupted"
-            except ImportError:
-                pass
+        # Deep structural checks for specific file types
+        if ext in FORMAT_VALIDATORS:
+            is_valid, message = FORMAT_VALIDATORS[ext](filepath)
+            if not is_valid:
+                return False, message
                 
-        elif ext in ['.jpg', '.jpeg', '.png', '.gif']:
+        elif ext == '.gif':
             try:
                 from PIL import Image
                 try:
@@ -996,171 +3076,1069 @@ def verify_file_integrity(filepath: str) -> Tuple[bool, str]:
         
     except Exception as e:
         return False, f"Verification error: {str(e)}"
-def scan_directory(directory: str) -> Dict[str, List[str]]:
+
+def _hash_merkle_leaf(filepath: str, index: int, leaf_size: int, algorithm: str, limiter=None) -> Tuple[str, int]:
+    """Hash one fixed-size leaf of a file, throttled by an optional _RateLimiter; returns (hexdigest, bytes read)"""
+    with open(filepath, 'rb') as f:
+        f.seek(index * leaf_size)
+        data = f.read(leaf_size)
+    if limiter:
+        limiter.consume(len(data))
+    return hashlib.new(algorithm, b'\x00' + data).hexdigest(), len(data)
+
+def merkle_root(leaves: List[str], algorithm: str = 'sha256') -> str:
     """
-    Enhanced scan of a directory for potential issues and security concerns.
-    Includes more comprehensive checks and parallel processing for large directories.
-    
+    Fold leaf hashes into a Merkle root (odd nodes are promoted to the next level).
+
+    Leaves and inner nodes use different prefixes (0x00 / 0x01) so a leaf can
+    never be confused with an inner node.
+    """
+    level = [bytes.fromhex(leaf) for leaf in leaves] or [hashlib.new(algorithm, b'\x00').digest()]
+    while len(level) > 1:
+        next_level = [hashlib.new(algorithm, b'\x01' + level[i] + level[i + 1]).digest()
+                      for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+    return level[0].hex()
+
+def _leaves_for_ranges(ranges, leaf_size: int, leaf_count: int) -> List[int]:
+    """Return the sorted leaf indexes overlapping a list of (start, end) byte ranges"""
+    indexes = set()
+    for start, end in ranges:
+        first = max(0, start // leaf_size)
+        last = min(leaf_count - 1, max(start, end - 1) // leaf_size)
+        indexes.update(range(first, last + 1))
+    return sorted(indexes)
+
+def _leaves_to_ranges(indexes: List[int], leaf_size: int, size: int) -> List[Tuple[int, int]]:
+    """Merge leaf indexes into contiguous (start, end) byte ranges"""
+    ranges = []
+    for index in sorted(indexes):
+        start, end = index * leaf_size, min((index + 1) * leaf_size, size)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+def _hash_merkle_leaves(filepath: str, indexes, leaf_size: int, algorithm: str, workers: Optional[int],
+                        limiter=None) -> Tuple[Dict[int, str], int]:
+    """
+    Hash the given leaves in parallel; returns ({index: hexdigest}, bytes read).
+
+    With workers=1 the leaves are hashed on the calling thread, which is what
+    callers that are already running inside a pool (manifest workers) use.
+    """
+    hashes = {}
+    total = 0
+    hash_leaf = lambda index: (index, *_hash_merkle_leaf(filepath, index, leaf_size, algorithm, limiter))
+    if workers == 1:
+        for index, digest, read in map(hash_leaf, indexes):
+            hashes[index] = digest
+            total += read
+        return hashes, total
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for index, digest, read in bounded_map(executor, hash_leaf, indexes):
+            hashes[index] = digest
+            total += read
+    return hashes, total
+
+def compute_merkle_tree(filepath: str, leaf_size: int = MERKLE_LEAF_SIZE, algorithm: str = 'sha256',
+                        workers: Optional[int] = None, limiter=None) -> Dict[str, Any]:
+    """
+    Hash a file as a Merkle tree of fixed-size leaves, hashing leaves in parallel.
+
     Args:
-        directory (str): Directory to scan
-        
+        filepath (str): File to hash
+        leaf_size (int): Bytes per leaf
+        algorithm (str): hashlib algorithm name
+        workers (int, optional): Number of hashing threads (defaults to CPU count)
+        limiter (_RateLimiter, optional): Throttles reads leaf by leaf
+
     Returns:
-        Dict[str, List[str]]: Dictionary of issues found by category
+        Dict[str, Any]: Tree with 'algorithm', 'leaf_size', 'size', 'mtime_ns', 'leaves' and 'root'
     """
-    issues = {
-        "security": [],
-        "storage": [],
-        "suspicious": [],
-        "recommendations": [],
-        "performance": []
-    }
-    
-    total_size = 0
-    large_files = []
-    old_files = []
-    hidden_files = []
-    suspicious_extensions = ['.exe', '.dll', '.bat', '.ps1', '.vbs', '.js', '.jar', '.sh', '.py']
-    suspicious_patterns = ['backdoor', 'hack', 'crack', 'keygen', 'password', 'admin']
-    
-    print(f"{Fore.YELLOW}Scanning directory: {directory}")
-    print(f"{Fore.CYAN}This may take a while for large directories...")
-    
-    # Function to scan a single file
-    def scan_file(path):
-        file_issues = {
-            "security": [],
-            "storage": [],
-            "suspicious": [],
-            "performance": []
-        }
-        
-        try:
-            name = os.path.basename(path)
-            rel_path = os.path.relpath(path, directory)
-            size = os.path.getsize(path)
-            
-            # Check file size
-            if size > 100 * 1024 * 1024:  # 100MB
-                large_files.append((path, size))
-            
-            if size == 0:
-                file_issues["storage"].append(f"Empty file found: {rel_path}")
-            
-            # Check file age
-            mtime = os.path.getmtime(path)
-            age_days = (time.time() - mtime) / 86400
-            if age_days > 365:  # Older than 1 year
-                old_files.append((path, age_days))
-            
-            # Check for hidden files
-            if name.startswith('.') or (os.name == 'nt' and bool(os.stat(path).st_file_attributes & stat.FILE_ATTRIBUTE_HIDDEN)):
-                hidden_files.append(path)
-            
-            # Check suspicious extensions
-            if any(name.lower().endswith(ext) for ext in suspicious_extensions):
-                file_issues["suspicious"].append(
-                    f"Potentially sensitive file found: {rel_path}"
-                )
-            
-            # Check suspicious patterns in filename
-            if any(pattern in name.lower() for pattern in suspicious_patterns):
-                file_issues["suspicious"].append(
-                    f"Suspicious filename pattern: {rel_path}"
-                )
-            
-            # Check file permissions
-            if not os.access(path, os.R_OK):
-                file_issues["security"].append(f"No read access to: {rel_path}")
-            
-            if os.name == 'nt' and os.access(path, os.X_OK) and name.lower().endswith(('.txt', '.doc', '.pdf', '.jpg')):
-                file_issues["security"].append(f"Unusual execute permission on non-executable: {rel_path}")
-            
-            # Check for potential malware signatures in executable files
-            if name.lower().endswith('.exe') and size < 100 * 1024:  # Small executables
-                file_issues["suspicious"].append(f"Unusually small executable: {rel_path}")
-            
-            # Performance issues
-            if name.endswith(('.log', '.tmp')) and size > 10 * 1024 * 1024:  # 10MB
-                file_issues["performance"].append(f"Large log/temp file: {rel_path} ({humanize.naturalsize(size)})")
-            
-            return file_issues, size
-            
-        except Exception as e:
-            return {"error": [f"Error scanning {os.path.basename(path)}: {str(e)}"]}, 0
-    
-    # Collect all files first
-    all_files = []
-    for root, dirs, files in os.walk(directory):
-        for name in files:
-            all_files.append(os.path.join(root, name))
-    
-    # Process files in parallel for large directories
-    if len(all_files) > 100:
-        print(f"{Fore.CYAN}Processing {len(all_files)} files in parallel...")
-        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            results = list(executor.map(scan_file, all_files))
-            
-            # Combine results
-            for file_issues, size in results:
-                total_size += size
-                for category, items in file_issues.items():
-                    if category in issues:
-                        issues[category].extend(items)
-    else:
-        # Process files sequentially for smaller directories
-        for file_path in all_files:
-            file_issues, size = scan_file(file_path)
-            total_size += size
-            for category, items in file_issues.items():
-                if category in issues:
-                    issues[category].extend(items)
-    
-    # Add recommendations based on scan results
-    if total_size > 1024**3:  # 1GB
-        issues["recommendations"].append(
-            f"Large directory ({humanize.naturalsize(total_size)}). "
-            "Consider archiving old files."
-        )
-    
-    if large_files:
-        issues["recommendations"].append("Large files found:")
-        for path, size in sorted(large_files, key=lambda x: x[1], reverse=True)[:5]:
-            issues["recommendations"].append(
-                f"  • {os.path.relpath(path, directory)}: {humanize.naturalsize(size)}"
-            )
-    
-    if old_files:
-        issues["recommendations"].append("Old files that might be archived:")
-        for path, age in sorted(old_files, key=lambda x: x[1], reverse=True)[:5]:
-            issues["recommendations"].append(
-                f"  • {os.path.relpath(path, directory)}: {int(age)} days old"
-            )
-    
-    if hidden_files:
-        issues["recommendations"].append(f"Found {len(hidden_files)} hidden files")
-    
-    return issues
+    st = os.stat(filepath)
+    leaf_count = max(1, (st.st_size + leaf_size - 1) // leaf_size)
+    hashes, _ = _hash_merkle_leaves(filepath, range(leaf_count), leaf_size, algorithm, workers, limiter)
+    leaves = [hashes[i] for i in range(leaf_count)]
+    return {'algorithm': algorithm, 'leaf_size': leaf_size, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+            'leaves': leaves, 'root': merkle_root(leaves, algorithm)}
 
-def check_permissions(path):
+def update_merkle_tree(filepath: str, tree: Dict[str, Any], ranges=None, workers: Optional[int] = None) -> Dict[str, Any]:
     """
-    Check file or directory permissions
-    
+    Re-hash only the leaves touched by the given byte ranges (plus any growth or shrinkage).
+
     Args:
-        path (str): Path to check permissions for
-        
+        filepath (str): File the tree belongs to
+        tree (Dict[str, Any]): Existing tree from compute_merkle_tree
+        ranges (list, optional): (start, end) byte ranges written since the tree was built
+        workers (int, optional): Number of hashing threads
+
     Returns:
-        dict: Dictionary containing permission information
+        Dict[str, Any]: Updated tree
     """
-    result = {
-        "basic": {
-            "read": False,
-            "write": False,
-            "execute": False,
-            "delete": False
-        },
-        "owner": None,
-        "attributes": []
-    }
+    st = os.stat(filepath)
+    leaf_size, algorithm = tree['leaf_size'], tree['algorithm']
+    leaf_count = max(1, (st.st_size + leaf_size - 1) // leaf_size)
+    leaves = (tree['leaves'] + [None] * leaf_count)[:leaf_count]
+    dirty = set(_leaves_for_ranges(ranges or [], leaf_size, leaf_count))
+    if st.st_size != tree['size']:
+        # The old last leaf may have been partial, and everything after it is new
+        dirty.update(range(min(tree['size'], st.st_size) // leaf_size, leaf_count))
+    hashes, _ = _hash_merkle_leaves(filepath, sorted(dirty), leaf_size, algorithm, workers)
+    for index, digest in hashes.items():
+        leaves[index] = digest
+    return {'algorithm': algorithm, 'leaf_size': leaf_size, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+            'leaves': leaves, 'root': merkle_root(leaves, algorithm)}
+
+def verify_merkle_tree(filepath: str, tree: Dict[str, Any], ranges=None, workers: Optional[int] = None,
+                       limiter=None) -> Dict[str, Any]:
+    """
+    Verify a file against a stored Merkle tree and pinpoint corrupted byte ranges.
+
+    Args:
+        filepath (str): File to verify
+        tree (Dict[str, Any]): Stored tree from compute_merkle_tree
+        ranges (list, optional): Only verify leaves overlapping these (start, end) byte ranges
+        workers (int, optional): Number of hashing threads
+        limiter (_RateLimiter, optional): Throttles reads leaf by leaf
+
+    Returns:
+        Dict[str, Any]: 'ok', 'corrupted' (byte ranges), 'checked_leaves', 'bytes', 'mb_per_s'
+            and 'size_changed'
+    """
+    size = os.path.getsize(filepath)
+    leaf_size, leaf_count = tree['leaf_size'], len(tree['leaves'])
+    indexes = _leaves_for_ranges(ranges, leaf_size, leaf_count) if ranges else range(leaf_count)
+    start = time.time()
+    hashes, total = _hash_merkle_leaves(filepath, indexes, leaf_size, tree['algorithm'], workers, limiter)
+    elapsed = max(time.time() - start, 1e-6)
+    bad = [index for index, digest in hashes.items() if digest != tree['leaves'][index]]
+    return {
+        'ok': not bad and size == tree['size'],
+        'corrupted': _leaves_to_ranges(bad, leaf_size, max(size, tree['size'])),
+        'checked_leaves': len(hashes),
+        'bytes': total,
+        'mb_per_s': total / (1024 * 1024) / elapsed,
+        'size_changed': size != tree['size']
+    }
+
+def save_merkle_tree(tree: Dict[str, Any], tree_path: str) -> None:
+    """Atomically store a Merkle tree (or a dict of trees) as compressed JSON, e.g. next to the file as <file>.merkle.gz"""
+    tmp_path = tree_path + '.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(tree, f, separators=(',', ':'))
+    os.replace(tmp_path, tree_path)
+
+def load_merkle_tree(tree_path: str) -> Optional[Dict[str, Any]]:
+    """Load a Merkle tree saved by save_merkle_tree, or None if missing or unreadable"""
+    try:
+        with gzip.open(tree_path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def format_byte_ranges(ranges: List[Tuple[int, int]], limit: int = 5) -> str:
+    """Format byte ranges for display, e.g. '4.2 MB-8.4 MB, ...'"""
+    text = ", ".join(f"{humanize.naturalsize(start)}-{humanize.naturalsize(end)}" for start, end in ranges[:limit])
+    return text + (f" and {len(ranges) - limit} more" if len(ranges) > limit else "")
+
+def _escape_manifest_path(rel_path: str) -> Tuple[str, bool]:
+    """Escape backslashes and newlines the way sha256sum does; returns (path, escaped)"""
+    if '\\' not in rel_path and '\n' not in rel_path:
+        return rel_path, False
+    return rel_path.replace('\\', '\\\\').replace('\n', '\\n'), True
+
+def _unescape_manifest_path(rel_path: str) -> str:
+    """Reverse _escape_manifest_path"""
+    return re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), rel_path)
+
+def _hash_manifest_file(path: str, algorithm: str, limiter=None) -> Tuple[str, int]:
+    """
+    Hash a file for a manifest; returns (hexdigest, bytes hashed) and raises OSError on failure.
+
+    With a _RateLimiter the file is read in 1MB chunks, each one accounted for
+    before the next is read.
+    """
+    with open(path, 'rb') as f:
+        if limiter is None:
+            digest = hashlib.file_digest(f, algorithm)
+            return digest.hexdigest(), f.tell()
+        digest = hashlib.new(algorithm)
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+            limiter.consume(len(chunk))
+        return digest.hexdigest(), f.tell()
+
+def merkle_store_path(manifest_path: str) -> str:
+    """Return the path of the Merkle tree store that accompanies a native manifest"""
+    return manifest_path[:-3] + MERKLE_SUFFIX if manifest_path.endswith('.gz') else manifest_path + MERKLE_SUFFIX
+
+def _check_manifest_entry(directory: str, entry: Dict[str, Any], trees: Optional[Dict[str, Any]] = None,
+                          workers: Optional[int] = None, limiter=None):
+    """
+    Check one manifest entry against the file on disk.
+
+    Entries hashed as Merkle trees ("merkle:<leaf_size>:<root>") are re-hashed
+    leaf by leaf (on workers threads; pass 1 when already inside a pool);
+    when the stored tree is available the corrupted byte ranges are reported.
+    An optional _RateLimiter throttles the reads as they happen.
+
+    Returns:
+        tuple: (entry, status, detail, bytes hashed) with status 'ok', 'mismatched', 'missing' or 'error'
+    """
+    path = os.path.join(directory, entry['path'])
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return entry, 'missing', None, 0
+    except OSError as e:
+        return entry, 'error', str(e), 0
+    if entry['size'] is not None and st.st_size != entry['size']:
+        return entry, 'mismatched', f"size {st.st_size} != {entry['size']}", 0
+    try:
+        if entry['hash'].startswith('merkle:'):
+            _, leaf_size, root = entry['hash'].split(':')
+            tree = (trees or {}).get(entry['path'])
+            if tree and tree['root'] == root:
+                result = verify_merkle_tree(path, tree, workers=workers, limiter=limiter)
+                if not result['ok']:
+                    return entry, 'mismatched', f"corrupted {format_byte_ranges(result['corrupted'])}", result['bytes']
+                return entry, 'ok', None, result['bytes']
+            tree = compute_merkle_tree(path, int(leaf_size), entry['algorithm'], workers, limiter)
+            file_hash, hashed = f"merkle:{leaf_size}:{tree['root']}", tree['size']
+        else:
+            file_hash, hashed = _hash_manifest_file(path, entry['algorithm'], limiter)
+    except OSError as e:
+        return entry, 'error', str(e), 0
+    if file_hash != entry['hash']:
+        return entry, 'mismatched', f"{entry['algorithm']} {file_hash} != {entry['hash']}", hashed
+    return entry, 'ok', None, hashed
+
+def read_manifest(manifest_path: str):
+    """
+    Stream the entries of an integrity manifest.
+
+    Supports the native gzip-compressed format (hash, size, mtime_ns, path) and
+    plain sha256sum/b2sum files ("<hash>  <path>" or "<hash> *<path>").
+
+    Args:
+        manifest_path (str): Path to the manifest
+
+    Yields:
+        dict: Entry with 'path', 'hash', 'algorithm', and 'size'/'mtime_ns' (None for sum files)
+    """
+    native = manifest_path.endswith('.gz')
+    opener = gzip.open if native else open
+    algorithm = 'sha256'
+    with opener(manifest_path, 'rt', encoding='utf-8', newline='\n') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            if line.startswith('#'):
+                match = re.search(r'algorithm=(\w+)', line)
+                if match:
+                    algorithm = match.group(1)
+                continue
+            escaped = line.startswith('\\')
+            if escaped:
+                line = line[1:]
+            if native:
+                file_hash, size, mtime_ns, rel_path = line.split('\t', 3)
+                size, mtime_ns = int(size), int(mtime_ns)
+                entry_algorithm = algorithm
+            else:
+                file_hash, rel_path = line[:line.index(' ')], line[line.index(' ') + 2:]
+                size = mtime_ns = None
+                entry_algorithm = 'blake2b' if len(file_hash) == 128 else 'sha256'
+            if escaped:
+                rel_path = _unescape_manifest_path(rel_path)
+            yield {'path': rel_path, 'hash': file_hash.lower(), 'algorithm': entry_algorithm,
+                   'size': size, 'mtime_ns': mtime_ns}
+
+def create_manifest(directory: str, manifest_path: str, algorithm: str = 'sha256', workers: int = MAX_WORKERS) -> Dict[str, Any]:
+    """
+    Record the hash of every file in a directory tree in a sorted manifest.
+
+    A manifest path ending in '.gz' produces the native compressed format with
+    size and mtime per file; anything else is written as a sha256sum/b2sum
+    compatible checksum file. Files are hashed in parallel by a thread pool.
+    In the native format, files of MERKLE_THRESHOLD bytes or more are hashed
+    as Merkle trees (their leaves hashed in parallel too) and the trees are
+    kept next to the manifest so later verification can pinpoint damage.
+
+    Args:
+        directory (str): Root of the tree to record
+        manifest_path (str): Output manifest path
+        algorithm (str): 'sha256' or 'blake2b'
+        workers (int): Number of hashing threads
+
+    Returns:
+        Dict[str, Any]: Summary with file count, bytes, errors and throughput
+    """
+    if algorithm not in ('sha256', 'blake2b'):
+        raise ValueError(f"Unsupported manifest algorithm: {algorithm}")
+    native = manifest_path.endswith('.gz')
+    manifest_abs = os.path.abspath(manifest_path)
+    rel_paths = sorted(
+        os.path.relpath(path, directory).replace(os.sep, '/')
+        for path in iter_files(directory)
+        if os.path.abspath(path) not in (manifest_abs, os.path.abspath(merkle_store_path(manifest_path)))
+    )
+
+    def hash_entry(rel_path):
+        path = os.path.join(directory, rel_path)
+        try:
+            st = os.stat(path)
+            if native and st.st_size >= MERKLE_THRESHOLD:
+                # Files are already hashed in parallel, so each tree is hashed on this worker
+                tree = compute_merkle_tree(path, algorithm=algorithm, workers=1)
+                trees[rel_path] = tree
+                return rel_path, f"merkle:{tree['leaf_size']}:{tree['root']}", st, tree['size'], None
+            file_hash, hashed = _hash_manifest_file(path, algorithm)
+            return rel_path, file_hash, st, hashed, None
+        except OSError as e:
+            return rel_path, None, None, 0, str(e)
+
+    summary = {'files': 0, 'bytes': 0, 'errors': []}
+    trees = {}
+    start = time.time()
+    opener = gzip.open if native else open
+    with opener(manifest_path, 'wt', encoding='utf-8', newline='\n') as out, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        if native:
+            out.write(f"# multitool-manifest 1 algorithm={algorithm} created={datetime.now().isoformat(timespec='seconds')}\n")
+        for rel_path, file_hash, st, hashed, error in tqdm(bounded_map(executor, hash_entry, rel_paths),
+                                                           total=len(rel_paths), desc="Hashing", unit="file"):
+            if error:
+                summary['errors'].append(f"{rel_path}: {error}")
+                continue
+            name, escaped = _escape_manifest_path(rel_path)
+            prefix = '\\' if escaped else ''
+            if native:
+                out.write(f"{prefix}{file_hash}\t{st.st_size}\t{st.st_mtime_ns}\t{name}\n")
+            else:
+                out.write(f"{prefix}{file_hash}  {name}\n")
+            summary['files'] += 1
+            summary['bytes'] += hashed
+    if trees:
+        save_merkle_tree(trees, merkle_store_path(manifest_path))
+
+    summary['seconds'] = time.time() - start
+    summary['mb_per_s'] = summary['bytes'] / (1024 * 1024) / max(summary['seconds'], 1e-6)
+    return summary
+
+def verify_manifest(directory: str, manifest_path: str, workers: int = MAX_WORKERS) -> Dict[str, Any]:
+    """
+    Verify a directory tree against a manifest created by create_manifest or sha256sum.
+
+    The manifest is streamed and files are hashed by a bounded thread pool, so
+    verification runs at disk speed without loading the manifest into memory
+    (only the set of recorded paths is kept to detect new files).
+
+    Args:
+        directory (str): Root of the tree to verify
+        manifest_path (str): Manifest to verify against
+        workers (int): Number of hashing threads
+
+    Returns:
+        Dict[str, Any]: Lists of 'mismatched', 'missing', 'new' and 'errors' paths,
+        plus 'checked', 'ok', 'bytes', 'seconds' and 'mb_per_s'
+    """
+    result = {'checked': 0, 'ok': 0, 'mismatched': [], 'missing': [], 'new': [], 'errors': [], 'bytes': 0}
+    recorded = set()
+
+    trees = load_merkle_tree(merkle_store_path(manifest_path)) or {}
+    check_entry = lambda entry: _check_manifest_entry(directory, entry, trees, workers=1)
+
+    def entries():
+        for entry in read_manifest(manifest_path):
+            recorded.add(entry['path'])
+            yield entry
+
+    start = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for entry, status, detail, hashed in tqdm(bounded_map(executor, check_entry, entries()),
+                                                   desc="Verifying", unit="file"):
+            result['checked'] += 1
+            result['bytes'] += hashed
+            if status == 'ok':
+                result['ok'] += 1
+            elif status == 'error':
+                result['errors'].append(f"{entry['path']}: {detail}")
+            elif status == 'missing':
+                result['missing'].append(entry['path'])
+            else:
+                result['mismatched'].append(f"{entry['path']} ({detail})")
+    result['seconds'] = time.time() - start
+    result['mb_per_s'] = result['bytes'] / (1024 * 1024) / max(result['seconds'], 1e-6)
+
+    manifest_abs = os.path.abspath(manifest_path)
+    store_abs = os.path.abspath(merkle_store_path(manifest_path))
+    for path in iter_files(directory):
+        rel_path = os.path.relpath(path, directory).replace(os.sep, '/')
+        if rel_path not in recorded and os.path.abspath(path) not in (manifest_abs, store_abs):
+            result['new'].append(rel_path)
+    return result
+
+class _RateLimiter:
+    """Token bucket that keeps average throughput under a bytes-per-second budget"""
+
+    def __init__(self, bytes_per_second: Optional[float]):
+        self.rate = bytes_per_second
+        self.start = time.monotonic()
+        self.consumed = 0
+        self.lock = threading.Lock()  # Leaves of one file may be hashed on several threads
+
+    def consume(self, amount: int) -> None:
+        """Account for amount bytes of I/O, sleeping if we are ahead of the budget"""
+        if not self.rate:
+            return
+        with self.lock:
+            self.consumed += amount
+            ahead = self.consumed / self.rate - (time.monotonic() - self.start)
+        if ahead > 0:
+            time.sleep(ahead)
+
+def scrub_manifest(directory: str, manifest_path: str, period_days: float = SCRUB_PERIOD_DAYS,
+                   io_limit: Optional[float] = SCRUB_IO_LIMIT, alert=None) -> Dict[str, Any]:
+    """
+    Verify the next slice of a manifest as part of a rolling bit-rot scrub.
+
+    Each run verifies the share of the recorded data that is due since the
+    previous run (1/period_days of the total per day, one day's worth on the
+    first run), continuing from where the last run stopped and wrapping around
+    at the end of the manifest. Reads are throttled to io_limit bytes per
+    second. The cursor and each file's last-verified time are persisted in
+    the Multitool cache, so scrubbing resumes across restarts; a changed
+    manifest starts a new pass. Corrupted or missing files are alerted
+    immediately (printed, appended to SCRUB_ALERT_LOG and passed to alert).
+
+    Args:
+        directory (str): Root of the tree the manifest describes
+        manifest_path (str): Manifest created by create_manifest or sha256sum
+        period_days (float): Days for one complete pass over the data
+        io_limit (float, optional): Read budget in bytes per second (None for unlimited)
+        alert (callable, optional): Called with (rel_path, status, detail) for each problem
+
+    Returns:
+        Dict[str, Any]: Run summary with 'verified', 'bytes', 'ok', 'corrupted', 'missing',
+        'errors', 'cursor', 'total', 'pass_complete' and 'seconds'
+    """
+    state_name = "scrub_" + hashlib.sha1(os.path.abspath(manifest_path).encode()).hexdigest()[:16]
+    state = load_json_cache(state_name)
+    st = os.stat(manifest_path)
+    fingerprint = [st.st_size, st.st_mtime_ns]
+    if state.get('manifest') != fingerprint:
+        state = {'manifest': fingerprint, 'cursor': 0, 'passes': 0, 'last_run': None,
+                 'pass_started': time.time(), 'history': state.get('history', {})}
+    history = state['history']
+    trees = load_merkle_tree(merkle_store_path(manifest_path)) or {}
+
+    entries = list(read_manifest(manifest_path))
+    sizes = []
+    for entry in entries:
+        size = entry['size']
+        if size is None:
+            try:
+                size = os.path.getsize(os.path.join(directory, entry['path']))
+            except OSError:
+                size = 0
+        sizes.append(size)
+    total_bytes = sum(sizes)
+    now = time.time()
+    days = (now - state['last_run']) / 86400 if state['last_run'] else 1
+    quota = total_bytes * min(days / period_days, 1)
+
+    result = {'verified': 0, 'bytes': 0, 'ok': 0, 'corrupted': [], 'missing': [], 'errors': [],
+              'total': len(entries), 'pass_complete': False}
+    limiter = _RateLimiter(io_limit)
+    cursor = state['cursor'] if state['cursor'] < len(entries) else 0
+    last_save = time.time()
+    start = time.time()
+    try:
+        while entries and result['verified'] < len(entries) and (result['bytes'] < quota or result['verified'] == 0):
+            entry = entries[cursor]
+            _, status, detail, hashed = _check_manifest_entry(directory, entry, trees, limiter=limiter)
+            result['verified'] += 1
+            result['bytes'] += max(hashed, sizes[cursor])
+            history[entry['path']] = [int(time.time()), status]
+            if status == 'ok':
+                result['ok'] += 1
+            else:
+                key = {'mismatched': 'corrupted', 'missing': 'missing'}.get(status, 'errors')
+                result[key].append(f"{entry['path']}" + (f" ({detail})" if detail else ""))
+                message = f"{datetime.now().isoformat(timespec='seconds')} {status.upper()} {entry['path']} {detail or ''}"
+                print(f"{Fore.RED}⚠ Scrub alert: {message}")
+                try:
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    with open(SCRUB_ALERT_LOG, 'a', encoding='utf-8') as log:
+                        log.write(message.rstrip() + '\n')
+                except OSError:
+                    pass
+                if alert:
+                    alert(entry['path'], status, detail)
+            cursor += 1
+            if cursor >= len(entries):
+                cursor = 0
+                state['passes'] += 1
+                state['pass_started'] = time.time()
+                result['pass_complete'] = True
+            state['cursor'] = cursor
+            if time.time() - last_save > 10:
+                save_json_cache(state_name, state)
+                last_save = time.time()
+    finally:
+        state['last_run'] = now
+        save_json_cache(state_name, state)
+
+    result['cursor'] = cursor
+    result['seconds'] = time.time() - start
+    return result
+
+def run_scrubber(directory: str, manifest_path: str, period_days: float = SCRUB_PERIOD_DAYS,
+                 io_limit: Optional[float] = SCRUB_IO_LIMIT, interval_hours: float = 24) -> None:
+    """
+    Keep scrubbing a manifest every interval_hours until interrupted (Ctrl+C).
+
+    Args:
+        directory (str): Root of the tree the manifest describes
+        manifest_path (str): Manifest to scrub
+        period_days (float): Days for one complete pass over the data
+        io_limit (float, optional): Read budget in bytes per second
+        interval_hours (float): Hours between scrub runs
+    """
+    try:
+        while True:
+            result = scrub_manifest(directory, manifest_path, period_days, io_limit)
+            print(f"{Fore.CYAN}[{datetime.now().strftime('%Y-%m-%d %H:%M')}] Scrubbed {result['verified']} files "
+                  f"({humanize.naturalsize(result['bytes'])}), position {result['cursor']}/{result['total']}, "
+                  f"{len(result['corrupted']) + len(result['missing'])} problems")
+            time.sleep(interval_hours * 3600)
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}Scrubber stopped; progress is saved")
+
+def compile_signature(signature: Dict[str, Any]) -> bytes:
+    """
+    Convert a content signature into a bytes regular expression.
+
+    Args:
+        signature (dict): Entry from CONTENT_SIGNATURES with a 'pattern' or 'text' key
+
+    Returns:
+        bytes: Regular expression source matching the signature
+    """
+    if 'text' in signature:
+        body = re.escape(signature['text'].encode('latin-1'))
+        return b'(?i:' + body + b')' if signature.get('nocase') else body
+
+    parts = []
+    for token in signature['pattern'].split():
+        if token == '??':
+            parts.append(b'.')
+        elif token.startswith('[') and token.endswith(']'):
+            low, _, high = token[1:-1].partition('-')
+            parts.append(b'.{%d,%d}' % (int(low), int(high or low)))
+        else:
+            parts.append(re.escape(bytes.fromhex(token)))
+    return b''.join(parts)
+
+_signature_matcher = None
+
+def _get_signature_matcher():
+    """Build (once per process) a single regex matching every content signature"""
+    global _signature_matcher
+    if _signature_matcher is None:
+        alternatives = [b'(?P<s%d>%s)' % (i, compile_signature(sig)) for i, sig in enumerate(CONTENT_SIGNATURES)]
+        _signature_matcher = re.compile(b'|'.join(alternatives), re.DOTALL)
+    return _signature_matcher
+
+def _signature_scan_worker(path: str) -> Tuple[Optional[str], List[str]]:
+    """
+    Match all content signatures against the first SIGNATURE_SCAN_LIMIT bytes of a file.
+
+    Runs in a worker process. The file is memory-mapped so the regex engine scans
+    the page cache directly without copying the data into Python objects.
+
+    Returns:
+        Tuple[Optional[str], List[str]]: Digest of the scanned bytes and matching signature names
+    """
+    try:
+        if os.path.getsize(path) == 0:
+            return hashlib.blake2b(b'').hexdigest(), []
+        matcher = _get_signature_matcher()
+        found = set()
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = min(len(mm), SIGNATURE_SCAN_LIMIT)
+            with memoryview(mm) as view:
+                digest = hashlib.blake2b(view[:end]).hexdigest()
+            for match in matcher.finditer(mm, 0, end):
+                found.add(CONTENT_SIGNATURES[int(match.lastgroup[1:])]['name'])
+                if len(found) == len(CONTENT_SIGNATURES):
+                    break
+        return digest, sorted(found)
+    except (OSError, ValueError):
+        return None, []
+
+def signature_rules_version() -> str:
+    """Return a short fingerprint of the signature library and scan limit"""
+    rules = json.dumps([CONTENT_SIGNATURES, SIGNATURE_SCAN_LIMIT], sort_keys=True)
+    return hashlib.sha1(rules.encode()).hexdigest()[:12]
+
+def scan_file_signatures(paths):
+    """
+    Scan file contents for known byte signatures using a process pool.
+
+    Args:
+        paths (iterable): Files to scan
+
+    Yields:
+        Tuple[str, List[str]]: Path and matched signature names (only files with matches)
+    """
+    for path, names in cached_content_scan(paths, _signature_scan_worker, 'signatures', signature_rules_version()):
+        if names:
+            yield path, names
+
+def byte_entropy(blocks: List[memoryview]) -> Tuple[float, List[float]]:
+    """
+    Compute Shannon entropy (bits per byte) over a set of blocks.
+
+    Uses vectorized NumPy byte histograms when available, otherwise bytes.count().
+
+    Args:
+        blocks (List[memoryview]): Data blocks to profile
+
+    Returns:
+        Tuple[float, List[float]]: Overall entropy and entropy of each block
+    """
+    if np is not None:
+        histograms = np.stack([np.bincount(np.frombuffer(block, dtype=np.uint8), minlength=256) for block in blocks])
+        totals = histograms.sum(axis=1, keepdims=True)
+        probs = histograms / np.maximum(totals, 1)
+        logs = np.log2(np.where(probs > 0, probs, 1))
+        per_block = -(probs * logs).sum(axis=1)
+        overall = histograms.sum(axis=0)
+        p = overall[overall > 0] / max(int(overall.sum()), 1)
+        return float(-(p * np.log2(p)).sum()), [float(e) for e in per_block]
+
+    def entropy(counts):
+        total = sum(counts)
+        return -sum(c / total * math.log2(c / total) for c in counts if c) if total else 0.0
+
+    block_counts = [[bytes(block).count(b) for b in range(256)] for block in blocks]
+    per_block = [entropy(counts) for counts in block_counts]
+    overall = [sum(column) for column in zip(*block_counts)] if block_counts else []
+    return entropy(overall), per_block
+
+def _entropy_scan_worker(path: str) -> Tuple[Optional[str], Optional[List[float]]]:
+    """
+    Profile the entropy of a file, sampling ENTROPY_SAMPLE_BLOCKS blocks from large files.
+
+    Runs in a worker process. Blocks are memoryviews over an mmap, so only the
+    sampled pages are ever read from disk.
+
+    Returns:
+        Tuple[Optional[str], Optional[List[float]]]: Digest of the sampled bytes and
+        [overall entropy, max block entropy, fraction of high-entropy blocks]
+    """
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return hashlib.blake2b(b'').hexdigest(), [0.0, 0.0, 0.0]
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                block_count = (size + ENTROPY_BLOCK_SIZE - 1) // ENTROPY_BLOCK_SIZE
+                if block_count <= ENTROPY_SAMPLE_BLOCKS:
+                    indexes = range(block_count)
+                else:
+                    step = (block_count - 1) / (ENTROPY_SAMPLE_BLOCKS - 1)
+                    indexes = sorted({round(i * step) for i in range(ENTROPY_SAMPLE_BLOCKS)})
+                blocks = [view[i * ENTROPY_BLOCK_SIZE:(i + 1) * ENTROPY_BLOCK_SIZE] for i in indexes]
+
+                hasher = hashlib.blake2b(str(size).encode())
+                for block in blocks:
+                    hasher.update(block)
+                overall, per_block = byte_entropy(blocks)
+                for block in blocks:
+                    block.release()
+
+        high = sum(1 for e in per_block if e >= ENTROPY_THRESHOLD) / len(per_block)
+        return hasher.hexdigest(), [round(overall, 3), round(max(per_block), 3), round(high, 3)]
+    except (OSError, ValueError):
+        return None, None
+
+def entropy_rules_version() -> str:
+    """Return a fingerprint of the entropy profiling parameters"""
+    return f"{ENTROPY_BLOCK_SIZE}:{ENTROPY_SAMPLE_BLOCKS}:{ENTROPY_THRESHOLD}"
+
+def profile_entropy(paths):
+    """
+    Compute entropy profiles for files using a process pool and the content cache.
+
+    Args:
+        paths (iterable): Files to profile
+
+    Yields:
+        Tuple[str, Dict[str, float]]: Path and its 'entropy', 'max_block' and 'high_ratio'
+    """
+    for path, r in cached_content_scan(paths, _entropy_scan_worker, 'entropy', entropy_rules_version()):
+        if r:
+            yield path, {'entropy': r[0], 'max_block': r[1], 'high_ratio': r[2]}
+
+def open_report_sink(target=None):
+    """
+    Open a streaming sink for scan findings.
+
+    Args:
+        target: None (no report), '-' for NDJSON on stdout, a file path for an
+            NDJSON file, or a callable that receives each finding record
+
+    Returns:
+        Tuple[callable, callable]: emit(record) and close() functions
+    """
+    if target is None:
+        return (lambda record: None), (lambda: None)
+    if callable(target):
+        return target, (lambda: None)
+
+    stream = sys.stdout if target == '-' else open(target, 'w', encoding='utf-8', buffering=1024 * 1024)
+
+    def emit(record):
+        stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close():
+        stream.flush()
+        if stream is not sys.stdout:
+            stream.close()
+
+    return emit, close
+
+def iter_files(directory: str):
+    """Yield every file path below a directory without building a list"""
+    for root, _, files in os.walk(directory):
+        for name in files:
+            yield os.path.join(root, name)
+
+def scan_rules_version(content_scan: bool) -> str:
+    """Return a fingerprint of every rule that can produce scan findings"""
+    content = f"{signature_rules_version()}:{entropy_rules_version()}" if content_scan else "metadata-only"
+    return f"{SCAN_RULES_VERSION}:{content}"
+
+def scan_directory(directory: str, content_scan: bool = False, sink=None, incremental: bool = False) -> Dict[str, List[str]]:
+    """
+    Enhanced scan of a directory for potential issues and security concerns.
+    Includes more comprehensive checks and parallel processing for large directories.
+    
+    Every finding is emitted as a structured record (rule, category, severity, path,
+    size, mtime, message) to the report sink as soon as it is found. The returned
+    summary only keeps the first SCAN_SUMMARY_LIMIT messages per category, and the
+    recommendations are built from counters and top-K heaps, so memory stays flat
+    regardless of the size of the tree.
+    
+    In incremental mode the per-file state (size, mtime, inode, findings) is saved
+    after the scan. The next incremental scan re-evaluates only new or changed
+    files (or everything if the rule set changed), reports each finding with a
+    "new"/"existing" status, emits "resolved" records for findings that went away,
+    and adds a "changes" list to the summary.
+    
+    Args:
+        directory (str): Directory to scan
+        content_scan (bool): Also match file contents against CONTENT_SIGNATURES
+            and flag high-entropy (packed or encrypted) files
+        sink: Report sink for finding records (see open_report_sink); with '-'
+            progress messages go to stderr so stdout stays valid NDJSON
+        incremental (bool): Reuse and update the saved state of the previous scan
+        
+    Returns:
+        Dict[str, List[str]]: Dictionary of issues found by category
+    """
+    if sink == '-':
+        emit, close = open_report_sink(sink)  # Bound to the real stdout before it is redirected
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                return scan_directory(directory, content_scan, emit, incremental)
+        finally:
+            close()
+    
+    issues = {
+        "security": [],
+        "storage": [],
+        "suspicious": [],
+        "recommendations": [],
+        "performance": []
+    }
+    if incremental:
+        issues["changes"] = []
+    
+    total_size = 0
+    category_counts = collections.Counter()
+    rule_counts = collections.Counter()
+    largest = []  # min-heaps holding the top 5 (size, path) / (age, path)
+    oldest = []
+    suspicious_extensions = ['.exe', '.dll', '.bat', '.ps1', '.vbs', '.js', '.jar', '.sh', '.py']
+    suspicious_patterns = ['backdoor', 'hack', 'crack', 'keygen', 'password', 'admin']
+    executable_mimes = {'application/vnd.microsoft.portable-executable', 'application/x-elf', 'application/x-mach-binary'}
+    
+    print(f"{Fore.YELLOW}Scanning directory: {directory}")
+    print(f"{Fore.CYAN}This may take a while for large directories...")
+    
+    def finding_key(record):
+        return record["rule"], record["path"], record.get("signature")
+    
+    # Per-file state for incremental scans: rel_path -> [size, mtime_ns, inode, findings]
+    state_name = "scan_state_" + hashlib.sha1(os.path.abspath(directory).encode()).hexdigest()[:16]
+    rules_version = scan_rules_version(content_scan)
+    previous_state = load_json_cache(state_name) if incremental else {}
+    previous_files = {}
+    if previous_state.get("version") == rules_version:
+        previous_files = previous_state.get("files", {})
+        print(f"{Fore.CYAN}Incremental scan: {len(previous_files)} files known from the previous scan")
+    elif previous_state:
+        print(f"{Fore.YELLOW}Rule set changed since the previous scan, re-evaluating all files")
+    previous_keys = {finding_key(record) for entry in previous_state.get("files", {}).values() for record in entry[3]}
+    current_files = {}
+    changed_paths = []
+    reused = 0
+    
+    def finding(rule, category, severity, rel_path, st, message, **extra):
+        record = {
+            "rule": rule,
+            "category": category,
+            "severity": severity,
+            "path": rel_path,
+            "size": st.st_size if st else None,
+            "mtime": st.st_mtime if st else None,
+            "message": message
+        }
+        record.update(extra)
+        return record
+    
+    def refresh_age(findings, rel_path, st):
+        # Age is the only time-dependent rule, so re-check it for reused findings
+        findings = [record for record in findings if record["rule"] != "old-file"]
+        age_days = (time.time() - st.st_mtime) / 86400
+        if age_days > 365:
+            findings.append(finding("old-file", "storage", "info", rel_path, st,
+                                    f"Old file: {rel_path} ({int(age_days)} days)"))
+        return findings
+    
+    # Function to scan a single file
+    def scan_file(path):
+        findings = []
+        rel_path = os.path.relpath(path, directory)
+        
+        try:
+            name = os.path.basename(path)
+            st = os.stat(path)
+            size = st.st_size
+            
+            # Unchanged since the previous incremental scan: reuse its findings
+            entry = previous_files.get(rel_path)
+            if entry and entry[:3] == [size, st.st_mtime_ns, st.st_ino]:
+                return rel_path, refresh_age(entry[3], rel_path, st), size, st, True
+            
+            # Check file size
+            if size > 100 * 1024 * 1024:  # 100MB
+                findings.append(finding("large-file", "storage", "info", rel_path, st,
+                                        f"Large file: {rel_path} ({humanize.naturalsize(size)})"))
+            
+            if size == 0:
+                findings.append(finding("empty-file", "storage", "low", rel_path, st,
+                                        f"Empty file found: {rel_path}"))
+            
+            # Check file age
+            age_days = (time.time() - st.st_mtime) / 86400
+            if age_days > 365:  # Older than 1 year
+                findings.append(finding("old-file", "storage", "info", rel_path, st,
+                                        f"Old file: {rel_path} ({int(age_days)} days)"))
+            
+            # Check for hidden files
+            if name.startswith('.') or (os.name == 'nt' and bool(st.st_file_attributes & stat.FILE_ATTRIBUTE_HIDDEN)):
+                findings.append(finding("hidden-file", "security", "info", rel_path, st,
+                                        f"Hidden file: {rel_path}"))
+            
+            # Check suspicious extensions
+            if any(name.lower().endswith(ext) for ext in suspicious_extensions):
+                findings.append(finding("sensitive-extension", "suspicious", "low", rel_path, st,
+                                        f"Potentially sensitive file found: {rel_path}"))
+            
+            # Check suspicious patterns in filename
+            if any(pattern in name.lower() for pattern in suspicious_patterns):
+                findings.append(finding("suspicious-name", "suspicious", "medium", rel_path, st,
+                                        f"Suspicious filename pattern: {rel_path}"))
+            
+            # Check file permissions
+            if not os.access(path, os.R_OK):
+                findings.append(finding("no-read-access", "security", "medium", rel_path, st,
+                                        f"No read access to: {rel_path}"))
+            
+            if os.name == 'nt' and os.access(path, os.X_OK) and name.lower().endswith(('.txt', '.doc', '.pdf', '.jpg')):
+                findings.append(finding("unusual-exec-permission", "security", "medium", rel_path, st,
+                                        f"Unusual execute permission on non-executable: {rel_path}"))
+            
+            # Check for potential malware signatures in executable files
+            if name.lower().endswith('.exe') and size < 100 * 1024:  # Small executables
+                findings.append(finding("small-executable", "suspicious", "low", rel_path, st,
+                                        f"Unusually small executable: {rel_path}"))
+            
+            # Check that the content matches the extension (reads a small header)
+            if size > 0:
+                kind = extension_mismatch(path)
+                if kind:
+                    severity = "high" if kind['mime'] in executable_mimes else "low"
+                    findings.append(finding("extension-mismatch", "suspicious", severity, rel_path, st,
+                                            f"Extension doesn't match content ({kind['name']}): {rel_path}",
+                                            detected=kind['name']))
+            
+            # Performance issues
+            if name.endswith(('.log', '.tmp')) and size > 10 * 1024 * 1024:  # 10MB
+                findings.append(finding("large-log", "performance", "low", rel_path, st,
+                                        f"Large log/temp file: {rel_path} ({humanize.naturalsize(size)})"))
+            
+            return rel_path, findings, size, st, False
+            
+        except Exception as e:
+            return rel_path, [finding("scan-error", "error", "error", rel_path, None,
+                                      f"Error scanning {os.path.basename(path)}: {str(e)}")], 0, None, False
+    
+    def record_finding(record):
+        if incremental:
+            if record["path"] in current_files:
+                current_files[record["path"]][3].append(record)
+            if previous_state:
+                record = dict(record, status="existing" if finding_key(record) in previous_keys else "new")
+        emit(record)
+        rule_counts[record["rule"]] += 1
+        if record["rule"] == "large-file":
+            entry = (record["size"], record["path"])
+            (heapq.heappush if len(largest) < 5 else heapq.heappushpop)(largest, entry)
+        elif record["rule"] == "old-file":
+            entry = (time.time() - record["mtime"], record["path"])
+            (heapq.heappush if len(oldest) < 5 else heapq.heappushpop)(oldest, entry)
+        elif record["category"] in issues and record["severity"] != "info":
+            category_counts[record["category"]] += 1
+            if category_counts[record["category"]] <= SCAN_SUMMARY_LIMIT:
+                issues[record["category"]].append(record["message"])
+    
+    def content_finding(path, rule, severity, message, **extra):
+        rel_path = os.path.relpath(path, directory)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        record_finding(finding(rule, "suspicious", severity, rel_path, st, message.format(path=rel_path), **extra))
+    
+    emit, close = open_report_sink(sink)
+    try:
+        # Stream files through the thread pool; nothing is kept per file
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for rel_path, findings, size, st, unchanged in bounded_map(executor, scan_file, iter_files(directory)):
+                total_size += size
+                if incremental and st is not None:
+                    current_files[rel_path] = [size, st.st_mtime_ns, st.st_ino, []]
+                    if unchanged:
+                        reused += 1
+                    elif previous_files and content_scan:
+                        changed_paths.append(os.path.join(directory, rel_path))
+                for record in findings:
+                    record_finding(record)
+        if previous_files:
+            print(f"{Fore.CYAN}Reused results for {reused} unchanged files, "
+                  f"re-evaluated {len(current_files) - reused} new or changed files")
+        
+        # Content signature stage (reads file contents, so only on request)
+        if content_scan:
+            # Incremental scans only need to read new or changed files
+            content_paths = changed_paths if previous_files else iter_files(directory)
+            print(f"{Fore.CYAN}Scanning file contents for known signatures...")
+            signatures = {sig['name']: sig for sig in CONTENT_SIGNATURES}
+            for path, names in scan_file_signatures(content_paths):
+                for name in names:
+                    content_finding(path, "signature", signatures[name].get('severity', 'medium'),
+                                    f"Signature match [{name}] {signatures[name]['description']}: {{path}}",
+                                    signature=name)
+            
+            print(f"{Fore.CYAN}Profiling file entropy...")
+            candidates = (path for path in (changed_paths if previous_files else iter_files(directory))
+                          if os.path.splitext(path)[1].lower() not in ENTROPY_EXEMPT_EXTENSIONS)
+            for path, profile in profile_entropy(candidates):
+                if profile['entropy'] >= ENTROPY_THRESHOLD and profile['high_ratio'] >= 0.9:
+                    kind = "Packed executable" if path.lower().endswith(('.exe', '.dll', '.sys')) else "Possibly encrypted file"
+                    content_finding(path, "high-entropy", "medium",
+                                    f"{kind} (entropy {profile['entropy']:.2f} bits/byte): {{path}}",
+                                    entropy=profile['entropy'])
+        
+        if incremental:
+            # Delta report: findings that appeared or disappeared since the previous scan
+            current = {finding_key(record): record for entry in current_files.values()
+                       for record in entry[3] if record["severity"] != "info"}
+            resolved = [record for entry in previous_state.get("files", {}).values() for record in entry[3]
+                        if record["severity"] != "info" and finding_key(record) not in current]
+            new = [record for key, record in current.items() if key not in previous_keys]
+            for record in resolved:
+                emit(dict(record, status="resolved"))
+            if not previous_state:
+                issues["changes"].append("No previous scan state; saved a baseline for the next scan")
+            else:
+                issues["changes"].append(f"{len(new)} new and {len(resolved)} resolved findings since the previous scan")
+                for record in new[:SCAN_SUMMARY_LIMIT]:
+                    issues["changes"].append(f"+ {record['message']}")
+                for record in resolved[:SCAN_SUMMARY_LIMIT]:
+                    issues["changes"].append(f"- Resolved: {record['message']}")
+            save_json_cache(state_name, {"version": rules_version, "directory": os.path.abspath(directory),
+                                         "files": current_files})
+    finally:
+        close()
+    
+    for category, count in category_counts.items():
+        if count > SCAN_SUMMARY_LIMIT:
+            issues[category].append(f"...and {count - SCAN_SUMMARY_LIMIT} more (see the full report)")
+    
+    # Add recommendations based on scan results
+    if total_size > 1024**3:  # 1GB
+        issues["recommendations"].append(
+            f"Large directory ({humanize.naturalsize(total_size)}). "
+            "Consider archiving old files."
+        )
+    
+    if largest:
+        issues["recommendations"].append(f"Large files found ({rule_counts['large-file']}):")
+        for size, rel_path in sorted(largest, reverse=True):
+            issues["recommendations"].append(f"  • {rel_path}: {humanize.naturalsize(size)}")
+    
+    if oldest:
+        issues["recommendations"].append(f"Old files that might be archived ({rule_counts['old-file']}):")
+        for age, rel_path in sorted(oldest, reverse=True):
+            issues["recommendations"].append(f"  • {rel_path}: {int(age / 86400)} days old")
+    
+    if rule_counts["hidden-file"]:
+        issues["recommendations"].append(f"Found {rule_counts['hidden-file']} hidden files")
+    
+    return issues
+
+def check_permissions(path):
+    """
+    Check file or directory permissions
+    
+    Args:
+        path (str): Path to check permissions for
+        
+    Returns:
+        dict: Dictionary containing permission information
+    """
+    result = {
+        "basic": {
+            "read": False,
+            "write": False,
+            "execute": False,
+            "delete": False
+        },
+        "owner": None,
+        "attributes": []
+    }
     
     try:
         # Check if path exists
@@ -1197,269 +4175,1741 @@ def check_permissions(path):
                 if attrs & win32con.FILE_ATTRIBUTE_ENCRYPTED:
                     result["attributes"].append("Encrypted")
                     
-                # Check delete permission
-                try:
-                    # Try to get delete permission without actually deleting
-                    sd = win32security.GetFileSecurity(
-                        path, win32security.DELETE)
-                    result["basic"]["delete"] = True
-                except:
-                    result["basic"]["delete"] = False
+                # Check delete permission
+                try:
+                    # Try to get delete permission without actually deleting
+                    sd = win32security.GetFileSecurity(
+                        path, win32security.DELETE)
+                    result["basic"]["delete"] = True
+                except:
+                    result["basic"]["delete"] = False
+            except Exception as e:
+                result["error"] = f"Windows permission error: {str(e)}"
+        
+        return result
+        
+    except Exception as e:
+        return {"error": f"Permission check error: {str(e)}"}
+
+def get_permission_string(access_mask):
+    perms = []
+    if access_mask & win32con.FILE_READ_DATA: perms.append("Read")
+    if access_mask & win32con.FILE_WRITE_DATA: perms.append("Write")
+    if access_mask & win32con.FILE_EXECUTE: perms.append("Execute")
+    if access_mask & win32con.DELETE: perms.append("Delete")
+    if access_mask & win32con.WRITE_DAC: perms.append("Change Permissions")
+    if access_mask & win32con.WRITE_OWNER: perms.append("Take Ownership")
+    return ", ".join(perms) if perms else "No Access"
+
+def disk_health_check():
+    """
+    Perform a comprehensive disk health check
+    
+    Returns:
+        dict: Dictionary containing disk health information
+    """
+    results = {
+        "space_usage": {},
+        "performance": {},
+        "warnings": [],
+        "errors": []
+    }
+    
+    try:
+        # Check disk space
+        for partition in psutil.disk_partitions():
+            if 'fixed' in partition.opts:
+                try:
+                    usage = psutil.disk_usage(partition.mountpoint)
+                    results["space_usage"][partition.mountpoint] = {
+                        "total": usage.total,
+                        "used": usage.used,
+                        "free": usage.free,
+                        "percent_used": usage.percent
+                    }
+                    
+                    # Add warnings for low disk space
+                    if usage.percent > 90:
+                        results["warnings"].append(
+                            f"Low disk space on {partition.mountpoint}: {usage.percent}% used"
+                        )
+                except Exception as e:
+                    results["errors"].append(f"Error checking {partition.mountpoint}: {str(e)}")
+        
+        # Check disk performance (Windows only)
+        if os.name == 'nt':
+            try:
+                # Check disk status
+                status_output = subprocess.check_output(
+                    ["wmic", "diskdrive", "get", "status"], 
+                    universal_newlines=True
+                )
+                status_lines = status_output.strip().split('\n')[1:]
+                if any(status != "OK" for status in status_lines if status.strip()):
+                    results["errors"].append("Disk hardware issues detected")
+                results["performance"]["disk_status"] = "OK" if all(
+                    status == "OK" for status in status_lines if status.strip()
+                ) else "Issues detected"
+                
+                # Check fragmentation (simplified)
+                results["performance"]["fragmentation"] = "Unknown (run defrag for details)"
+                
+                # Simple disk speed test
+                try:
+                    # Write test
+                    test_file = os.path.join(os.environ.get('TEMP', '.'), 'disk_test.tmp')
+                    start_time = time.time()
+                    with open(test_file, 'wb') as f:
+                        f.write(os.urandom(50 * 1024 * 1024))  # 50MB test file
+                    write_time = time.time() - start_time
+                    write_speed = 50 / write_time  # MB/s
+                    
+                    # Read test
+                    start_time = time.time()
+                    with open(test_file, 'rb') as f:
+                        f.read()
+                    read_time = time.time() - start_time
+                    read_speed = 50 / read_time  # MB/s
+                    
+                    # Clean up
+                    os.remove(test_file)
+                    
+                    results["performance"]["write_speed"] = f"{write_speed:.1f} MB/s"
+                    results["performance"]["read_speed"] = f"{read_speed:.1f} MB/s"
+                    
+                    if write_speed < 10 or read_speed < 20:
+                        results["warnings"].append("Slow disk performance detected")
+                        
+                except Exception as e:
+                    results["warnings"].append(f"Could not test disk speed: {str(e)}")
+                    
             except Exception as e:
-                result["error"] = f"Windows permission error: {str(e)}"
+                results["warnings"].append(f"Could not check disk status: {str(e)}")
         
-        return result
+        return results
         
     except Exception as e:
-        return {"error": f"Permission check error: {str(e)}"}
+        results["errors"].append(f"Disk health check error: {str(e)}")
+        return results
+
+def cache_locations() -> List[str]:
+    """Return the existing temporary/cache directories that clean_cache works on"""
+    if os.name == 'nt':  # Windows
+        paths = [
+            os.environ.get('TEMP'),
+            os.environ.get('TMP'),
+            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Temp'),
+            os.path.join(os.environ.get('WINDIR', ''), 'Temp')
+        ]
+    else:  # Unix/Linux/Mac
+        paths = [
+            '/tmp',
+            os.path.expanduser('~/.cache')
+        ]
+    # TEMP and TMP usually point to the same place
+    unique = {}
+    for path in paths:
+        if path and os.path.isdir(path):
+            unique.setdefault(os.path.normcase(os.path.realpath(path)), os.path.realpath(path))
+    return list(unique.values())
+
+def open_files_census() -> set:
+    """
+    Collect the paths of every file currently open by any process, in one pass.
+
+    Reads /proc/*/fd where available and falls back to psutil's open_files;
+    processes we may not inspect are skipped.
+
+    Returns:
+        set: Normcased paths of open files
+    """
+    in_use = set()
+    if os.path.isdir('/proc/self/fd'):
+        for pid in os.listdir('/proc'):
+            if not pid.isdigit():
+                continue
+            fd_dir = f'/proc/{pid}/fd'
+            try:
+                fds = os.listdir(fd_dir)
+            except OSError:
+                continue
+            for fd in fds:
+                try:
+                    in_use.add(os.readlink(os.path.join(fd_dir, fd)))
+                except OSError:
+                    continue
+        return in_use
+    for proc in psutil.process_iter():
+        try:
+            in_use.update(os.path.normcase(f.path) for f in proc.open_files())
+        except (psutil.Error, OSError):
+            continue
+    return in_use
+
+def walk_cache_location(location: str, dirs: Optional[List[str]] = None):
+    """
+    Stream the deletable files of a cache location.
+
+    Protected directories are pruned and protected extensions skipped. Only
+    regular files are yielded: sockets and FIFOs (X11, tmux, ssh-agent) never
+    show up in the open-files census, and symlinks point elsewhere.
+    Subdirectories are appended to dirs (parents before children) so callers
+    can remove the empty ones afterwards.
+
+    Yields:
+        Tuple[str, os.stat_result]: File path and its stat
+    """
+    stack = [location]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not any(skip in entry.name for skip in CACHE_PROTECTED_DIRS):
+                                stack.append(entry.path)
+                                if dirs is not None:
+                                    dirs.append(entry.path)
+                            continue
+                        if not entry.is_file(follow_symlinks=False) or \
+                                os.path.splitext(entry.name)[1].lower() in CACHE_PROTECTED_EXTENSIONS:
+                            continue
+                        yield entry.path, entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+def clean_cache(dry_run: bool = False, workers: int = MAX_WORKERS, free_target: Optional[int] = None,
+                max_age_days: Optional[float] = None, dir_quota: Optional[int] = None) -> Tuple[int, List[str], Dict[str, int]]:
+    """
+    Clean temporary files and directories from system cache locations.
+    
+    With any of free_target, max_age_days or dir_quota, only the files those
+    policies select are deleted (see evict_cache); otherwise everything is.
+    
+    Each location is walked once, streaming files straight into a thread pool
+    that unlinks them. Files open in any process (from one open_files_census
+    taken up front) are left alone, as are files the OS refuses to delete
+    because they are locked.
+    
+    Args:
+        dry_run (bool): Only measure what would be deleted
+        workers (int): Threads unlinking files
+        free_target (int, optional): Bytes that should be free on each location's disk
+        max_age_days (float, optional): Delete files not accessed for this many days
+        dir_quota (int, optional): Maximum bytes per top-level cache directory
+    
+    Returns:
+        tuple: (int, list, dict) Number of items cleaned (or that would be),
+        list of errors, and bytes reclaimed (or reclaimable) per location
+    """
+    if free_target is not None or max_age_days is not None or dir_quota is not None:
+        return evict_cache(free_target, max_age_days, dir_quota, dry_run, workers)
+    
+    cleaned = 0
+    errors = []
+    reclaimed = {}
+    in_use = open_files_census()
+    
+    def unlink(item):
+        filepath, st = item
+        if os.path.normcase(filepath) in in_use:
+            return False, 0, None
+        if dry_run:
+            return True, st.st_size, None
+        try:
+            os.unlink(filepath)
+            return True, st.st_size, None
+        except (FileNotFoundError, PermissionError):
+            # Already gone, or locked / owned by another user
+            return False, 0, None
+        except OSError as e:
+            return False, 0, f"Error deleting {filepath}: {str(e)}"
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for path in cache_locations():
+            print(f"{Fore.YELLOW}{'Measuring' if dry_run else 'Cleaning'} {path}...")
+            reclaimed[path] = 0
+            dirs = []
+            try:
+                for removed, size, error in bounded_map(executor, unlink, walk_cache_location(path, dirs)):
+                    if error:
+                        errors.append(error)
+                    if removed:
+                        cleaned += 1
+                        reclaimed[path] += size
+            except Exception as e:
+                errors.append(f"Error processing {path}: {str(e)}")
+            if dry_run:
+                continue
+            # Children were listed after their parents, so this removes leaves first
+            for dirpath in reversed(dirs):
+                try:
+                    os.rmdir(dirpath)
+                    cleaned += 1
+                except OSError:
+                    continue
+    
+    return cleaned, errors, reclaimed
+
+def _scan_cache_dir(folder: str) -> Tuple[List[Tuple[float, str, int]], List[str]]:
+    """List one cache directory: deletable regular files as (atime, path, size), and subdirectories to descend into"""
+    files, subdirs = [], []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not any(skip in entry.name for skip in CACHE_PROTECTED_DIRS):
+                        subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and \
+                        os.path.splitext(entry.name)[1].lower() not in CACHE_PROTECTED_EXTENSIONS:
+                    # Sockets and FIFOs are skipped like in walk_cache_location
+                    st = entry.stat(follow_symlinks=False)
+                    files.append((st.st_atime, entry.path, st.st_size))
+            except OSError:
+                continue
+    return files, subdirs
+
+def refresh_cache_summaries(location: str, previous: Dict[str, Any], summaries: Dict[str, Any], now: float) -> None:
+    """
+    Bring the per-directory summaries of a cache location up to date.
+
+    Every directory is stat'ed, but only those whose mtime changed or whose
+    summary is older than CACHE_SUMMARY_TTL are listed again. A summary holds
+    the directory's own deletable 'bytes' and 'oldest' atime, plus
+    'tree_bytes' and 'tree_oldest' for its whole subtree. Since atimes only
+    move forward, 'tree_oldest' stays a safe lower bound between listings.
+
+    Args:
+        location (str): Cache location to walk
+        previous (dict): Summaries from the last run
+        summaries (dict): Receives the current summaries
+        now (float): Timestamp of this run
+    """
+    order = []
+    stack = [location]
+    while stack:
+        folder = stack.pop()
+        try:
+            mtime_ns = os.stat(folder).st_mtime_ns
+        except OSError:
+            continue
+        summary = previous.get(folder)
+        if not summary or summary['mtime'] != mtime_ns or now - summary['checked'] > CACHE_SUMMARY_TTL:
+            try:
+                files, subdirs = _scan_cache_dir(folder)
+            except OSError:
+                continue
+            summary = {'mtime': mtime_ns, 'checked': now, 'bytes': sum(f[2] for f in files),
+                       'oldest': min((f[0] for f in files), default=None), 'subdirs': subdirs}
+        summaries[folder] = summary
+        order.append(folder)
+        stack.extend(summary['subdirs'])
+    # Parents come before their children in order, so walk it backwards
+    for folder in reversed(order):
+        summary = summaries[folder]
+        children = [summaries[sub] for sub in summary['subdirs'] if sub in summaries]
+        summary['tree_bytes'] = summary['bytes'] + sum(child['tree_bytes'] for child in children)
+        oldest = [summary['oldest']] + [child['tree_oldest'] for child in children]
+        summary['tree_oldest'] = min((atime for atime in oldest if atime is not None), default=None)
+
+def lru_cache_candidates(root: str, summaries: Dict[str, Any]):
+    """
+    Yield the deletable files below root, least recently accessed first.
+
+    Directories and files share one heap. A directory is keyed by its
+    summary's 'tree_oldest' and is only listed when it reaches the top, so
+    stopping early never lists directories whose files are all newer than
+    what was taken.
+
+    Yields:
+        Tuple[float, str, int]: atime, path and size
+    """
+    summary = summaries.get(root)
+    if not summary or summary['tree_oldest'] is None:
+        return
+    heap = [(summary['tree_oldest'], 0, root, 0)]
+    while heap:
+        key, kind, path, size = heapq.heappop(heap)
+        if kind == 1:
+            yield key, path, size
+            continue
+        try:
+            files, subdirs = _scan_cache_dir(path)
+        except OSError:
+            continue
+        for atime, filepath, file_size in files:
+            heapq.heappush(heap, (atime, 1, filepath, file_size))
+        for sub in subdirs:
+            sub_summary = summaries.get(sub)
+            if sub_summary is None:
+                heapq.heappush(heap, (0, 0, sub, 0))  # Not summarized yet: list it early
+            elif sub_summary['tree_oldest'] is not None:
+                heapq.heappush(heap, (sub_summary['tree_oldest'], 0, sub, 0))
+
+def evict_cache(free_target: Optional[int] = None, max_age_days: Optional[float] = None,
+                dir_quota: Optional[int] = None, dry_run: bool = False,
+                workers: int = MAX_WORKERS) -> Tuple[int, List[str], Dict[str, int]]:
+    """
+    Delete cache files by policy, least recently accessed first, and only as many as needed.
+
+    Policies run in this order on every location from cache_locations():
+    files not accessed in max_age_days, then each top-level cache directory
+    (e.g. ~/.cache/pip) trimmed to dir_quota bytes, then LRU eviction until
+    the location's disk has free_target bytes free. Per-directory summaries
+    are cached between runs (see refresh_cache_summaries). When the policies
+    are already met, a run only stats directories, so it is cheap enough for
+    cron. A lock file keeps overlapping runs apart.
+
+    Args:
+        free_target (int, optional): Bytes that should be free on each location's disk
+        max_age_days (float, optional): Delete files not accessed for this many days
+        dir_quota (int, optional): Maximum bytes per top-level cache directory
+        dry_run (bool): Only report what would be deleted
+        workers (int): Threads unlinking files
+
+    Returns:
+        tuple: (int, list, dict) Files deleted, list of errors, and bytes
+        reclaimed (or reclaimable) per location
+    """
+    cleaned = 0
+    errors = []
+    reclaimed = {}
+    lock_path = os.path.join(CACHE_DIR, 'evict_cache.lock')
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    try:
+        if time.time() - os.path.getmtime(lock_path) > CACHE_EVICT_LOCK_TIMEOUT:
+            os.remove(lock_path)  # Left behind by a crashed run
+    except OSError:
+        pass
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return 0, ["Another cache eviction is already running"], {}
+
+    now = time.time()
+    previous = load_json_cache(CACHE_SUMMARIES).get('dirs', {})
+    summaries = {}
+    removed = set()
+    census = []
+    devices = {}
+    freed_by_dir = collections.Counter()  # Top-level cache directory -> bytes freed so far
+
+    def in_use(filepath):
+        if not census:
+            census.append(open_files_census())
+        return os.path.normcase(filepath) in census[0]
+
+    def unlink(item):
+        filepath, size = item
+        if dry_run:
+            return filepath, True, size, None
+        try:
+            os.unlink(filepath)
+            return filepath, True, size, None
+        except (FileNotFoundError, PermissionError):
+            # Already gone, or locked / owned by another user
+            return filepath, False, 0, None
+        except OSError as e:
+            return filepath, False, 0, f"Error deleting {filepath}: {str(e)}"
+
+    def evict(executor, location, candidates, needed=None, older_than=None):
+        """Delete candidates (stopping at older_than or once needed bytes are freed); returns bytes freed"""
+        freed = 0
+        batch, batch_bytes = [], 0
+
+        def flush():
+            nonlocal cleaned, freed
+            for filepath, deleted, size, error in executor.map(unlink, batch):
+                if error:
+                    errors.append(error)
+                if deleted:
+                    removed.add(filepath)
+                    cleaned += 1
+                    freed += size
+                    reclaimed[location] += size
+                    parts = os.path.relpath(filepath, location).split(os.sep)
+                    if len(parts) > 1:
+                        freed_by_dir[os.path.join(location, parts[0])] += size
+                    summary = summaries.get(os.path.dirname(filepath))
+                    if summary:
+                        summary['checked'] = 0  # List it again next run
+            batch.clear()
+
+        for atime, filepath, size in candidates:
+            if older_than is not None and atime >= older_than:
+                break
+            if filepath in removed or in_use(filepath):
+                continue
+            batch.append((filepath, size))
+            batch_bytes += size
+            if len(batch) >= CACHE_EVICT_BATCH or (needed is not None and freed + batch_bytes >= needed):
+                flush()
+                batch_bytes = 0
+                if needed is not None and freed >= needed:
+                    break
+        if batch:
+            flush()
+        return freed
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            for location in cache_locations():
+                reclaimed[location] = 0
+                devices[location] = os.stat(location).st_dev
+                refresh_cache_summaries(location, previous, summaries, now)
+                if location not in summaries:
+                    continue
+                if max_age_days is not None:
+                    cutoff = now - max_age_days * 86400
+                    if (summaries[location]['tree_oldest'] or now) < cutoff:
+                        evict(executor, location, lru_cache_candidates(location, summaries), older_than=cutoff)
+                if dir_quota is not None:
+                    for cache_dir in summaries[location]['subdirs']:
+                        summary = summaries.get(cache_dir)
+                        if not summary:
+                            continue
+                        # Files the age policy already deleted no longer count against the quota
+                        summary['tree_bytes'] -= freed_by_dir.pop(cache_dir, 0)
+                        if summary['tree_bytes'] > dir_quota:
+                            evict(executor, location, lru_cache_candidates(cache_dir, summaries),
+                                  needed=summary['tree_bytes'] - dir_quota)
+                            summary['tree_bytes'] -= freed_by_dir.pop(cache_dir, 0)
+                if free_target is not None:
+                    needed = free_target - shutil.disk_usage(location).free
+                    if dry_run:
+                        # Nothing was deleted, so count what earlier steps would have freed on this disk
+                        needed -= sum(size for other, size in reclaimed.items()
+                                      if devices[other] == devices[location])
+                    if needed > 0:
+                        evict(executor, location, lru_cache_candidates(location, summaries), needed=needed)
+        save_json_cache(CACHE_SUMMARIES, {'dirs': summaries})
+    finally:
+        os.remove(lock_path)
+    return cleaned, errors, reclaimed
+
+def evict_cache_cli(argv: List[str]) -> int:
+    """
+    Command-line entry point for unattended (cron) cache eviction.
+
+    Example: Multitool.py --evict-cache --free-gb 20 --max-age-days 7 --dir-quota-gb 5
+
+    Returns:
+        int: Process exit code
+    """
+    import argparse
+    parser = argparse.ArgumentParser(prog='Multitool.py --evict-cache',
+                                     description='Delete cache files by policy, least recently accessed first.')
+    parser.add_argument('--free-gb', type=float, help='free space to keep on each cache disk')
+    parser.add_argument('--max-age-days', type=float, help='delete files not accessed for this many days')
+    parser.add_argument('--dir-quota-gb', type=float, help='maximum size of each top-level cache directory')
+    parser.add_argument('--dry-run', action='store_true', help='only report what would be deleted')
+    args = parser.parse_args(argv)
+    if args.free_gb is None and args.max_age_days is None and args.dir_quota_gb is None:
+        parser.error('give at least one of --free-gb, --max-age-days, --dir-quota-gb')
+    cleaned, errors, reclaimed = evict_cache(
+        free_target=int(args.free_gb * 1024 ** 3) if args.free_gb is not None else None,
+        max_age_days=args.max_age_days,
+        dir_quota=int(args.dir_quota_gb * 1024 ** 3) if args.dir_quota_gb is not None else None,
+        dry_run=args.dry_run)
+    for location, size in reclaimed.items():
+        print(f"{location}: {humanize.naturalsize(size)} {'reclaimable' if args.dry_run else 'freed'}")
+    print(f"{cleaned} files {'would be deleted' if args.dry_run else 'deleted'}.")
+    for error in errors:
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+class PollingWatcher:
+    """
+    Polling change source for DirectoryMonitor, for mounts where native events don't fire.
+
+    The snapshot is compact: per directory, its mtime, the sorted tuple of file
+    names and parallel arrays of inode, size and mtime_ns (plus subdirectory
+    names). Each tick stats only the directories; a directory whose mtime
+    changed is rescanned and diffed against its snapshot with a sorted merge,
+    and a rolling window of restat_budget files in unchanged directories is
+    re-stat'ed to catch in-place modifications. Deletions and creations of
+    the same file (inode, size and mtime) within one tick are reported as
+    moves. Offers the same start/stop/join interface as a watchdog observer.
+    """
+
+    def __init__(self, monitor: 'DirectoryMonitor', directory: str, recursive: bool = False,
+                 interval: float = MONITOR_POLL_INTERVAL, restat_budget: int = MONITOR_RESTAT_BUDGET):
+        self.monitor = monitor
+        self.directory = directory
+        self.recursive = recursive
+        self.interval = interval
+        self.restat_budget = restat_budget
+        self.dirs = {}  # path -> (mtime_ns, names, inodes, sizes, mtimes, subdirs)
+        self.cursor = (0, 0)  # (directory index, file index) of the rolling restat
+        self.stopping = threading.Event()
+        self.thread = None
+
+    @staticmethod
+    def _scan(path: str, mtime_ns: int) -> Tuple:
+        """Snapshot one directory"""
+        files = []
+        subdirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                files.append((entry.name, st.st_ino, st.st_size, st.st_mtime_ns))
+        files.sort()
+        return (mtime_ns, tuple(f[0] for f in files), array.array('Q', (f[1] for f in files)),
+                array.array('Q', (f[2] for f in files)), array.array('q', (f[3] for f in files)),
+                tuple(sorted(subdirs)))
+
+    @staticmethod
+    def _identity(snapshot: Tuple, index: int) -> Tuple[int, int, int]:
+        """(inode, size, mtime_ns) of a file in a directory snapshot, used to pair up moves"""
+        return snapshot[2][index], snapshot[3][index], snapshot[4][index]
+
+    def _diff(self, path: str, old: Tuple, new: Tuple, created: list, deleted: list) -> None:
+        """Sorted-merge diff of two snapshots of one directory"""
+        old_names, new_names = old[1], new[1]
+        i = j = 0
+        while i < len(old_names) or j < len(new_names):
+            if j == len(new_names) or (i < len(old_names) and old_names[i] < new_names[j]):
+                deleted.append((os.path.join(path, old_names[i]), self._identity(old, i)))
+                i += 1
+            elif i == len(old_names) or new_names[j] < old_names[i]:
+                created.append((os.path.join(path, new_names[j]), self._identity(new, j)))
+                j += 1
+            else:
+                if old[2][i] != new[2][j]:
+                    # Replaced by a different file under the same name
+                    deleted.append((os.path.join(path, old_names[i]), self._identity(old, i)))
+                    created.append((os.path.join(path, new_names[j]), self._identity(new, j)))
+                elif old[3][i] != new[3][j] or old[4][i] != new[4][j]:
+                    self.monitor.submit('modified', os.path.join(path, new_names[j]))
+                i += 1
+                j += 1
+
+    def _forget(self, path: str, deleted: Optional[list]) -> None:
+        """Drop a directory subtree from the snapshot, reporting its files as deleted"""
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            snapshot = self.dirs.pop(current, None)
+            if snapshot is None:
+                continue
+            if deleted is not None:
+                deleted.extend((os.path.join(current, name), self._identity(snapshot, i))
+                               for i, name in enumerate(snapshot[1]))
+            stack.extend(os.path.join(current, sub) for sub in snapshot[5])
+
+    def poll(self, report: bool = True) -> None:
+        """Run one tick: rescan changed directories, restat a slice of the rest and submit the differences"""
+        created, deleted = [], []
+        stack = [self.directory]
+        order = []
+        while stack:
+            path = stack.pop()
+            old = self.dirs.get(path)
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+                new = old if old is not None and old[0] == mtime_ns else self._scan(path, mtime_ns)
+            except OSError:
+                self._forget(path, deleted if report else None)
+                continue
+            if new is not old:
+                self.dirs[path] = new
+                if old is not None:
+                    self._diff(path, old, new, created, deleted)
+                    for sub in set(old[5]) - set(new[5]):
+                        self._forget(os.path.join(path, sub), deleted)
+                        self.monitor.submit('dir_deleted', os.path.join(path, sub))
+                elif report:
+                    created.extend((os.path.join(path, name), self._identity(new, i))
+                                   for i, name in enumerate(new[1]))
+            else:
+                order.append(path)
+            if self.recursive:
+                stack.extend(os.path.join(path, sub) for sub in new[5])
+        if report:
+            self._restat(sorted(order))
+        moved_from = {identity: path for path, identity in deleted if identity[0]}
+        for path, identity in created:
+            source = moved_from.pop(identity, None) if identity[0] else None
+            if source is not None:
+                self.monitor.submit('moved', source, path)
+            else:
+                self.monitor.submit('created', path)
+        for path in moved_from.values():
+            self.monitor.submit('deleted', path)
+        for path, identity in deleted:
+            if not identity[0]:
+                self.monitor.submit('deleted', path)
+
+    def _restat(self, order: List[str]) -> None:
+        """Re-stat the next restat_budget files of unchanged directories, wrapping around"""
+        if not order:
+            return
+        dir_index, file_index = self.cursor
+        dir_index %= len(order)
+        budget = self.restat_budget
+        visited = 0
+        while budget > 0 and visited <= len(order):
+            path = order[dir_index]
+            _, names, inodes, sizes, mtimes, _ = self.dirs[path]
+            while file_index < len(names) and budget > 0:
+                budget -= 1
+                try:
+                    st = os.lstat(os.path.join(path, names[file_index]))  # Like _scan, don't follow symlinks
+                except OSError:
+                    file_index += 1
+                    continue
+                if st.st_size != sizes[file_index] or st.st_mtime_ns != mtimes[file_index]:
+                    sizes[file_index] = st.st_size
+                    mtimes[file_index] = st.st_mtime_ns
+                    inodes[file_index] = st.st_ino
+                    self.monitor.submit('modified', os.path.join(path, names[file_index]))
+                file_index += 1
+            if file_index >= len(names):
+                dir_index = (dir_index + 1) % len(order)
+                file_index = 0
+                visited += 1
+        self.cursor = (dir_index, file_index)
+
+    def _run(self) -> None:
+        self.poll(report=False)
+        while not self.stopping.wait(self.interval):
+            self.poll()
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopping.set()
+
+    def join(self) -> None:
+        if self.thread is not None:
+            self.thread.join()
+
+class DirectoryMonitor:
+    """
+    Coalescing event pipeline between a change source and event sinks.
+
+    Producers (watchdog callbacks) only call submit, which puts the raw event
+    on a bounded queue and counts it as dropped if the queue is full. A
+    consumer thread merges the events for each path over a window into their
+    net effect (created+modified -> created, created+deleted -> nothing,
+    deleted+created -> modified, renames follow the file), stats each path
+    once when it is flushed, and passes one event dict per path to every sink.
+    Sizes last reported per path are kept in a bounded LRU to suppress
+    modifications that changed nothing. After a drop, an 'overflow' event
+    tells sinks that their view may be stale.
+
+    Event dicts have 'type' ('created', 'modified', 'deleted', 'moved',
+    'dir_deleted', 'dir_moved' or 'overflow'), 'path', 'src' (moves), 'size',
+    'time' and 'count' (raw events merged into it). Directory events are not
+    merged with file events and carry no size.
+
+    The change source is watchdog ('native') or a PollingWatcher ('polling');
+    'auto' uses watchdog when it is available.
+
+    Sinks that write files of their own (event logs) list them in a 'paths'
+    attribute. Changes to those files, and to files named after them such as
+    rotated logs or SQLite '-wal' files, are ignored, so a log kept inside the
+    watched directory does not feed on its own writes.
+    """
+
+    def __init__(self, directory: str, sinks=None, recursive: bool = False,
+                 window: float = MONITOR_COALESCE_WINDOW, queue_size: int = MONITOR_QUEUE_SIZE,
+                 state_size: int = MONITOR_STATE_SIZE, backend: str = 'auto',
+                 poll_interval: float = MONITOR_POLL_INTERVAL):
+        self.directory = os.path.abspath(directory)
+        self.sinks = list(sinks or [])
+        self.owned = [os.path.abspath(path) for sink in self.sinks for path in getattr(sink, 'paths', ())]
+        self.recursive = recursive
+        if backend == 'auto':
+            backend = 'native' if 'Observer' in globals() else 'polling'
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.window = window
+        self.state_size = state_size
+        self.events = queue.Queue(maxsize=queue_size)
+        self.pending = collections.OrderedDict()  # path -> [type, src, first seen, count]
+        self.known = collections.OrderedDict()  # path -> (size, mtime_ns) last reported
+        self.counters = {'received': 0, 'dropped': 0, 'emitted': 0, 'coalesced': 0, 'sink_errors': 0}
+        self.dropped_since_flush = 0
+        self.drop_lock = threading.Lock()  # submit runs on producer threads, _flush on the consumer
+        self.stopping = threading.Event()
+        self.observer = None
+        self.consumer = None
+
+    def _is_owned(self, path: str) -> bool:
+        """Whether a path is (or is named after) a file written by one of the sinks"""
+        path = os.path.abspath(path)
+        return any(path == owned or (path.startswith(owned) and path[len(owned)] in '.-') for owned in self.owned)
+
+    def submit(self, kind: str, path: str, dest: Optional[str] = None) -> None:
+        """Queue a raw event without blocking; counts it as dropped if the queue is full"""
+        if self.owned and self._is_owned(path) and (dest is None or self._is_owned(dest)):
+            return
+        self.counters['received'] += 1
+        try:
+            self.events.put_nowait((kind, path, dest, time.time()))
+        except queue.Full:
+            with self.drop_lock:
+                self.counters['dropped'] += 1
+                self.dropped_since_flush += 1
+
+    def start(self) -> 'DirectoryMonitor':
+        """Start the consumer thread and the change source"""
+        self.consumer = threading.Thread(target=self._consume, daemon=True)
+        self.consumer.start()
+        if self.backend == 'polling':
+            self.observer = PollingWatcher(self, self.directory, self.recursive, self.poll_interval)
+            self.observer.start()
+            return self
+        monitor = self
+
+        class QueueHandler(FileSystemEventHandler):
+            def on_created(self, event):
+                if not event.is_directory:
+                    monitor.submit('created', event.src_path)
+
+            def on_modified(self, event):
+                if not event.is_directory:
+                    monitor.submit('modified', event.src_path)
+
+            def on_deleted(self, event):
+                monitor.submit('dir_deleted' if event.is_directory else 'deleted', event.src_path)
+
+            def on_moved(self, event):
+                monitor.submit('dir_moved' if event.is_directory else 'moved', event.src_path, event.dest_path)
+
+        self.observer = Observer()
+        self.observer.schedule(QueueHandler(), self.directory, recursive=self.recursive)
+        self.observer.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop watching, flush everything still pending to the sinks and wait for the consumer"""
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+        self.stopping.set()
+        if self.consumer is not None:
+            self.consumer.join()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Pipeline counters plus the current queue and pending depth"""
+        return dict(self.counters, queued=self.events.qsize(), pending=len(self.pending))
+
+    def _merge(self, kind: str, path: str, dest: Optional[str], now: float) -> None:
+        """Fold one raw event into the pending net effect for its path"""
+        if kind in ('dir_deleted', 'dir_moved'):
+            key = dest or path
+            previous = self.pending.pop(key, None)
+            self.pending[key] = [kind, path if dest else None, now, previous[3] + 1 if previous else 1]
+            return
+        if kind == 'moved':
+            previous = self.pending.pop(path, None)
+            if previous is None:
+                merged = ['moved', path, now, 1]
+            elif previous[0] == 'created':
+                merged = ['created', None, previous[2], previous[3] + 1]
+            elif previous[0] == 'moved':
+                merged = ['moved', previous[1], previous[2], previous[3] + 1]
+            else:
+                merged = ['moved', path, previous[2], previous[3] + 1]
+            if merged[0] == 'moved' and merged[1] == dest:
+                merged[0], merged[1] = 'modified', None
+            replaced = self.pending.pop(dest, None)
+            if replaced is not None:
+                merged[3] += replaced[3]
+                self.counters['coalesced'] += 1
+            self.pending[dest] = merged
+            self.known.pop(path, None)
+            return
+        entry = self.pending.get(path)
+        if entry is None:
+            self.pending[path] = [kind, None, now, 1]
+            return
+        self.counters['coalesced'] += 1
+        entry[3] += 1
+        previous = entry[0]
+        if kind == 'deleted':
+            if previous == 'created':
+                del self.pending[path]  # Never existed as far as the sinks know
+                return
+            if previous == 'moved':
+                # Renamed here, then deleted: the original path is what disappeared
+                del self.pending[path]
+                self.pending[entry[1]] = ['deleted', None, entry[2], entry[3]]
+                return
+            entry[0] = 'deleted'
+        elif kind == 'created':
+            entry[0] = 'modified' if previous == 'deleted' else previous
+        elif kind == 'modified' and previous == 'deleted':
+            entry[0] = 'modified'
+
+    def _flush(self, now: float, force: bool = False) -> None:
+        """Emit every pending path whose window has elapsed (or all of them if forced)"""
+        with self.drop_lock:
+            dropped, self.dropped_since_flush = self.dropped_since_flush, 0
+        if dropped:
+            self._emit({'type': 'overflow', 'path': self.directory, 'src': None, 'size': None,
+                        'time': now, 'count': dropped})
+        while self.pending:
+            path, (kind, src, first_seen, count) = next(iter(self.pending.items()))
+            if not force and now - first_seen < self.window:
+                break
+            del self.pending[path]
+            size = None
+            if kind == 'deleted':
+                self.known.pop(path, None)
+            elif kind in ('dir_deleted', 'dir_moved'):
+                pass
+            else:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    if kind == 'created':
+                        continue
+                    kind, src = 'deleted', None
+                    self.known.pop(path, None)
+                else:
+                    size = st.st_size
+                    signature = (st.st_size, st.st_mtime_ns)
+                    if kind == 'modified' and self.known.get(path) == signature:
+                        self.known.move_to_end(path)
+                        continue
+                    self.known[path] = signature
+                    self.known.move_to_end(path)
+                    while len(self.known) > self.state_size:
+                        self.known.popitem(last=False)
+            self._emit({'type': kind, 'path': path, 'src': src, 'size': size, 'time': now, 'count': count})
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        self.counters['emitted'] += 1
+        for sink in self.sinks:
+            try:
+                sink(event)
+            except Exception:
+                self.counters['sink_errors'] += 1
+
+    def _consume(self) -> None:
+        while True:
+            timeout = self.window / 2
+            try:
+                item = self.events.get(timeout=timeout)
+                self._merge(item[0], item[1], item[2], item[3])
+                # Drain whatever else is already queued before flushing (at most one queue's worth)
+                for _ in range(self.events.maxsize or MONITOR_QUEUE_SIZE):
+                    item = self.events.get_nowait()
+                    self._merge(item[0], item[1], item[2], item[3])
+            except queue.Empty:
+                pass
+            stopping = self.stopping.is_set() and self.events.empty()
+            self._flush(time.time(), force=stopping)
+            if stopping:
+                return
+
+class NDJSONEventLog:
+    """NDJSON event log that rotates to '<path>.<timestamp>' by size or age"""
+
+    def __init__(self, path: str, max_bytes: int = EVENT_LOG_MAX_BYTES, max_age: float = EVENT_LOG_MAX_AGE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.stream = None
+        self.paths = [path]  # Rotated logs are named after it
+
+    def open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.stream = open(self.path, 'a', encoding='utf-8', buffering=1024 * 1024)
+        self.opened = time.time()
+
+    def write(self, events: List[Dict[str, Any]]) -> None:
+        self.stream.write(''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in events))
+        if self.stream.tell() >= self.max_bytes or time.time() - self.opened >= self.max_age:
+            self.sync()
+            self.stream.close()
+            os.replace(self.path, f"{self.path}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}")
+            self.open()
+
+    def sync(self) -> None:
+        self.stream.flush()
+        os.fsync(self.stream.fileno())
+
+    def close(self) -> None:
+        self.sync()
+        self.stream.close()
+
+class SQLiteEventLog:
+    """SQLite event table (WAL mode, one transaction per batch)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = None
+        self.paths = [path]  # Also covers the -wal and -shm files
+
+    def open(self) -> None:
+        # Connections are bound to the thread that opens them: the writer thread
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS events (time REAL, type TEXT, path TEXT, "
+                        "src TEXT, size INTEGER, count INTEGER)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS events_path ON events (path)")
+
+    def write(self, events: List[Dict[str, Any]]) -> None:
+        with self.db:
+            self.db.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)",
+                                [(e['time'], e['type'], e['path'], e.get('src'), e.get('size'), e.get('count'))
+                                 for e in events])
+
+    def sync(self) -> None:
+        self.db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self) -> None:
+        self.sync()
+        self.db.close()
+
+class UnixSocketEventFeed:
+    """
+    Unix domain socket that streams NDJSON events to every connected subscriber.
+
+    Subscribers that cannot keep up (their socket buffer is full) are
+    disconnected rather than allowed to slow the writer down.
+    """
+
+    def __init__(self, path: str):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise OSError("Unix domain sockets are not supported on this platform")
+        self.path = path
+        self.server = None
+        self.subscribers = []
+        self.paths = [path]
+
+    def _remove_socket(self) -> None:
+        """Remove a leftover socket at path; anything else there is refused rather than deleted"""
+        try:
+            st = os.lstat(self.path)
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(st.st_mode):
+            raise FileExistsError(f"Not a socket, refusing to replace it: {self.path}")
+        os.remove(self.path)
+
+    def open(self) -> None:
+        self._remove_socket()
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        self.server.listen()
+        self.server.setblocking(False)
+
+    def write(self, events: List[Dict[str, Any]]) -> None:
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                break
+            client.setblocking(False)
+            self.subscribers.append(client)
+        if not self.subscribers:
+            return
+        data = ''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in events).encode('utf-8')
+        for client in list(self.subscribers):
+            try:
+                if client.send(data) == len(data):
+                    continue
+            except OSError:
+                pass
+            client.close()
+            self.subscribers.remove(client)
+
+    def sync(self) -> None:
+        pass
+
+    def close(self) -> None:
+        for client in self.subscribers:
+            client.close()
+        self.server.close()
+        self._remove_socket()
+
+class EventSinkWriter:
+    """
+    Monitor sink that hands events to a log backend on a dedicated writer thread.
+
+    Calling the sink only enqueues the event (counting it as dropped if the
+    writer has fallen EVENT_SINK_QUEUE_SIZE events behind), so slow disks never
+    stall the monitor. The writer thread writes batches of up to batch_size
+    events and calls the backend's sync (fsync or checkpoint) every
+    sync_interval seconds.
+    """
+
+    def __init__(self, backend, batch_size: int = EVENT_SINK_BATCH_SIZE,
+                 sync_interval: float = EVENT_SINK_SYNC_INTERVAL):
+        self.backend = backend
+        self.paths = getattr(backend, 'paths', [])
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self.events = queue.Queue(maxsize=EVENT_SINK_QUEUE_SIZE)
+        self.counters = {'written': 0, 'dropped': 0, 'errors': 0}
+        self.stopping = threading.Event()
+        opened = threading.Event()
+        self.error = None
+
+        def run():
+            try:
+                backend.open()
+            except Exception as e:
+                self.error = e
+                return
+            finally:
+                opened.set()
+            self._run()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        opened.wait()
+        if self.error is not None:
+            raise self.error
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.counters['dropped'] += 1
+
+    def _run(self) -> None:
+        last_sync = time.monotonic()
+        while True:
+            batch = []
+            try:
+                batch.append(self.events.get(timeout=0.2))
+                while len(batch) < self.batch_size:
+                    batch.append(self.events.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    self.backend.write(batch)
+                    self.counters['written'] += len(batch)
+                except Exception:
+                    self.counters['errors'] += 1
+            if time.monotonic() - last_sync >= self.sync_interval:
+                try:
+                    self.backend.sync()
+                except Exception:
+                    self.counters['errors'] += 1
+                last_sync = time.monotonic()
+            if self.stopping.is_set() and self.events.empty():
+                break
+        self.backend.close()
 
-def get_permission_string(access_mask):
-    perms = []
-    if access_mask & win32con.FILE_READ_DATA: perms.append("Read")
-    if access_mask & win32con.FILE_WRITE_DATA: perms.append("Write")
-    if access_mask & win32con.FILE_EXECUTE: perms.append("Execute")
-    if access_mask & win32con.DELETE: perms.append("Delete")
-    if access_mask & win32con.WRITE_DAC: perms.append("Change Permissions")
-    if access_mask & win32con.WRITE_OWNER: perms.append("Take Ownership")
-    return ", ".join(perms) if perms else "No Access"
+    def close(self) -> None:
+        """Write everything still queued, sync and close the backend"""
+        self.stopping.set()
+        self.thread.join()
 
-def disk_health_check():
+def open_event_sink(kind: str, path: str) -> EventSinkWriter:
     """
-    Perform a comprehensive disk health check
-    
+    Open a structured monitor event sink.
+
+    Args:
+        kind (str): 'ndjson', 'sqlite' or 'socket'
+        path (str): Log file, database or socket path
+
     Returns:
-        dict: Dictionary containing disk health information
+        EventSinkWriter: Sink to pass to start_monitor; close() it when done
     """
-    results = {
-        "space_usage": {},
-        "performance": {},
-        "warnings": [],
-        "errors": []
-    }
-    
-    try:
-        # Check disk space
-        for partition in psutil.disk_partitions():
-            if 'fixed' in partition.opts:
-                try:
-                    usage = psutil.disk_usage(partition.mountpoint)
-                    results["space_usage"][partition.mountpoint] = {
-                        "total": usage.total,
-                        "used": usage.used,
-                        "free": usage.free,
-                        "percent_used": usage.percent
-                    }
-                    
-                    # Add warnings for low disk space
-                    if usage.percent > 90:
-                        results["warnings"].append(
-                            f"Low disk space on {partition.mountpoint}: {usage.percent}% used"
-                        )
-                except Exception as e:
-                    results["errors"].append(f"Error checking {partition.mountpoint}: {str(e)}")
-        
-        # Check disk performance (Windows only)
-        if os.name == 'nt':
-            try:
-                # Check disk status
-                status_output = subprocess.check_output(
-                    ["wmic", "diskdrive", "get", "status"], 
-                    universal_newlines=True
-                )
-                status_lines = status_output.strip().split('\n')[1:]
-                if any(status != "OK" for status in status_lines if status.strip()):
-                    results["errors"].append("Disk hardware issues detected")
-                results["performance"]["disk_status"] = "OK" if all(
-                    status == "OK" for status in status_lines if status.strip()
-                ) else "Issues detected"
-                
-                # Check fragmentation (simplified)
-                results["performance"]["fragmentation"] = "Unknown (run defrag for details)"
-                
-                # Simple disk speed test
-                try:
-                    # Write test
-                    test_file = os.path.join(os.environ.get('TEMP', '.'), 'disk_test.tmp')
-                    start_time = time.time()
-                    with open(test_file, 'wb') as f:
-                        f.write(os.urandom(50 * 1024 * 1024))  # 50MB test file
-                    write_time = time.time() - start_time
-                    write_speed = 50 / write_time  # MB/s
-                    
-                    # Read test
-                    start_time = time.time()
-                    with open(test_file, 'rb') as f:
-                        f.read()
-                    read_time = time.time() - start_time
-                    read_speed = 50 / read_time  # MB/s
-                    
-                    # Clean up
-                    os.remove(test_file)
-                    
-                    results["performance"]["write_speed"] = f"{write_speed:.1f} MB/s"
-                    results["performance"]["read_speed"] = f"{read_speed:.1f} MB/s"
-                    
-                    if write_speed < 10 or read_speed < 20:
-                        results["warnings"].append("Slow disk performance detected")
-                        
-                except Exception as e:
-                    results["warnings"].append(f"Could not test disk speed: {str(e)}")
-                    
-            except Exception as e:
-                results["warnings"].append(f"Could not check disk status: {str(e)}")
-        
-        return results
-        
-    except Exception as e:
-        results["errors"].append(f"Disk health check error: {str(e)}")
-        return results
+    backends = {'ndjson': NDJSONEventLog, 'sqlite': SQLiteEventLog, 'socket': UnixSocketEventFeed}
+    if kind not in backends:
+        raise ValueError(f"Unknown event sink: {kind}")
+    return EventSinkWriter(backends[kind](path))
 
-def clean_cache():
+def load_monitor_rules(path: str = MONITOR_RULES_CONFIG) -> List[Dict[str, Any]]:
     """
-    Clean temporary files and directories from system cache locations.
-    
+    Load and validate monitor action rules.
+
+    The file is a JSON list of rules such as
+    {"name": "hash uploads", "glob": "*.iso", "min_size": 1048576,
+     "category": "Archives", "events": ["created", "moved"], "action": "hash",
+     "options": {"algorithm": "sha256"}, "concurrency": 2, "retries": 3}.
+    Every key except "action" is optional. Actions are 'hash' (record the
+    digest in the file hash cache), 'verify' (verify_file_integrity),
+    'organize' (move into a category folder next to the file, or under
+    options["target"]) and 'encrypt' (options["key_file"], optionally
+    "delete_original").
+
     Returns:
-        tuple: (int, list) Number of items cleaned and list of errors
+        List[Dict[str, Any]]: Rules with defaults filled in
+
+    Raises:
+        ValueError: If a rule is malformed
     """
-    cleaned = 0
-    errors = []
-    
-    # Define paths to clean based on OS
-    if os.name == 'nt':  # Windows
-        paths_to_clean = list(filter(None, [
-            os.environ.get('TEMP'),
-            os.environ.get('TMP'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Temp'),
-            os.path.join(os.environ.get('WINDIR', ''), 'Temp')
-        ]))
-    else:  # Unix/Linux/Mac
-        paths_to_clean = [
-            '/tmp',
-            os.path.expanduser('~/.cache')
-        ]
-    
-    # Safe file extensions that should not be deleted
-    protected_exts = ['.dll', '.pyd', '.exe', '.so', '.dylib']
-    
-    # Safe directory patterns that should be skipped
-    protected_dirs = ['_MEI', 'pywin32_system32', 'chrome-remote-desktop']
-    
-    for path in paths_to_clean:
-        if not path or not os.path.exists(path):
-            continue
-            
-        print(f"{Fore.YELLOW}Cleaning {path}...")
-        
-        try:
-            # Use tqdm for progress if there are many files
-            file_count = sum([len(files) for _, _, files in os.walk(path)])
-            if file_count > 100:
-                print(f"Found {file_count} files to process")
-            
-            for root, dirs, files in os.walk(path, topdown=False):
-                # Skip protected directories
-                if any(skip in root for skip in protected_dirs):
+    with open(path, 'r', encoding='utf-8') as f:
+        rules = json.load(f)
+    if not isinstance(rules, list):
+        raise ValueError("Rules file must contain a JSON list")
+    loaded = []
+    for index, rule in enumerate(rules):
+        if rule.get('action') not in RULE_ACTIONS:
+            raise ValueError(f"Rule {index}: action must be one of {', '.join(RULE_ACTIONS)}")
+        if rule['action'] == 'encrypt' and not rule.get('options', {}).get('key_file'):
+            raise ValueError(f"Rule {index}: encrypt needs options.key_file")
+        loaded.append(dict({
+            'name': f"rule {index + 1} ({rule['action']})",
+            'glob': '*',
+            'min_size': 0,
+            'max_size': None,
+            'category': None,
+            'events': ['created', 'modified', 'moved'],
+            'options': {},
+            'concurrency': 1,
+            'retries': RULE_RETRIES
+        }, **rule))
+    return loaded
+
+def _rule_hash(path: str, options: Dict[str, Any], engine: 'RuleEngine') -> str:
+    algorithm = options.get('algorithm', 'sha256')
+    st = os.stat(path)
+    digest = get_file_hash(path, algorithm)
+    if digest is None:
+        raise OSError(f"could not hash {path}")
+    with engine.lock:
+        engine.hashes[os.path.abspath(path)] = [st.st_size, st.st_mtime_ns, algorithm, digest]
+    return f"{algorithm} {digest}"
+
+def _rule_verify(path: str, options: Dict[str, Any], engine: 'RuleEngine') -> str:
+    ok, message = verify_file_integrity(path)
+    if not ok:
+        print(f"{Fore.RED}! Integrity check failed: {path}: {message}")
+    return message
+
+def _rule_organize(path: str, options: Dict[str, Any], engine: 'RuleEngine') -> str:
+    category = categorize(os.path.basename(path), path) or 'Other'
+    folder = os.path.join(options.get('target') or os.path.dirname(path), category)
+    os.makedirs(folder, exist_ok=True)
+    name = unique_name(os.path.basename(path), {os.path.normcase(n) for n in os.listdir(folder)})
+    destination = os.path.join(folder, name)
+    engine.expect(destination)
+    shutil.move(path, destination)
+    return destination
+
+def _rule_encrypt(path: str, options: Dict[str, Any], engine: 'RuleEngine') -> str:
+    with open(options['key_file'], 'rb') as f:
+        key = f.read()
+    output = path + '.encrypted'
+    engine.expect(output)
+    engine.expect(output + '.tmp')
+    with open(path, 'rb') as infile, open(output + '.tmp', 'wb') as outfile:
+        encrypt_stream(infile, outfile, key, options.get('cipher', ENCRYPTION_DEFAULT_CIPHER),
+                       compression=options.get('compression'))
+    os.replace(output + '.tmp', output)
+    if options.get('delete_original'):
+        os.remove(path)
+    return output
+
+RULE_ACTIONS = {'hash': _rule_hash, 'verify': _rule_verify, 'organize': _rule_organize, 'encrypt': _rule_encrypt}
+
+class RuleEngine:
+    """
+    Monitor sink that runs rule actions on matching files.
+
+    Matching events only register the file as pending. A scheduler thread
+    re-stats pending files every RULE_SETTLE_INTERVAL and dispatches a file
+    once its size and mtime have not changed for settle seconds, so files
+    still being written are left alone. Jobs run on one bounded thread pool,
+    and each rule has its own concurrency limit (a file waits while its rule
+    is at the limit). A settled file is checked against the rule's size
+    limits again, since the event only saw its size mid-write. Failures are
+    retried with exponential backoff. Files written by the actions themselves
+    are ignored. On close, pending files get one more settle period; files
+    still changing after that are abandoned rather than waited for.
+    metrics() reports per-rule counts, bytes per second of busy time, and
+    latency from the first event to completion.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], workers: int = MAX_WORKERS, settle: float = RULE_SETTLE_TIME):
+        self.rules = rules
+        self.settle = settle
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.slots = [threading.Semaphore(rule['concurrency']) for rule in rules]
+        self.pending = {}  # (rule index, path) -> [first seen, last (size, mtime), stable since, attempts, not before]
+        self.produced = collections.OrderedDict()  # Outputs of our own actions, bounded
+        self.stats = [{'matched': 0, 'completed': 0, 'failed': 0, 'retried': 0, 'abandoned': 0, 'bytes': 0,
+                       'busy': 0.0, 'latency': 0.0, 'max_latency': 0.0} for _ in rules]
+        self.hashes = load_json_cache(FILE_HASH_CACHE) if any(r['action'] == 'hash' for r in rules) else {}
+        self.lock = threading.Lock()
+        self.running = 0
+        self.stopping = threading.Event()
+        self.deadline = None  # Set by close: pending files not dispatched by then are abandoned
+        self.scheduler = threading.Thread(target=self._schedule, daemon=True)
+        self.scheduler.start()
+
+    def expect(self, path: str) -> None:
+        """Ignore events for a file an action is about to write"""
+        with self.lock:
+            self.produced[os.path.abspath(path)] = None
+            while len(self.produced) > MONITOR_STATE_SIZE:
+                self.produced.popitem(last=False)
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        if event['type'] not in ('created', 'modified', 'moved'):
+            return
+        path = os.path.abspath(event['path'])
+        with self.lock:
+            if path in self.produced:
+                return
+        name = os.path.basename(path)
+        for index, rule in enumerate(self.rules):
+            if event['type'] not in rule['events'] or not fnmatch.fnmatch(name, rule['glob']):
+                continue
+            size = event['size'] or 0
+            if size < rule['min_size'] or (rule['max_size'] is not None and size > rule['max_size']):
+                continue
+            if rule['category'] and categorize(name, path) != rule['category']:
+                continue
+            with self.lock:
+                if (index, path) not in self.pending:
+                    self.stats[index]['matched'] += 1
+                    self.pending[(index, path)] = [time.time(), None, 0.0, 0, 0.0]
+
+    def _schedule(self) -> None:
+        while not (self.stopping.is_set() and not self.pending and not self.running):
+            now = time.time()
+            with self.lock:
+                if self.stopping.is_set() and now >= self.deadline:
+                    for index, _ in self.pending:
+                        self.stats[index]['abandoned'] += 1
+                    self.pending.clear()
+                items = list(self.pending.items())
+            for (index, path), state in items:
+                if now < state[4]:
                     continue
-                    
-                # Remove files first
-                for name in files:
-                    try:
-                        filepath = os.path.join(root, name)
-                        file_ext = os.path.splitext(filepath)[1].lower()
-                        
-                        # Skip protected file types
-                        if file_ext in protected_exts:
-                            continue
-                            
-                        # Skip files in use
-                        if os.path.exists(filepath):
-                            try:
-                                # Try to open the file to see if it's locked
-                                with open(filepath, 'a'):
-                                    pass
-                                # If we get here, file is not locked
-                                os.unlink(filepath)
-                                cleaned += 1
-                            except (PermissionError, OSError):
-                                # File is in use or protected
-                                continue
-                    except Exception as e:
-                        errors.append(f"Error deleting {name}: {str(e)}")
-                
-                # Then try to remove empty directories
-                for name in dirs:
-                    try:
-                        dirpath = os.path.join(root, name)
-                        if os.path.exists(dirpath) and not os.listdir(dirpath):
-                            os.rmdir(dirpath)
-                            cleaned += 1
-                    except Exception as e:
-                        errors.append(f"Error removing directory {name}: {str(e)}")
-        
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    with self.lock:
+                        self.pending.pop((index, path), None)
+                    continue
+                signature = (st.st_size, st.st_mtime_ns)
+                if signature != state[1]:
+                    state[1], state[2] = signature, now
+                    continue
+                if now - state[2] < self.settle:
+                    continue
+                rule = self.rules[index]
+                if st.st_size < rule['min_size'] or (rule['max_size'] is not None and st.st_size > rule['max_size']):
+                    with self.lock:
+                        self.pending.pop((index, path), None)
+                        self.stats[index]['matched'] -= 1
+                    continue
+                if not self.slots[index].acquire(blocking=False):
+                    continue
+                with self.lock:
+                    self.pending.pop((index, path), None)
+                    self.running += 1
+                self.executor.submit(self._run, index, path, state)
+            time.sleep(RULE_SETTLE_INTERVAL)
+
+    def _run(self, index: int, path: str, state: list) -> None:
+        rule = self.rules[index]
+        stats = self.stats[index]
+        start = time.time()
+        try:
+            RULE_ACTIONS[rule['action']](path, rule['options'], self)
+            ok = True
         except Exception as e:
-            errors.append(f"Error processing {path}: {str(e)}")
-    
-    return cleaned, errors
+            ok = False
+            error = e
+        finally:
+            self.slots[index].release()
+        finished = time.time()
+        with self.lock:
+            self.running -= 1
+            stats['busy'] += finished - start
+            if ok:
+                stats['completed'] += 1
+                stats['bytes'] += state[1][0]
+                stats['latency'] += finished - state[0]
+                stats['max_latency'] = max(stats['max_latency'], finished - state[0])
+            elif state[3] < rule['retries']:
+                stats['retried'] += 1
+                state[3] += 1
+                state[4] = finished + 2 ** state[3]
+                state[1] = None
+                self.pending.setdefault((index, path), state)
+            else:
+                stats['failed'] += 1
+                print(f"{Fore.RED}! {rule['name']} failed for {path}: {error}")
 
-def monitor_directory(directory):
-    class FileHandler(FileSystemEventHandler):
-        def __init__(self):
-            self.last_modified = {}
-            
-        def on_created(self, event):
-            if not event.is_directory:
-                path = event.src_path
-                size = os.path.getsize(path) if os.path.exists(path) else 0
-                print(f"{Fore.GREEN}+ File created: {path} ({humanize.naturalsize(size)})")
+    def metrics(self) -> List[Dict[str, Any]]:
+        """Per-rule counters with throughput (bytes per busy second) and mean/max latency"""
+        with self.lock:
+            return [dict(stats, rule=rule['name'],
+                         throughput=stats['bytes'] / stats['busy'] if stats['busy'] else 0.0,
+                         mean_latency=stats['latency'] / stats['completed'] if stats['completed'] else 0.0,
+                         pending=sum(1 for key in self.pending if key[0] == index))
+                    for index, (rule, stats) in enumerate(zip(self.rules, self.stats))]
 
-        def on_modified(self, event):
-            if not event.is_directory:
-                path = event.src_path
-                now = time.time()
-                
-                if path in self.last_modified:
-                    if now - self.last_modified[path] < 1:
-                        return
-                
-                self.last_modified[path] = now
-                if os.path.exists(path):
-                    size = os.path.getsize(path)
-                    print(f"{Fore.YELLOW}~ File modified: {path} ({humanize.naturalsize(size)})")
+    def close(self) -> None:
+        """Finish running jobs and pending files that settle in time, then save the hash cache"""
+        self.deadline = time.time() + self.settle + RULE_SETTLE_INTERVAL
+        self.stopping.set()
+        self.scheduler.join()
+        self.executor.shutdown(wait=True)
+        if self.hashes:
+            save_json_cache(FILE_HASH_CACHE, self.hashes)
+
+def start_monitor(directory: str, sinks=None, recursive: bool = False,
+                  window: float = MONITOR_COALESCE_WINDOW, backend: str = 'auto',
+                  poll_interval: float = MONITOR_POLL_INTERVAL) -> DirectoryMonitor:
+    """
+    Start watching a directory in the background.
 
-        def on_deleted(self, event):
-            if not event.is_directory:
-                print(f"{Fore.RED}- File deleted: {event.src_path}")
+    Args:
+        directory (str): Directory to watch
+        sinks (list, optional): Callables receiving each coalesced event dict
+        recursive (bool): Watch subdirectories too
+        window (float): Seconds to merge events for the same path
+        backend (str): 'native' (watchdog), 'polling' (network shares, containers) or 'auto'
+        poll_interval (float): Seconds between polling ticks
+
+    Returns:
+        DirectoryMonitor: Running monitor; call stop() to end it
+    """
+    return DirectoryMonitor(directory, sinks, recursive, window, backend=backend,
+                            poll_interval=poll_interval).start()
 
-        def on_moved(self, event):
-            if not event.is_directory:
-                print(f"{Fore.BLUE}→ File moved/renamed:")
-                print(f"  From: {event.src_path}")
-                print(f"  To: {event.dest_path}")
+def print_monitor_event(event: Dict[str, Any]) -> None:
+    """Console sink for DirectoryMonitor events"""
+    size = f" ({humanize.naturalsize(event['size'])})" if event['size'] is not None else ""
+    merged = f" [{event['count']} events]" if event['count'] > 1 else ""
+    if event['type'] == 'created':
+        print(f"{Fore.GREEN}+ File created: {event['path']}{size}{merged}")
+    elif event['type'] == 'modified':
+        print(f"{Fore.YELLOW}~ File modified: {event['path']}{size}{merged}")
+    elif event['type'] == 'deleted':
+        print(f"{Fore.RED}- File deleted: {event['path']}{merged}")
+    elif event['type'] == 'moved':
+        print(f"{Fore.BLUE}→ File moved/renamed:{merged}")
+        print(f"  From: {event['src']}")
+        print(f"  To: {event['path']}")
+    elif event['type'] == 'dir_deleted':
+        print(f"{Fore.RED}- Folder deleted: {event['path']}{merged}")
+    elif event['type'] == 'dir_moved':
+        print(f"{Fore.BLUE}→ Folder moved/renamed:{merged}")
+        print(f"  From: {event['src']}")
+        print(f"  To: {event['path']}")
+    elif event['type'] == 'overflow':
+        print(f"{Fore.RED}! {event['count']} events dropped (too many changes); the view may be incomplete")
 
+def monitor_directory(directory, recursive=False, sinks=None, backend='auto'):
+    """
+    Print directory changes until Ctrl+C
+    
+    Args:
+        directory (str): Directory to watch
+        recursive (bool): Watch subdirectories too
+        sinks (list, optional): Extra sinks (e.g. from open_event_sink); sinks
+            with a close() method are closed when monitoring stops
+        backend (str): 'native', 'polling' or 'auto' (see DirectoryMonitor)
+    """
+    sinks = list(sinks or [])
     print(f"{Fore.CYAN}Starting directory monitor for: {directory}")
     print(f"{Fore.YELLOW}Events that will be detected:")
     print(f"{Fore.GREEN}• File creation")
     print(f"{Fore.YELLOW}• File modification")
     print(f"{Fore.RED}• File deletion")
     print(f"{Fore.BLUE}• File moving/renaming")
+    if recursive:
+        print(f"{Fore.WHITE}Subdirectories are watched too.")
     print(f"\n{Fore.WHITE}Press Ctrl+C to stop monitoring...")
 
-    observer = Observer()
-    handler = FileHandler()
-    observer.schedule(handler, directory, recursive=False)
-    observer.start()
-
+    monitor = start_monitor(directory, [print_monitor_event] + sinks, recursive, backend=backend)
+    if monitor.backend == 'polling':
+        print(f"{Fore.WHITE}Polling for changes every {monitor.poll_interval}s.")
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
-        observer.stop()
+        monitor.stop()
+        for sink in sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
+        stats = monitor.stats
         print(f"\n{Fore.YELLOW}Monitoring stopped.")
-    observer.join()
+        print(f"{Fore.WHITE}{stats['received']} events received, {stats['emitted']} reported, "
+              f"{stats['coalesced']} merged, {stats['dropped']} dropped.")
+        for sink in sinks:
+            if isinstance(sink, RuleEngine):
+                for rule in sink.metrics():
+                    print(f"{Fore.CYAN}{rule['rule']}: {rule['completed']} done, {rule['failed']} failed, "
+                          f"{rule['retried']} retried, {rule['abandoned']} still changing at exit, "
+                          f"{humanize.naturalsize(rule['throughput'])}/s, "
+                          f"latency {rule['mean_latency']:.1f}s avg / {rule['max_latency']:.1f}s max")
+
+class LiveUsage:
+    """
+    Disk usage aggregates kept current by DirectoryMonitor events.
+
+    Holds each directory's mtime and {name: size} map, plus running
+    per-extension and per-directory [count, bytes] totals, so each event
+    costs a few dict updates. Calling the object applies an event (it is a
+    monitor sink); a deleted or moved directory drops its subtree (a moved
+    one is rescanned at its new place), and an 'overflow' event marks the
+    aggregates for a rescan. The state is snapshotted to the Multitool cache,
+    and on the next start directories whose mtime is unchanged are loaded
+    from the snapshot instead of being listed. Their file sizes may be stale
+    (rewriting a file in place does not touch its directory), so
+    refresh_sizes re-stats them in the background once the view is up.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        self.cache_name = f"live_usage_{hashlib.sha1(self.directory.encode()).hexdigest()[:16]}"
+        self.dirs = {}  # directory -> {'mtime': ns, 'files': {name: size}}
+        self.by_ext = collections.defaultdict(lambda: [0, 0])
+        self.by_dir = collections.defaultdict(lambda: [0, 0])
+        self.lock = threading.Lock()
+        self.needs_rescan = False
+        self.updated = time.time()
+        self.reused = []  # Directories loaded from the snapshot whose sizes are not yet verified
+
+    def _add(self, folder: str, name: str, size: int, sign: int = 1) -> None:
+        ext = os.path.splitext(name)[1].lower()
+        for totals in (self.by_ext[ext], self.by_dir[folder]):
+            totals[0] += sign
+            totals[1] += sign * size
+
+    def _drop_tree(self, root: str) -> None:
+        """Remove a directory and everything below it from the aggregates"""
+        prefix = root + os.sep
+        for folder in [f for f in self.dirs if f == root or f.startswith(prefix)]:
+            for name, size in self.dirs.pop(folder)['files'].items():
+                self._add(folder, name, size, -1)
+            self.by_dir.pop(folder, None)
+
+    def _scan_dir(self, folder: str) -> List[str]:
+        """(Re)load one directory's files into the aggregates; returns its subdirectories"""
+        previous = self.dirs.pop(folder, None)
+        if previous:
+            for name, size in previous['files'].items():
+                self._add(folder, name, size, -1)
+        files = {}
+        subdirs = []
+        try:
+            mtime_ns = os.stat(folder).st_mtime_ns
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            files[entry.name] = entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            return []
+        self.dirs[folder] = {'mtime': mtime_ns, 'files': files}
+        for name, size in files.items():
+            self._add(folder, name, size)
+        return subdirs
+
+    def scan(self, full: bool = True) -> Dict[str, int]:
+        """
+        Build the aggregates, reusing the on-disk snapshot when one exists.
+
+        Args:
+            full (bool): Ignore the snapshot and rescan every directory
+
+        Returns:
+            Dict[str, int]: 'rescanned' and 'reused' directory counts
+        """
+        counts = {'rescanned': 0, 'reused': 0}
+        with self.lock:
+            snapshot = {} if full else load_json_cache(self.cache_name).get('dirs', {})
+            self.dirs = {}
+            self.by_ext.clear()
+            self.by_dir.clear()
+            stack = [self.directory]
+            while stack:
+                folder = stack.pop()
+                saved = snapshot.get(folder)
+                try:
+                    unchanged = saved is not None and os.stat(folder).st_mtime_ns == saved['mtime']
+                except OSError:
+                    continue
+                if unchanged:
+                    self.dirs[folder] = saved
+                    for name, size in saved['files'].items():
+                        self._add(folder, name, size)
+                    self.reused.append(folder)
+                    stack.extend(path for path in saved.get('subdirs', []))
+                    counts['reused'] += 1
+                else:
+                    stack.extend(self._scan_dir(folder))
+                    counts['rescanned'] += 1
+            if full:
+                self.reused = []
+            self.needs_rescan = False
+            self.updated = time.time()
+        return counts
+
+    def refresh_sizes(self) -> int:
+        """
+        Re-stat the files of directories loaded from the snapshot, one directory at a time.
+
+        Meant for a background thread after scan(full=False); events keep
+        arriving meanwhile, and the lock is only held for one directory.
+
+        Returns:
+            int: Number of files whose size changed
+        """
+        changed = 0
+        while True:
+            with self.lock:
+                if not self.reused:
+                    return changed
+                folder = self.reused.pop()
+                entry = self.dirs.get(folder)
+                if entry is None:
+                    continue
+                files = entry['files']
+                for name in list(files):
+                    try:
+                        size = os.lstat(os.path.join(folder, name)).st_size
+                    except OSError:
+                        self._add(folder, name, files.pop(name), -1)
+                        changed += 1
+                        continue
+                    if size != files[name]:
+                        self._add(folder, name, files[name], -1)
+                        self._add(folder, name, size)
+                        files[name] = size
+                        changed += 1
+                self.updated = time.time()
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        with self.lock:
+            if event['type'] == 'overflow':
+                self.needs_rescan = True
+                return
+            if event['type'] in ('dir_deleted', 'dir_moved'):
+                self._drop_tree(event['src'] if event['type'] == 'dir_moved' else event['path'])
+                if event['type'] == 'dir_moved' and event['path'].startswith(self.directory + os.sep):
+                    self._drop_tree(event['path'])
+                    stack = [event['path']]
+                    while stack:
+                        stack.extend(self._scan_dir(stack.pop()))
+                self.updated = time.time()
+                return
+            if event['type'] in ('deleted', 'moved'):
+                gone = event['src'] if event['type'] == 'moved' else event['path']
+                folder, name = os.path.split(gone)
+                files = self.dirs.get(folder, {}).get('files', {})
+                if name in files:
+                    self._add(folder, name, files.pop(name), -1)
+            if event['type'] != 'deleted' and event['size'] is not None:
+                folder, name = os.path.split(event['path'])
+                entry = self.dirs.setdefault(folder, {'mtime': 0, 'files': {}})
+                if name in entry['files']:
+                    self._add(folder, name, entry['files'][name], -1)
+                entry['files'][name] = event['size']
+                self._add(folder, name, event['size'])
+            self.updated = time.time()
+
+    def save(self) -> None:
+        """Snapshot the aggregates to the Multitool cache"""
+        with self.lock:
+            dirs = {}
+            for folder, entry in self.dirs.items():
+                try:
+                    mtime_ns = os.stat(folder).st_mtime_ns
+                except OSError:
+                    continue
+                dirs[folder] = {'mtime': mtime_ns, 'files': dict(entry['files']), 'subdirs': []}
+            for folder in dirs:
+                parent = os.path.dirname(folder)
+                if folder != self.directory and parent in dirs:
+                    dirs[parent]['subdirs'].append(folder)
+        save_json_cache(self.cache_name, {'directory': self.directory, 'time': time.time(), 'dirs': dirs})
+
+    def report(self, top: int = 15) -> Dict[str, Any]:
+        """Current totals, largest extensions, categories and directories"""
+        with self.lock:
+            by_ext = {ext: tuple(totals) for ext, totals in self.by_ext.items() if totals[0]}
+            by_dir = {folder: tuple(totals) for folder, totals in self.by_dir.items() if totals[0]}
+        by_category = collections.defaultdict(lambda: [0, 0])
+        for ext, (count, size) in by_ext.items():
+            category = by_category[(categorize(ext) if ext else None) or 'Other']
+            category[0] += count
+            category[1] += size
+        largest = lambda totals: sorted(totals.items(), key=lambda x: x[1][1], reverse=True)[:top]
+        return {
+            'count': sum(count for count, _ in by_ext.values()),
+            'total_size': sum(size for _, size in by_ext.values()),
+            'extensions': largest(by_ext),
+            'categories': largest(by_category),
+            'directories': largest(by_dir)
+        }
+
+def live_disk_usage(directory, refresh: float = LIVE_REFRESH_INTERVAL, snapshot_interval: float = LIVE_SNAPSHOT_INTERVAL):
+    """
+    Show disk usage for a directory tree, updated live from filesystem events until Ctrl+C
+    
+    Args:
+        directory (str): Directory to watch
+        refresh (float): Seconds between screen refreshes
+        snapshot_interval (float): Seconds between snapshots of the aggregates to disk
+    """
+    usage = LiveUsage(directory)
+    print(f"{Fore.CYAN}Loading disk usage for {directory}...")
+    counts = usage.scan(full=False)
+    monitor = start_monitor(directory, [usage], recursive=True)
+    threading.Thread(target=usage.refresh_sizes, daemon=True).start()
+    last_snapshot = time.time()
+    try:
+        while True:
+            if usage.needs_rescan:
+                usage.scan(full=True)
+            report = usage.report()
+            os.system('cls' if os.name == 'nt' else 'clear')
+            print(f"{Fore.CYAN}Live disk usage: {directory}")
+            print(f"{Fore.WHITE}{report['count']} files, {humanize.naturalsize(report['total_size'])} "
+                  f"(updated {datetime.fromtimestamp(usage.updated).strftime('%H:%M:%S')}; "
+                  f"{counts['reused']} directories from snapshot, {counts['rescanned']} rescanned; "
+                  f"{monitor.stats['dropped']} events dropped)")
+            print(f"\n{Fore.GREEN}By file type:")
+            for ext, (count, size) in report['extensions']:
+                print(f"{ext or 'No extension'}: {humanize.naturalsize(size)} ({count} files)")
+            print(f"\n{Fore.GREEN}By category:")
+            for category, (count, size) in report['categories']:
+                print(f"{category}: {humanize.naturalsize(size)} ({count} files)")
+            print(f"\n{Fore.GREEN}Largest directories (files directly inside):")
+            for folder, (count, size) in report['directories']:
+                print(f"{os.path.relpath(folder, directory)}: {humanize.naturalsize(size)} ({count} files)")
+            print(f"\n{Fore.WHITE}Press Ctrl+C to stop...")
+            if time.time() - last_snapshot >= snapshot_interval:
+                usage.save()
+                last_snapshot = time.time()
+            time.sleep(refresh)
+    except KeyboardInterrupt:
+        monitor.stop()
+        usage.save()
+        print(f"\n{Fore.YELLOW}Live view stopped; usage snapshot saved.")
 
 def file_stats():
     stats = {
         "types": {},
+        "categories": {},
         "sizes": {"small": 0, "medium": 0, "large": 0},
         "ages": {"today": 0, "week": 0, "month": 0, "older": 0},
         "total_size": 0,
@@ -1472,6 +5922,8 @@ def file_stats():
             stats["count"] += 1
             ext = os.path.splitext(f)[1].lower() or "no_extension"
             stats["types"][ext] = stats["types"].get(ext, 0) + 1
+            category = categorize(f) or "Other"
+            stats["categories"][category] = stats["categories"].get(category, 0) + 1
             
             size = os.path.getsize(f)
             stats["total_size"] += size
@@ -1557,24 +6009,17 @@ def screen_capture():
 
 def clean_filenames():
     pattern = re.compile(r'[^\w\-_\. ]')
-    renamed = 0
+    mapping = {}
     
-    for filename in os.listdir():
-        if os.path.isfile(filename):
-            name, ext = os.path.splitext(filename)
-            new_name = pattern.sub('', name)
-            new_name = ' '.join(new_name.split())
-            new_name = f"{new_name}{ext}"
-            
-            if new_name != filename:
-                try:
-                    os.rename(filename, new_name)
-                    renamed += 1
-                    print(f"{Fore.GREEN}Cleaned: {filename} → {new_name}")
-                except Exception as e:
-                    print(f"{Fore.RED}Error renaming {filename}: {e}")
+    with os.scandir() as entries:
+        for entry in entries:
+            if entry.is_file():
+                name, ext = os.path.splitext(entry.name)
+                new_name = pattern.sub('', name)
+                new_name = ' '.join(new_name.split())
+                mapping[entry.name] = f"{new_name}{ext}"
     
-    return renamed
+    return bulk_rename(os.getcwd(), mapping)
 
 def corrupt_file(filepath):
     """Deliberately corrupts a file by randomly modifying bytes"""
@@ -2105,18 +6550,33 @@ def advanced_search():
                         
         elif choice == "4":
             text = input(f"{Fore.YELLOW}Enter text to search for: {Fore.WHITE}")
+            key_input = input(f"{Fore.YELLOW}Key for encrypted files (file path or key, Enter to skip): {Fore.WHITE}")
+            key = None
+            if os.path.exists(key_input):
+                with open(key_input, 'rb') as f:
+                    key = f.read()
+            elif key_input:
+                key = key_input.encode()
             print(f"\n{Fore.CYAN}Searching text files (txt, log, ini, csv, md, py, json)...")
             
+            text_exts = ('.txt', '.log', '.ini', '.csv', '.md', '.py', '.json')
+            needle = text.lower()
             for root, _, files in os.walk(current_dir):
                 for file in files:
-                    if file.endswith(('.txt', '.log', '.ini', '.csv', '.md', '.py', '.json')):
-                        filepath = os.path.join(root, file)
-                        try:
-                            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                                if text.lower() in f.read().lower():
-                                    results.append(filepath)
-                        except:
+                    filepath = os.path.join(root, file)
+                    try:
+                        if file.endswith(text_exts):
+                            f = open(filepath, 'r', encoding='utf-8', errors='ignore')
+                        elif key and file.endswith(tuple(ext + '.encrypted' for ext in text_exts)) and is_encrypted_file(filepath):
+                            # Decrypted chunk by chunk in memory, never written to disk
+                            f = open_encrypted(filepath, key, 'r')
+                        else:
                             continue
+                        with f:
+                            if any(needle in line.lower() for line in f):
+                                results.append(filepath)
+                    except:
+                        continue
         
         if choice in ["1", "2", "3", "4"]:
             if results:
@@ -3427,7 +7887,15 @@ def main_menu():
                 
             elif choice == '5':
                 filepath = input(f"{Fore.YELLOW}Enter file path: {Fore.WHITE}")
-                preview_file(filepath)
+                key = None
+                if is_encrypted_file(filepath):
+                    key_input = input(f"{Fore.YELLOW}File is encrypted. Key file path or key (Enter to skip): {Fore.WHITE}")
+                    if os.path.exists(key_input):
+                        with open(key_input, 'rb') as f:
+                            key = f.read()
+                    elif key_input:
+                        key = key_input.encode()
+                preview_file(filepath, key)
                 
             elif choice == '6':
                 renamed = auto_rename()
@@ -3439,21 +7907,51 @@ def main_menu():
                 
             elif choice == '8':
                 directory = os.getcwd()
-                organize_files(directory)
+                by_date = input(f"{Fore.YELLOW}Organize by (c)ategory or (d)ate taken (recursive)? (c/d): {Fore.WHITE}").lower() == 'd'
+                kind = 'date_organize' if by_date else 'organize'
+                if os.path.exists(journal_path(kind, directory)) and \
+                        input(f"{Fore.YELLOW}Undo the last organize run here instead? (y/n): {Fore.WHITE}").lower() == 'y':
+                    print(f"{Fore.GREEN}Moved {undo_organize(directory, kind)} files back.")
+                elif by_date:
+                    organize_by_date(directory)
+                else:
+                    organize_files(directory)
                 
             elif choice == '9':
                 show_categories()
                 
             elif choice == '10':
                 directory = os.getcwd()
-                monitor_directory(directory)
+                recursive = input(f"{Fore.YELLOW}Watch subdirectories too? (y/n): {Fore.WHITE}").lower() == 'y'
+                sinks = []
+                sink_kind = input(f"{Fore.YELLOW}Also record events to (n)djson log, (s)qlite database, "
+                                  f"(u)nix socket, or Enter for none: {Fore.WHITE}").lower()
+                if sink_kind in ('n', 's', 'u'):
+                    kind = {'n': 'ndjson', 's': 'sqlite', 'u': 'socket'}[sink_kind]
+                    sink_path = input(f"{Fore.YELLOW}Enter {kind} path: {Fore.WHITE}")
+                    try:
+                        sinks.append(open_event_sink(kind, sink_path))
+                    except (OSError, sqlite3.Error) as e:
+                        print(f"{Fore.RED}Could not open {kind} sink: {e}")
+                if os.path.exists(MONITOR_RULES_CONFIG) and \
+                        input(f"{Fore.YELLOW}Run the action rules from {MONITOR_RULES_CONFIG}? (y/n): {Fore.WHITE}").lower() == 'y':
+                    try:
+                        sinks.append(RuleEngine(load_monitor_rules()))
+                    except (OSError, ValueError) as e:
+                        print(f"{Fore.RED}Could not load rules: {e}")
+                backend = 'polling' if input(f"{Fore.YELLOW}Poll for changes (for network shares/containers)? (y/n): {Fore.WHITE}").lower() == 'y' else 'auto'
+                monitor_directory(directory, recursive, sinks, backend)
                 
             elif choice == '11':
                 directory = os.getcwd()
-                space_usage = analyze_disk_space(directory)
-                print(f"\n{Fore.GREEN}Space usage by file type:")
-                for ext, size in sorted(space_usage.items(), key=lambda x: x[1], reverse=True):
-                    print(f"{ext or 'No extension'}: {humanize.naturalsize(size)}")
+                if input(f"{Fore.YELLOW}Live view (updates as files change)? (y/n): {Fore.WHITE}").lower() == 'y':
+                    live_disk_usage(directory)
+                else:
+                    by_category = input(f"{Fore.YELLOW}Group by category instead of extension? (y/n): {Fore.WHITE}").lower() == 'y'
+                    space_usage = analyze_disk_space(directory, by_category)
+                    print(f"\n{Fore.GREEN}Space usage by file {'category' if by_category else 'type'}:")
+                    for ext, size in sorted(space_usage.items(), key=lambda x: x[1], reverse=True):
+                        print(f"{ext or 'No extension'}: {humanize.naturalsize(size)}")
                 
             elif choice == '12':
                 stats = file_stats()
@@ -3465,6 +7963,10 @@ def main_menu():
                 for ext, count in sorted(stats['types'].items()):
                     print(f"{ext}: {count} files")
                 
+                print(f"\n{Fore.CYAN}File Categories:")
+                for category, count in sorted(stats['categories'].items(), key=lambda x: x[1], reverse=True):
+                    print(f"{category}: {count} files")
+                
                 print(f"\n{Fore.CYAN}Size Distribution:")
                 for category, count in stats['sizes'].items():
                     print(f"{category.title()}: {count} files")
@@ -3488,15 +7990,35 @@ def main_menu():
                     print(info)
                 
             elif choice == '14':
-                print(f"{Fore.YELLOW}Cleaning temporary files...")
-                cleaned, errors = clean_cache()
-                print(f"{Fore.GREEN}Cleaned {cleaned} items.")
-                if errors:
-                    print(f"\n{Fore.RED}Errors encountered:")
-                    for error in errors[:5]:
-                        print(f"• {error}")
-                    if len(errors) > 5:
-                        print(f"...and {len(errors) - 5} more errors")
+                policy = {}
+                if input(f"{Fore.YELLOW}Clean by policy instead of everything? (y/n): {Fore.WHITE}").lower() == 'y':
+                    free_gb = input(f"{Fore.YELLOW}Keep this many GB free (Enter to skip): {Fore.WHITE}")
+                    max_age = input(f"{Fore.YELLOW}Delete files not accessed in this many days (Enter to skip): {Fore.WHITE}")
+                    quota_gb = input(f"{Fore.YELLOW}Limit each cache folder to this many GB (Enter to skip): {Fore.WHITE}")
+                    if free_gb:
+                        policy['free_target'] = int(float(free_gb) * 1024 ** 3)
+                    if max_age:
+                        policy['max_age_days'] = float(max_age)
+                    if quota_gb:
+                        policy['dir_quota'] = int(float(quota_gb) * 1024 ** 3)
+                if input(f"{Fore.YELLOW}Show reclaimable space first (dry run)? (y/n): {Fore.WHITE}").lower() == 'y':
+                    count, _, reclaimable = clean_cache(dry_run=True, **policy)
+                    for location, size in reclaimable.items():
+                        print(f"{location}: {humanize.naturalsize(size)} reclaimable")
+                    print(f"{Fore.CYAN}{count} files, {humanize.naturalsize(sum(reclaimable.values()))} in total.")
+                    proceed = input(f"{Fore.YELLOW}Delete them now? (y/n): {Fore.WHITE}").lower() == 'y'
+                else:
+                    proceed = True
+                if proceed:
+                    print(f"{Fore.YELLOW}Cleaning temporary files...")
+                    cleaned, errors, reclaimed = clean_cache(**policy)
+                    print(f"{Fore.GREEN}Cleaned {cleaned} items, freed {humanize.naturalsize(sum(reclaimed.values()))}.")
+                    if errors:
+                        print(f"\n{Fore.RED}Errors encountered:")
+                        for error in errors[:5]:
+                            print(f"• {error}")
+                        if len(errors) > 5:
+                            print(f"...and {len(errors) - 5} more errors")
                 
             elif choice == '15':
                 print(f"{Fore.YELLOW}Performing comprehensive disk health check...")
@@ -3541,13 +8063,71 @@ def main_menu():
                 screen_capture()
                 
             elif choice == '17':
-                filepath = input(f"{Fore.YELLOW}Enter file to encrypt: {Fore.WHITE}")
-                if os.path.exists(filepath):
-                    key = encrypt_file(filepath)
-                    print(f"{Fore.GREEN}File encrypted successfully.")
-                    print(f"{Fore.YELLOW}Keep this key safe: {key.decode()}")
+                print(f"{Fore.YELLOW}Encryption Options:")
+                print(f"{Fore.WHITE}1. Encrypt a file")
+                print(f"{Fore.WHITE}2. Benchmark encryption speed")
+                print(f"{Fore.WHITE}3. Add files/folders to an encrypted vault")
+                print(f"{Fore.WHITE}4. List vault contents")
+                print(f"{Fore.WHITE}5. Extract from vault")
+                mode = input(f"\n{Fore.GREEN}Choose option (1-5): {Fore.WHITE}")
+                codecs = [codec for codec in COMPRESSION_CODECS if codec != 'zstd' or zstd is not None]
+                
+                if mode in ('3', '4', '5'):
+                    vault_path = input(f"{Fore.YELLOW}Vault file: {Fore.WHITE}")
+                    key_input = input(f"{Fore.YELLOW}Key file path or key"
+                                      + (" (leave empty to generate a new key)" if mode == '3' else "") + f": {Fore.WHITE}")
+                    try:
+                        if not key_input and mode == '3' and not os.path.exists(vault_path):
+                            if os.path.exists(vault_path + '.key'):
+                                # Probably the key of a vault that was moved; never overwrite it
+                                raise FileExistsError(f"{vault_path}.key already exists; enter it as the key "
+                                                      "or move it away to start a new vault")
+                            key = Fernet.generate_key()
+                            with open(vault_path + '.key', 'xb') as f:
+                                f.write(key)
+                            print(f"{Fore.GREEN}New key saved to {vault_path}.key - keep it safe!")
+                        elif os.path.exists(key_input):
+                            with open(key_input, 'rb') as f:
+                                key = f.read()
+                        else:
+                            key = key_input.encode()
+                        
+                        if mode == '3':
+                            paths = [p.strip() for p in input(f"{Fore.YELLOW}Files/folders to add (comma separated): {Fore.WHITE}").split(',') if p.strip()]
+                            compression = input(f"{Fore.YELLOW}Compress before encrypting ({'/'.join(codecs)}, Enter = none): {Fore.WHITE}").lower()
+                            summary = add_to_vault(vault_path, paths, key, compression=compression if compression in codecs else None)
+                            print(f"{Fore.GREEN}✓ Added {summary['added']} files ({humanize.naturalsize(summary['bytes'])}) "
+                                  f"at {summary['mb_per_s']:.1f} MB/s; vault now holds {summary['members']} files")
+                        elif mode == '4':
+                            members = read_vault_index(vault_path, key)
+                            for member in members:
+                                modified = datetime.fromtimestamp(member['mtime']).strftime('%Y-%m-%d %H:%M')
+                                print(f"{Fore.WHITE}{humanize.naturalsize(member['size']):>10}  {modified}  {member['name']}")
+                            print(f"\n{Fore.CYAN}{len(members)} files, {humanize.naturalsize(sum(m['size'] for m in members))}")
+                        else:
+                            pattern = input(f"{Fore.YELLOW}Member name or pattern (leave empty for all): {Fore.WHITE}")
+                            output_dir = input(f"{Fore.YELLOW}Extract to directory: {Fore.WHITE}") or os.getcwd()
+                            count = extract_from_vault(vault_path, key, output_dir, [pattern] if pattern else None)
+                            print(f"{Fore.GREEN}✓ Extracted {count} files to {output_dir}")
+                    except Exception as e:
+                        print(f"{Fore.RED}Vault error: {str(e) or type(e).__name__}")
+                
+                elif mode == '2':
+                    size = input(f"{Fore.YELLOW}Test size in MB (default 256): {Fore.WHITE}")
+                    print(f"{Fore.CYAN}Benchmarking {ENCRYPTION_DEFAULT_CIPHER} on up to {os.cpu_count()} cores...")
+                    results = benchmark_encryption(int(size) if size else 256)
+                    best = max(results, key=lambda r: r[1])
+                    print(f"{Fore.GREEN}Best: {best[1]:.2f} GB/s encrypting with {best[0]} workers")
                 else:
-                    print(f"{Fore.RED}File not found!")
+                    filepath = input(f"{Fore.YELLOW}Enter file to encrypt: {Fore.WHITE}")
+                    if os.path.exists(filepath):
+                        compression = input(f"{Fore.YELLOW}Compress before encrypting ({'/'.join(codecs)}, Enter = none): {Fore.WHITE}").lower()
+                        key = encrypt_file(filepath, compression=compression if compression in codecs else None)
+                        if key:
+                            print(f"{Fore.GREEN}File encrypted successfully.")
+                            print(f"{Fore.YELLOW}Keep this key safe: {key.decode()}")
+                    else:
+                        print(f"{Fore.RED}File not found!")
                     
             elif choice == '18':
                 filepath = input(f"{Fore.YELLOW}Enter encrypted file: {Fore.WHITE}")
@@ -3588,8 +8168,14 @@ def main_menu():
 
             elif choice == '20':
                 directory = os.getcwd()
+                content_scan = input(f"{Fore.YELLOW}Also scan file contents (signatures, entropy)? (y/n): {Fore.WHITE}").lower() == 'y'
+                report_path = input(f"{Fore.YELLOW}Save full NDJSON report to (leave empty to skip): {Fore.WHITE}").strip()
+                incremental = input(f"{Fore.YELLOW}Only re-check files changed since the last scan? (y/n): {Fore.WHITE}").lower() == 'y'
                 print(f"{Fore.YELLOW}Scanning directory for potential issues...")
-                issues = scan_directory(directory)
+                issues = scan_directory(directory, content_scan=content_scan, sink=report_path or None,
+                                        incremental=incremental)
+                if report_path:
+                    print(f"{Fore.GREEN}Full report written to {report_path}")
                 if issues["security"]:
                     print(f"\n{Fore.RED}Security Issues:")
                     for issue in issues["security"]:
@@ -3606,22 +8192,96 @@ def main_menu():
                     print(f"\n{Fore.CYAN}Recommendations:")
                     for issue in issues["recommendations"]:
                         print(f"• {issue}")
+                if issues.get("changes"):
+                    print(f"\n{Fore.CYAN}Changes Since Last Scan:")
+                    for change in issues["changes"]:
+                        print(f"• {change}")
                 if not any(issues.values()):
                     print(f"\n{Fore.GREEN}No issues found in the directory.")
                     
             elif choice == '21':
-                filepath = input(f"{Fore.YELLOW}Enter file to check for corruption: {Fore.WHITE}")
-                if os.path.exists(filepath):
-                    print(f"{Fore.YELLOW}Checking file integrity...")
-                    is_valid, message = verify_file_integrity(filepath)
-                    if is_valid:
-                        print(f"{Fore.GREEN}✓ File check passed!")
-                        print(f"{Fore.WHITE}The file can be read completely without errors")
+                print(f"{Fore.YELLOW}Integrity Options:")
+                print(f"{Fore.WHITE}1. Check a single file")
+                print(f"{Fore.WHITE}2. Create manifest for current directory")
+                print(f"{Fore.WHITE}3. Verify current directory against a manifest")
+                print(f"{Fore.WHITE}4. Build Merkle tree for a large file")
+                print(f"{Fore.WHITE}5. Scrub current directory against a manifest (rolling bit-rot check)")
+                mode = input(f"\n{Fore.GREEN}Choose option (1-5): {Fore.WHITE}")
+                
+                if mode == '2':
+                    manifest_path = input(f"{Fore.YELLOW}Manifest file (.gz = compressed native format, else sha256sum format): {Fore.WHITE}")
+                    algorithm = 'blake2b' if input(f"{Fore.YELLOW}Use BLAKE2 instead of SHA256? (y/n): {Fore.WHITE}").lower() == 'y' else 'sha256'
+                    summary = create_manifest(os.getcwd(), manifest_path, algorithm)
+                    print(f"{Fore.GREEN}✓ Recorded {summary['files']} files ({humanize.naturalsize(summary['bytes'])}) "
+                          f"at {summary['mb_per_s']:.1f} MB/s")
+                    for error in summary['errors'][:5]:
+                        print(f"{Fore.RED}• {error}")
+                
+                elif mode == '3':
+                    manifest_path = input(f"{Fore.YELLOW}Manifest file: {Fore.WHITE}")
+                    result = verify_manifest(os.getcwd(), manifest_path)
+                    print(f"\n{Fore.CYAN}Verified {result['checked']} files "
+                          f"({humanize.naturalsize(result['bytes'])} at {result['mb_per_s']:.1f} MB/s)")
+                    print(f"{Fore.GREEN}OK: {result['ok']}")
+                    for label, color, key in (("Mismatched", Fore.RED, 'mismatched'), ("Missing", Fore.RED, 'missing'),
+                                              ("New", Fore.YELLOW, 'new'), ("Errors", Fore.RED, 'errors')):
+                        if result[key]:
+                            print(f"\n{color}{label}: {len(result[key])}")
+                            for path in result[key][:20]:
+                                print(f"{Fore.WHITE}• {path}")
+                            if len(result[key]) > 20:
+                                print(f"...and {len(result[key]) - 20} more")
+                
+                elif mode == '4':
+                    filepath = input(f"{Fore.YELLOW}Enter file: {Fore.WHITE}")
+                    if os.path.isfile(filepath):
+                        start = time.time()
+                        tree = compute_merkle_tree(filepath)
+                        save_merkle_tree(tree, filepath + MERKLE_SUFFIX)
+                        elapsed = max(time.time() - start, 1e-6)
+                        print(f"{Fore.GREEN}✓ {len(tree['leaves'])} leaves hashed at "
+                              f"{tree['size'] / (1024 * 1024) / elapsed:.1f} MB/s")
+                        print(f"{Fore.WHITE}Root: {tree['root']}")
+                        print(f"{Fore.WHITE}Saved to {filepath + MERKLE_SUFFIX}; option 1 now verifies it leaf by leaf")
+                    else:
+                        print(f"{Fore.RED}× File not found!")
+                
+                elif mode == '5':
+                    manifest_path = input(f"{Fore.YELLOW}Manifest file: {Fore.WHITE}")
+                    days = input(f"{Fore.YELLOW}Days per full pass (default {SCRUB_PERIOD_DAYS}): {Fore.WHITE}")
+                    limit = input(f"{Fore.YELLOW}I/O budget in MB/s (default {SCRUB_IO_LIMIT // (1024 * 1024)}, 0 = unlimited): {Fore.WHITE}")
+                    period_days = float(days) if days else SCRUB_PERIOD_DAYS
+                    io_limit = float(limit) * 1024 * 1024 if limit else SCRUB_IO_LIMIT
+                    if not os.path.isfile(manifest_path):
+                        print(f"{Fore.RED}× Manifest not found!")
+                    elif input(f"{Fore.YELLOW}Keep running daily in the foreground? (y/n): {Fore.WHITE}").lower() == 'y':
+                        run_scrubber(os.getcwd(), manifest_path, period_days, io_limit or None)
                     else:
-                        print(f"{Fore.RED}× File appears to be corrupted!")
-                        print(f"{Fore.WHITE}Error: {message}")
+                        result = scrub_manifest(os.getcwd(), manifest_path, period_days, io_limit or None)
+                        print(f"\n{Fore.CYAN}Scrubbed {result['verified']} of {result['total']} files "
+                              f"({humanize.naturalsize(result['bytes'])}) in {result['seconds']:.1f}s")
+                        print(f"{Fore.WHITE}Next run resumes at entry {result['cursor']}"
+                              + (" (pass complete)" if result['pass_complete'] else ""))
+                        if result['corrupted'] or result['missing']:
+                            print(f"{Fore.RED}Problems found (also logged to {SCRUB_ALERT_LOG}):")
+                            for path in (result['corrupted'] + result['missing'])[:20]:
+                                print(f"{Fore.WHITE}• {path}")
+                        else:
+                            print(f"{Fore.GREEN}✓ No corruption found")
+                
                 else:
-                    print(f"{Fore.RED}× File not found!")
+                    filepath = input(f"{Fore.YELLOW}Enter file to check for corruption: {Fore.WHITE}")
+                    if os.path.exists(filepath):
+                        print(f"{Fore.YELLOW}Checking file integrity...")
+                        is_valid, message = verify_file_integrity(filepath)
+                        if is_valid:
+                            print(f"{Fore.GREEN}✓ File check passed!")
+                            print(f"{Fore.WHITE}The file can be read completely without errors")
+                        else:
+                            print(f"{Fore.RED}× File appears to be corrupted!")
+                            print(f"{Fore.WHITE}Error: {message}")
+                    else:
+                        print(f"{Fore.RED}× File not found!")
                     
             elif choice == '22':
                 filepath = input(f"{Fore.YELLOW}Enter file to corrupt: {Fore.WHITE}")
@@ -3677,6 +8337,10 @@ def main_menu():
             input(f"\n{Fore.CYAN}Press Enter to continue...{Fore.WHITE}")
 
 if __name__ == "__main__":
+    # Required for process pools in the frozen (PyInstaller) executable
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1 and sys.argv[1] == "--evict-cache":
+        sys.exit(evict_cache_cli(sys.argv[2:]))
     if not force_admin():
         sys.exit(1)
     main_menu()